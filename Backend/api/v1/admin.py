@@ -3,9 +3,24 @@
 from fastapi import APIRouter, Depends, HTTPException
 
 from Backend.utils.helper.logger import CustomLoggerHandler
-from Backend.utils.database.database import mysql_client
+from Backend.utils.database.async_database import async_mysql_client
+from Backend.utils.database.chat_queue import chat_queue
+from Backend.utils.database.answer_key_cache import answer_key_cache
 from Backend.utils.helper.api.dependency import require_root
 from Backend.utils.helper.model.api.v1.authorization import SingUpSuccessModel
+from Backend.utils.helper.model.database.database import MySQLPoolStatsModel
+from Backend.utils.helper.model.database.chat_queue import ChatQueueStatsModel
+from Backend.utils.helper.model.database.answer_key_cache import (
+    AnswerKeyCacheStatsModel,
+)
+from Backend.utils.helper.model.RAG.vector_extractor import EmbeddingCacheStatsModel
+from Backend.utils.helper.model.RAG.answer_cache import AnswerCacheStatsModel
+from Backend.utils.helper.model.RAG.batcher import MicroBatchStatsModel
+from Backend.utils.helper.model.RAG.retrieval_cache import RetrievalCacheStatsModel
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.RAG.answer_cache import answer_cache
+from Backend.utils.RAG.batcher import question_batcher
+from Backend.utils.RAG.retrieval_cache import retrieval_cache
 
 
 from typing import Literal
@@ -62,10 +77,135 @@ async def new_user(
     hash_function.update(password.encode())
     hashed_password = hash_function.hexdigest()
 
-    _success = mysql_client.create_user(
+    _success = await async_mysql_client.create_user(
         username=username, hashed_password=hashed_password, role_name=role_name
     )
     if _success:
         return SingUpSuccessModel(status_code=200, success=True)
     else:
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/cache/embedding", status_code=200)
+async def embedding_cache_stats() -> EmbeddingCacheStatsModel:
+    """
+    Report the hit and miss counters of the embedding cache.
+
+    Returns:
+        EmbeddingCacheStatsModel: An object containing:
+            - namespace (str): deploy mode, embedding model name and vector dimension.
+            - memory_items (int): Number of vectors held by the in-process LRU.
+            - memory_hits (int): Lookups served by the in-process LRU.
+            - disk_hits (int): Lookups served by the on-disk tier.
+            - misses (int): Lookups that had to call the embedding provider.
+    """
+    return encoder_client.cache.stats()
+
+
+@router.get("/cache/answer", status_code=200)
+async def answer_cache_stats() -> AnswerCacheStatsModel:
+    """
+    Report the hit rate of the semantic answer cache.
+
+    Returns:
+        AnswerCacheStatsModel: An object containing:
+            - entries (int): Number of cached answers.
+            - hits (int): Questions answered from the cache.
+            - misses (int): Questions that needed a LLM generation.
+            - hit_rate (float): hits / (hits + misses).
+    """
+    return answer_cache.stats()
+
+
+@router.get("/cache/retrieval", status_code=200)
+async def retrieval_cache_stats() -> RetrievalCacheStatsModel:
+    """
+    Report the hit rate of the retrieval result cache.
+
+    Returns:
+        RetrievalCacheStatsModel: An object containing:
+            - entries (int): Number of cached retrieval results.
+            - hits (int): Questions served without embedding and searching.
+            - misses (int): Questions that had to be embedded and searched.
+            - expired (int): Lookups that found an entry older than RETRIEVAL_CACHE_TTL.
+            - invalidated (int): Lookups that found an entry of an outdated collection version.
+            - hit_rate (float): hits / (hits + misses).
+            - collection_versions (dict[str, int]): Version counter of every changed collection.
+    """
+    return retrieval_cache.stats()
+
+
+@router.get("/batch", status_code=200)
+async def question_batch_stats() -> list[MicroBatchStatsModel]:
+    """
+    Report the batch sizes and queueing delays of the question micro batchers.
+
+    Returns:
+        list[MicroBatchStatsModel]: One object per batcher (embedding, vector_search) containing:
+            - batches (int): Number of flushed batches.
+            - items (int): Number of batched questions.
+            - mean_batch_size (float): items / batches.
+            - max_batch_size (int): Largest flushed batch.
+            - queue_delay_p50_ms (float): Median time a question waited for its batch.
+            - queue_delay_p99_ms (float): 99th percentile of the waiting time.
+    """
+    return question_batcher.stats()
+
+
+@router.get("/database/pool", status_code=200)
+async def database_pool_stats() -> MySQLPoolStatsModel:
+    """
+    Report the usage of the MySQL connection pool.
+
+    Returns:
+        MySQLPoolStatsModel: An object containing:
+            - pool_size (int): Idle connections kept by the pool.
+            - max_overflow (int): Extra connections opened under load.
+            - opened (int): Connections currently open.
+            - idle (int): Connections waiting in the pool.
+            - in_use (int): Connections checked out by a unit of work.
+            - checkouts (int): Number of checkouts.
+            - timeouts (int): Checkouts that gave up after MYSQL_POOL_TIMEOUT.
+            - recycled (int): Connections reopened after MYSQL_POOL_RECYCLE.
+            - pings (int): Checkouts that pinged a connection idle longer than MYSQL_POOL_PRE_PING.
+            - invalidated (int): Connections dropped by the server and reopened.
+            - retries (int): Reads run again after their connection was dropped.
+            - wait_p50_ms (float): Median time waited for a connection.
+            - wait_p99_ms (float): 99th percentile of the waiting time.
+            - wait_max_ms (float): Longest recent wait.
+    """
+    return async_mysql_client.controller.pool.stats()
+
+
+@router.get("/database/chat-queue", status_code=200)
+async def chat_queue_stats() -> ChatQueueStatsModel:
+    """
+    Report the answered questions waiting to be persisted to MySQL.
+
+    Returns:
+        ChatQueueStatsModel: An object containing:
+            - mode (str): CHAT_PERSIST_MODE, deferred or inline.
+            - pending (int): Questions not persisted yet.
+            - failed (int): Questions that gave up after CHAT_QUEUE_MAX_ATTEMPTS, retried on restart.
+            - persisted (int): Questions persisted since startup.
+            - retries (int): Inserts scheduled again after a failure.
+            - persist_delay_p50_ms (float): Median time from the answer to the commit.
+            - persist_delay_p99_ms (float): 99th percentile of that time.
+    """
+    return chat_queue.stats()
+
+
+@router.get("/cache/answer-key", status_code=200)
+async def answer_key_cache_stats() -> AnswerKeyCacheStatsModel:
+    """
+    Report the hit rate of the exam answer key cache used to grade submissions.
+
+    Returns:
+        AnswerKeyCacheStatsModel: An object containing:
+            - entries (int): Number of cached answer keys.
+            - hits (int): Submissions graded without querying the answer key.
+            - misses (int): Submissions that queried the answer key.
+            - invalidated (int): Answer keys dropped after their exam, questions or options changed.
+            - hit_rate (float): hits / (hits + misses).
+    """
+    return answer_key_cache.stats()
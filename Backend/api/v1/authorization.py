@@ -10,7 +10,7 @@ from Backend.utils.helper.model.database.database import (
     UserInfoModel as DatabaseUserInfoModel,
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
-from Backend.utils.database.database import mysql_client
+from Backend.utils.database.async_database import async_mysql_client
 from Backend.utils.helper.model.api.dependency import JWTPayload
 from Backend.utils.helper.api.dependency import require_student
 
@@ -104,7 +104,9 @@ async def login(
     hash_function.update(password.encode())
     hashed_password = hash_function.hexdigest()
 
-    _status, user_info = mysql_client.get_user_info(username, hashed_password)
+    _status, user_info = await async_mysql_client.get_user_info(
+        username, hashed_password
+    )
 
     if _status != 200 and isinstance(user_info, str):
         return LoginFormUnsuccessModel(
@@ -152,7 +154,9 @@ async def login(
         jwt_token = jwt.encode(login_info, _jwt_secret, algorithm=_jwt_algorithm)
         logger.debug(f"Generated new jwt token:{jwt_token}")
 
-        _success = mysql_client.insert_login_token(user_info.user_id, jwt_token)
+        _success = await async_mysql_client.insert_login_token(
+            user_info.user_id, jwt_token
+        )
 
         if _success:
             response.set_cookie(key="token", value=jwt_token)
@@ -199,7 +203,7 @@ async def sign_in(
     hash_function.update(password.encode())
     hashed_password = hash_function.hexdigest()
 
-    _success = mysql_client.create_user(
+    _success = await async_mysql_client.create_user(
         username=username, hashed_password=hashed_password, role_name="User"
     )
     if _success:
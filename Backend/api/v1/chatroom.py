@@ -6,20 +6,36 @@ from Backend.utils.helper.model.api.v1.chatroom import (
     QuestioningModel,
     QuestionResponseModel,
 )
-from Backend.utils.database.vector_database import milvus_client
+from Backend.utils.helper.model.database.vector_database import (
+    SearchFilterModel,
+    SearchSimilarityModel,
+)
+from Backend.utils.helper.model.RAG.context_selector import ContextSelectionModel
 from Backend.utils.RAG.response_handler import response_client
-from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.RAG.answer_cache import answer_cache
+from Backend.utils.RAG.batcher import question_batcher
+from Backend.utils.RAG.retrieval_cache import retrieval_cache
+from Backend.utils.RAG.context_selector import context_selector
+from Backend.utils.RAG.diversifier import diversifier
+from Backend.utils.database.vector_database import milvus_client
+from Backend.utils.RAG.keyword_index import keyword_index, reciprocal_rank_fusion
 from Backend.utils.helper.logger import CustomLoggerHandler
-from Backend.utils.database.database import mysql_client
+from Backend.utils.database.async_database import async_mysql_client
+from Backend.utils.database.chat_queue import chat_queue
 from Backend.utils.helper.api.dependency import require_student
 from Backend.utils.helper.model.api.dependency import JWTPayload
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pprint import pformat
 from uuid import uuid4
-from typing import Annotated
+from typing import Annotated, AsyncIterator, Literal, Optional
 
+import numpy as np
+import asyncio
 import base64
+import json
 import os
 
 router = APIRouter(dependencies=[Depends(require_student)])
@@ -81,7 +97,12 @@ async def answer_rating(
         )
     )
 
-    success = mysql_client.update_rating(question_uuid=question_uuid, rating=score)
+    # a question still in the chat queue is not in MySQL yet
+    success = await run_in_threadpool(chat_queue.rate, question_uuid, score)
+    if not success:
+        success = await async_mysql_client.update_rating(
+            question_uuid=question_uuid, rating=score
+        )
 
     if success:
         return AnswerRatingModel(status_code=200, success=success)
@@ -102,6 +123,8 @@ async def questioning(
         collection (str, optional): collection of docs database. Defaults to "default".
         language (str): language for the response
         images: (optional: list[str] | None): list of base64 encoded images
+        retrieval_mode (str, optional): "vector", "keyword" or "hybrid". Defaults to "vector".
+        filter (SearchFilterModel, optional): only search this docs_type and tags. Defaults to None.
         payload: (Annotated, JWTPayload(Depends(require_student))) decoded jwt
 
     Returns:
@@ -109,6 +132,8 @@ async def questioning(
         question_uuid: str
         answer: str
         files: list[dict[str, str]]
+        context_chunks: int, number of retrieved chunks sent to the LLM
+        context_tokens: int, estimated tokens of those chunks
     """
     chat_id = question_model.chat_id
     question = question_model.question
@@ -117,6 +142,8 @@ async def questioning(
     question_type = question_model.question_type
     question_uuid = str(uuid4())
     images = question_model.images
+    retrieval_mode = question_model.retrieval_mode
+    search_filter = question_model.filter
     user_id = payload.user_id
 
     logger.debug(
@@ -130,61 +157,53 @@ async def questioning(
         )
     )
 
-    # save image
-    # assume not more than 3 image in a single request
-    if images:
-        for base64_image in images:
-            image_file_data = base64.b64decode(base64_image)
-            image_uuid = str(uuid4())
-            image_path = f"./images/chat/{chat_id}/{question_uuid}/{image_uuid}.png"
-
-            while os.path.exists(image_path):
-                image_uuid = str(uuid4())
-                image_path = f"./images/chat/{chat_id}/{question_uuid}/{image_uuid}.png"
-                logger.warning(f"Image file already exists: {image_path}")
-            else:
-                logger.info(f"Saving image: {image_path}")
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)
-                with open(image_path, "wb") as f:
-                    f.write(image_file_data)
-                mysql_client.insert_image(
-                    chat_id=chat_id, qa_id=question_uuid, image_uuid=image_uuid
-                )
+    await save_question_images(chat_id, question_uuid, images)
 
-    # search question
-    question_text = question[-1] if isinstance(question, list) else question
-    question_vector = encoder_client.encoder(question_text)
-    docs_result = milvus_client.search_similarity(
-        question_vector, collection_name=collection
+    question_vector, context = await retrieve(
+        question, collection, retrieval_mode, search_filter
     )
+    docs_result = context.documents
 
     document_content = [x.content for x in docs_result]
     document_file_uuid = [str(x.file_uuid) for x in docs_result]
+    files = unique_files(docs_result)
 
-    # handling duplicates files name
-    seen = set()
-    files = []
-    for docs in docs_result:
-        if docs.source not in seen:
-            files.append(
-                {
-                    "file_name": docs.source,
-                    "file_uuid": docs.file_uuid,
-                }
-            )
-            seen.add(docs.source)
-
-    answer, token_size = response_client.generate_response(
-        question=question,
-        queried_document=document_content,
-        question_type=question_type,
-        max_tokens=8192,
-        language=language,
-        images=images,
+    # only single turn questions without images are answered from the cache
+    cacheable = len(question) == 1 and not images
+    cached_answer = (
+        answer_cache.get(
+            question_vector, collection, question_type, language, document_content
+        )
+        if cacheable
+        else None
     )
 
+    if cached_answer:
+        logger.info(f"Answer cache hit: {cached_answer.similarity}")
+        answer, token_size = cached_answer.answer, cached_answer.token_size
+    else:
+        answer, token_size = await response_client.async_generate_response(
+            question=question,
+            queried_document=document_content,
+            question_type=question_type,
+            max_tokens=8192,
+            language=language,
+            images=images,
+        )
+
+        if cacheable:
+            answer_cache.set(
+                question_vector,
+                collection,
+                question_type,
+                language,
+                document_content,
+                answer,
+                token_size,
+            )
+
     # insert into mysql
-    mysql_client.insert_chatting(
+    await save_chatting(
         chat_id=chat_id,
         qa_id=question_uuid,
         answer=answer,
@@ -200,6 +219,333 @@ async def questioning(
             question_uuid=question_uuid,
             answer=answer,
             files=files,
+            context_chunks=context.context_chunks,
+            context_tokens=context.context_tokens,
         )
 
     raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/{chat_id}/stream/", status_code=200)
+async def questioning_stream(
+    question_model: QuestioningModel,
+    payload: Annotated[JWTPayload, Depends(require_student)],
+) -> StreamingResponse:
+    """Ask the question and stream the answer from RAG as Server-Sent Events
+
+    Events:
+        files: {"question_uuid": str, "files": list[dict[str, str]], "context_chunks": int, "context_tokens": int},
+            sent before generation
+        token: {"text": str}, one per generated text delta
+        done: {"question_uuid": str, "token_size": int}, after the answer has been saved
+        error: {"detail": str}, when the responser returned nothing
+
+    Args:
+        question_model (QuestioningModel): same body as `questioning`
+        payload: (Annotated, JWTPayload(Depends(require_student))) decoded jwt
+
+    Returns:
+        StreamingResponse: text/event-stream response
+    """
+    chat_id = question_model.chat_id
+    question = question_model.question
+    collection = question_model.collection
+    language = question_model.language
+    question_type = question_model.question_type
+    question_uuid = str(uuid4())
+    images = question_model.images
+    retrieval_mode = question_model.retrieval_mode
+    search_filter = question_model.filter
+    user_id = payload.user_id
+
+    logger.debug(
+        pformat(
+            {
+                "chat_id": chat_id,
+                "question": question,
+                "collection": collection,
+                "question_uuid": question_uuid,
+            }
+        )
+    )
+
+    await save_question_images(chat_id, question_uuid, images)
+
+    question_vector, context = await retrieve(
+        question, collection, retrieval_mode, search_filter
+    )
+    docs_result = context.documents
+
+    document_content = [x.content for x in docs_result]
+    document_file_uuid = [str(x.file_uuid) for x in docs_result]
+    files = unique_files(docs_result)
+
+    # only single turn questions without images are answered from the cache
+    cacheable = len(question) == 1 and not images
+    cached_answer = (
+        answer_cache.get(
+            question_vector, collection, question_type, language, document_content
+        )
+        if cacheable
+        else None
+    )
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield server_sent_event(
+            "files",
+            {
+                "question_uuid": question_uuid,
+                "files": files,
+                "context_chunks": context.context_chunks,
+                "context_tokens": context.context_tokens,
+            },
+        )
+
+        if cached_answer:
+            logger.info(f"Answer cache hit: {cached_answer.similarity}")
+            answer, token_size = cached_answer.answer, cached_answer.token_size
+            yield server_sent_event("token", {"text": answer})
+        else:
+            answer_chunks = []
+            token_size = 0
+            try:
+                async for text, token in response_client.async_stream_response(
+                    question=question,
+                    queried_document=document_content,
+                    question_type=question_type,
+                    max_tokens=8192,
+                    language=language,
+                    images=images,
+                ):
+                    token_size = token or token_size
+                    if text:
+                        answer_chunks.append(text)
+                        yield server_sent_event("token", {"text": text})
+            except Exception as error:
+                logger.error(f"Streaming response failed: {error}")
+                yield server_sent_event("error", {"detail": "Internal server error"})
+                return
+
+            answer = "".join(answer_chunks)
+            if not answer:
+                yield server_sent_event("error", {"detail": "Internal server error"})
+                return
+
+            if cacheable:
+                answer_cache.set(
+                    question_vector,
+                    collection,
+                    question_type,
+                    language,
+                    document_content,
+                    answer,
+                    token_size,
+                )
+
+        # persist once the whole answer has been generated
+        await save_chatting(
+            chat_id=chat_id,
+            qa_id=question_uuid,
+            answer=answer,
+            question=question[-1],
+            token_size=token_size,
+            user_id=user_id,
+            file_ids=document_file_uuid,
+        )
+
+        yield server_sent_event(
+            "done", {"question_uuid": question_uuid, "token_size": token_size}
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # disable reverse proxy buffering so tokens are flushed as they arrive
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def save_chatting(
+    chat_id: str,
+    qa_id: str,
+    question: str,
+    answer: str,
+    token_size: int,
+    user_id: int,
+    file_ids: list[str],
+) -> None:
+    """Persist an answered question, deferred to the chat queue unless CHAT_PERSIST_MODE is inline"""
+    if chat_queue.mode == "inline":
+        await async_mysql_client.insert_chatting(
+            chat_id=chat_id,
+            qa_id=qa_id,
+            question=question,
+            answer=answer,
+            token_size=token_size,
+            user_id=user_id,
+            file_ids=file_ids,
+        )
+        return
+
+    await run_in_threadpool(
+        chat_queue.submit,
+        chat_id=chat_id,
+        qa_id=qa_id,
+        question=question,
+        answer=answer,
+        token_size=token_size,
+        user_id=user_id,
+        file_ids=file_ids,
+    )
+
+
+async def save_question_images(
+    chat_id: str, question_uuid: str, images: list[str] | None
+) -> None:
+    """Save the base64 encoded images attached to a question"""
+    # assume not more than 3 image in a single request
+    if not images:
+        return
+
+    for base64_image in images:
+        image_file_data = base64.b64decode(base64_image)
+        image_uuid = str(uuid4())
+        image_path = f"./images/chat/{chat_id}/{question_uuid}/{image_uuid}.png"
+
+        while os.path.exists(image_path):
+            image_uuid = str(uuid4())
+            image_path = f"./images/chat/{chat_id}/{question_uuid}/{image_uuid}.png"
+            logger.warning(f"Image file already exists: {image_path}")
+        else:
+            logger.info(f"Saving image: {image_path}")
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            with open(image_path, "wb") as f:
+                f.write(image_file_data)
+            await async_mysql_client.insert_image(
+                chat_id=chat_id, qa_id=question_uuid, image_uuid=image_uuid
+            )
+
+
+async def retrieve(
+    question: list[str],
+    collection: str,
+    retrieval_mode: Literal["vector", "keyword", "hybrid"] = "vector",
+    search_filter: Optional[SearchFilterModel] = None,
+) -> tuple[np.ndarray, ContextSelectionModel]:
+    """Embed the latest question, search its documents and select the chunks sent as context
+
+    Identical questions are served from the retrieval cache, the distance threshold and
+    adaptive k, near duplicate removal and the token budget are applied on every request.
+    """
+    limit = context_selector.fetch_k
+    cached_result = retrieval_cache.get(
+        question[-1], collection, limit, retrieval_mode, search_filter
+    )
+    if cached_result is not None:
+        logger.info("Retrieval cache hit")
+        question_vector, docs_result = cached_result
+    else:
+        version = retrieval_cache.version(collection)
+        question_vector = await encode_question(question)
+        docs_result = await search_documents(
+            question[-1],
+            question_vector,
+            collection,
+            retrieval_mode,
+            search_filter,
+            limit,
+        )
+        retrieval_cache.set(
+            question[-1],
+            collection,
+            limit,
+            retrieval_mode,
+            search_filter,
+            question_vector,
+            docs_result,
+            version,
+        )
+
+    # keyword and hybrid chunks are ranked by score, vector chunks by distance
+    metric_type = (
+        milvus_client.metric_type(collection) if retrieval_mode == "vector" else None
+    )
+    # the threshold and the adaptive k need the retrieval ranking, mmr may reorder it
+    kept = context_selector.cut(docs_result, metric_type)
+    kept = await diversifier.diversify(question_vector, kept)
+    return question_vector, context_selector.budget(kept, len(docs_result))
+
+
+async def encode_question(question: list[str]) -> np.ndarray:
+    """Embed the latest question"""
+    question_text = question[-1] if isinstance(question, list) else question
+    return await question_batcher.encode(question_text)
+
+
+async def search_documents(
+    question: str,
+    question_vector: np.ndarray,
+    collection: str,
+    retrieval_mode: Literal["vector", "keyword", "hybrid"] = "vector",
+    search_filter: Optional[SearchFilterModel] = None,
+    limit: int = 3,
+) -> list[SearchSimilarityModel]:
+    """Search the documents similar to the question with the requested retrieval mode"""
+    if retrieval_mode != "vector":
+        # drops the keyword index of a recreated collection before it is searched
+        await run_in_threadpool(milvus_client.check_collection, collection)
+
+    if retrieval_mode == "keyword":
+        return await run_in_threadpool(
+            keyword_index.search, question, collection, limit, search_filter
+        )
+
+    if retrieval_mode == "vector":
+        return await question_batcher.search_similarity(
+            question_vector,
+            collection_name=collection,
+            limit=limit,
+            search_filter=search_filter,
+        )
+
+    # over fetch both rankings so the fusion can promote chunks ranked lower by one of them
+    vector_result, keyword_result = await asyncio.gather(
+        question_batcher.search_similarity(
+            question_vector,
+            collection_name=collection,
+            limit=keyword_index.fetch_k,
+            search_filter=search_filter,
+        ),
+        run_in_threadpool(
+            keyword_index.search,
+            question,
+            collection,
+            keyword_index.fetch_k,
+            search_filter,
+        ),
+    )
+    return reciprocal_rank_fusion(
+        [vector_result, keyword_result], limit, keyword_index.rrf_k
+    )
+
+
+def unique_files(docs_result: list[SearchSimilarityModel]) -> list[dict[str, str]]:
+    """List the source files of the searched documents, handling duplicates files name"""
+    seen = set()
+    files = []
+    for docs in docs_result:
+        if docs.source not in seen:
+            files.append(
+                {
+                    "file_name": docs.source,
+                    "file_uuid": docs.file_uuid,
+                }
+            )
+            seen.add(docs.source)
+
+    return files
+
+
+def server_sent_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
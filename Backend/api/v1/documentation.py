@@ -3,12 +3,11 @@
 from Backend.utils.helper.model.api.v1.documentation import (
     QueryDocumentListModel,
     FileUploadSuccessModel,
+    QueryIngestionJobModel,
 )
-from Backend.utils.database.vector_database import milvus_client
-from Backend.utils.RAG.document_handler import docs_client
-from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.RAG.ingestion import ingestion_queue
 from Backend.utils.helper.logger import CustomLoggerHandler
-from Backend.utils.database.database import mysql_client
+from Backend.utils.database.async_database import async_mysql_client
 from Backend.utils.helper.api.dependency import require_student, require_root
 from Backend.utils.helper.model.api.dependency import JWTPayload
 
@@ -33,6 +32,29 @@ logger = CustomLoggerHandler().get_logger()
 logger.debug("| Documentation Loading Finished |")
 
 
+@router.get("/jobs/{job_id}", status_code=200)
+async def get_ingestion_job(job_id: str) -> QueryIngestionJobModel:
+    """
+    Retrieve the progress of a document ingestion job.
+
+    Args:
+        job_id (str): The job id returned by the upload endpoint.
+
+    Returns:
+        QueryIngestionJobModel: A model containing the status code and the job's
+            status, current stage, chunks done and throughput.
+
+    Raises:
+        HTTPException: 404 status code if the job does not exist.
+    """
+    job = ingestion_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return QueryIngestionJobModel(status_code=200, job=job)
+
+
 @router.get("/{docs_id}", status_code=200)
 async def get_docs(docs_id: str) -> FileResponse:
     """
@@ -57,7 +79,7 @@ async def get_docs(docs_id: str) -> FileResponse:
     if docs_id == "":
         raise HTTPException(status_code=422, detail="Empty request")
 
-    file_name = mysql_client.query_docs_name(docs_id)
+    file_name = await async_mysql_client.query_docs_name(docs_id)
     file_extension = file_name.split(".")[-1]
     if uuid.UUID(docs_id, version=4) and path.exists(
         f"./files/{docs_id}.{file_extension}"
@@ -94,7 +116,9 @@ async def get_documentation_list(
         HTTPException: If no documents are found for the given documentation type.
     """
     logger.info(documentation_type)
-    docs_list = mysql_client.query_documentation_type_list(documentation_type)
+    docs_list = await async_mysql_client.query_documentation_type_list(
+        documentation_type
+    )
 
     if not docs_list:
         raise HTTPException(406, detail="No documents found")
@@ -118,9 +142,10 @@ async def file_upload(
     """
     Upload a document file, process its content, and store it in the database.
 
-    This function handles the upload of a document file, splits its content,
-    generates vector representations, and stores the information in both
-    MySQL and Milvus databases.
+    This function saves the uploaded document file, stores its information in
+    MySQL and enqueues an ingestion job that splits its content, generates vector
+    representations and stores them in Milvus. The progress of the job can be
+    queried with `/jobs/{job_id}`.
     Current only support following document type:
         docx,
         pptx
@@ -132,7 +157,8 @@ async def file_upload(
         collection (str, optional): The name of the collection to store the document in. Defaults to "default".
 
     Returns:
-        FileUploadSuccessModel: A model containing the status code and the UUID of the uploaded file.
+        FileUploadSuccessModel: A model containing the status code, the UUID of the uploaded file
+            and the id of its ingestion job.
 
     Raises:
         HTTPException: If there's an error in file type, format, or database operations.
@@ -161,42 +187,30 @@ async def file_upload(
         f.write(docs_contents)
 
     # files identify
-    if file_extension == "docx":
-        splitted_content = docs_client.document_splitter(
-            f"./files/{file_uuid}.docx", "docx"
-        )
-        logger.debug(pformat(splitted_content))
-
-    elif file_extension == "pptx":
-        splitted_content = docs_client.document_splitter(
-            f"./files/{file_uuid}.pptx", "pptx"
-        )
-        logger.debug(pformat(splitted_content))
-    else:
+    if file_extension not in ["docx", "pptx"]:
         logger.error(pformat(f"Unsupported file docs: {filename}"))
         raise HTTPException(status_code=422, detail="Unsupported file format")
 
-    # insert to milvus
-    for sentence in splitted_content:
-        vector = encoder_client.encoder(sentence)
-        insert_info = milvus_client.insert_sentence(
-            docs_filename=filename,
-            vector=vector,
-            content=sentence,
-            file_uuid=file_uuid,
-            collection=collection,
-        )
-
-        logger.debug(pformat(insert_info))
-
-    success = mysql_client.insert_file(
+    success = await async_mysql_client.insert_file(
         file_uuid=file_uuid, filename=filename, tags=file_tags, collection=collection
     )
 
     if success:
+        # partition, embedding and milvus insert run in the ingestion workers
+        job_id = ingestion_queue.submit(
+            file_id=file_uuid,
+            filename=filename,
+            file_path=f"./files/{file_uuid}.{file_extension}",
+            file_type=file_extension,
+            collection=collection,
+            docs_type=docs_type,
+            tags=tags,
+        )
+
         return FileUploadSuccessModel(
             status_code=200,
             file_id=file_uuid,
+            job_id=job_id,
         )
 
     raise HTTPException(status_code=500, detail="Internal server error")
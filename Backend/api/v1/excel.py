@@ -15,11 +15,14 @@ from Backend.utils.helper.model.api.v1.excel import (
     QuestionsUpdateSuccessModel,
 )
 from Backend.utils.RAG.excel_handler import excel_client
+from Backend.utils.database.async_database import AsyncController
 from Backend.utils.helper.logger import CustomLoggerHandler
 
 logger = CustomLoggerHandler().get_logger()
 
 router = APIRouter()
+# parsing and the database queries run in the database executor
+async_excel_client = AsyncController(excel_client)
 
 
 @router.post("/upload/")
@@ -64,7 +67,7 @@ async def upload_excel_file(
 
         # 解析 Excel 內容為題目資料
         try:
-            questions = excel_client.parse_excel_to_questions(
+            questions = await async_excel_client.parse_excel_to_questions(
                 content_b64, excel_file.content_type
             )
         except ValueError as e:
@@ -78,7 +81,7 @@ async def upload_excel_file(
 
         logger.info(f"Parsed question: {len(questions)}")
         # 儲存題目到資料庫
-        success = excel_client.save_questions_to_db(
+        success = await async_excel_client.save_questions_to_db(
             questions, file_id, file_name, doc_type
         )
         logger.info(success)
@@ -104,7 +107,7 @@ async def upload_excel_file(
 async def get_file_list(doc_type: str) -> FileListSuccessModel:
     """取得檔案列表"""
     try:
-        file_list = excel_client.get_file_list(doc_type)
+        file_list = await async_excel_client.get_file_list(doc_type)
         return FileListSuccessModel(docs_list=file_list)
     except Exception as e:
         logger.error(f"取得檔案列表錯誤: {str(e)}")
@@ -128,7 +131,7 @@ async def get_questions(file_id: str) -> QuestionsSuccessModel:
     """
     try:
         # 獲取題目列表和檔案名稱
-        questions, file_name = excel_client.get_questions(file_id)
+        questions, file_name = await async_excel_client.get_questions(file_id)
 
         if not questions:
             logger.warning(f"找不到檔案ID: {file_id} 的題目")
@@ -265,7 +268,7 @@ async def update_questions(
             raise HTTPException(status_code=400, detail="沒有提供要更新的題目")
 
         # 更新題目
-        result = excel_client.update_questions(file_id, questions)
+        result = await async_excel_client.update_questions(file_id, questions)
 
         if not result.success:
             error_message = result.error or "未知錯誤"
@@ -295,7 +298,7 @@ async def update_questions(
 async def delete_file(file_id: str) -> FileDeleteSuccessModel:
     """刪除檔案及其題目"""
     try:
-        success = excel_client.delete_file(file_id)
+        success = await async_excel_client.delete_file(file_id)
 
         if not success:
             raise HTTPException(status_code=404, detail=f"找不到檔案ID: {file_id}")
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.database.management import ManagementDatabaseController
-from Backend.utils.database.database import mysql_client
+from Backend.utils.database.async_database import AsyncController, async_mysql_client
 from Backend.utils.helper.model.api.v1.management import UserModel, ClassModel
 from Backend.utils.helper.api.dependency import require_teacher, UserPayload
 
@@ -17,7 +17,7 @@ import os
 
 logger = CustomLoggerHandler().get_logger()
 logger.debug("| Admin Loading Finished |")
-management_database_controller = ManagementDatabaseController()
+management_database_controller = AsyncController(ManagementDatabaseController())
 
 # development
 GLOBAL_DEBUG_MODE = os.getenv("DEBUG")
@@ -32,20 +32,20 @@ router = APIRouter(dependencies=[Depends(require_teacher)])
 
 @router.get("/teacher-list/")
 async def get_teacher_list() -> list[UserModel]:
-    data = management_database_controller.query_teacher_list()
+    data = await management_database_controller.query_teacher_list()
     return data if data else []
 
 
 @router.get("/user-list/")
 async def get_user_list() -> list[UserModel]:
-    data = management_database_controller.query_user_list()
+    data = await management_database_controller.query_user_list()
     logger.debug(data)
     return data if data else []
 
 
 @router.get("/class-list/")
 async def get_class_list() -> list[ClassModel]:
-    data = management_database_controller.get_class_list()
+    data = await management_database_controller.get_class_list()
     logger.debug(data)
     return data if data else []
 
@@ -53,32 +53,32 @@ async def get_class_list() -> list[ClassModel]:
 @router.get("/class-list/user-id/")
 async def get_class_list_by_user_id(user_payload: UserPayload) -> list[ClassModel]:
     user_id = user_payload.user_id
-    data = management_database_controller.get_class_by_user_id(user_id=user_id)
+    data = await management_database_controller.get_class_by_user_id(user_id=user_id)
     logger.debug(data)
     return data if data else []
 
 
 @router.get("/class-user-list/")
 async def get_class_user_list(class_id: int) -> list[UserModel]:
-    data = management_database_controller.query_class_user_list(class_id)
+    data = await management_database_controller.query_class_user_list(class_id)
     logger.debug(data)
     return data if data else []
 
 
 @router.post("/new-class/")
 async def new_class(classname: str) -> int:
-    data = management_database_controller.new_class(classname)
+    data = await management_database_controller.new_class(classname)
     logger.debug(data)
     return data
 
 
 @router.post("/new-user/")
 async def new_user(user_id: int, class_id: int) -> int:
-    role_id = mysql_client.query_role_id_by_user_id(user_id)
+    role_id = await async_mysql_client.query_role_id_by_user_id(user_id)
 
     if role_id is None:
         raise HTTPException(status_code=404, detail="User not found")
-    data = management_database_controller.new_user(
+    data = await management_database_controller.new_user(
         class_id=class_id, user_id=user_id, role_id=role_id
     )
     logger.debug(data)
@@ -87,14 +87,14 @@ async def new_user(user_id: int, class_id: int) -> int:
 
 @router.delete("/delete-class/")
 async def delete_class(class_id: int) -> int:
-    data = management_database_controller.delete_class(class_id=class_id)
+    data = await management_database_controller.delete_class(class_id=class_id)
     logger.debug(data)
     return data
 
 
 @router.delete("/delete-user/")
 async def delete_user(class_id: int, user_id: int) -> int:
-    data = management_database_controller.delete_user(
+    data = await management_database_controller.delete_user(
         class_id=class_id, user_id=user_id
     )
     logger.debug(data)
@@ -6,6 +6,7 @@ from Backend.utils.helper.logger import CustomLoggerHandler
 
 
 from Backend.utils.database.mock import MockerDatabaseController
+from Backend.utils.database.async_database import AsyncController
 from Backend.utils.helper.model.api.v1.mock import (
     ExamParamsModel,
     TagModel,
@@ -43,7 +44,7 @@ if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
 
 
 router = APIRouter(dependencies=[Depends(require_student)])
-mysql_client = MockerDatabaseController()
+mysql_client = AsyncController(MockerDatabaseController())
 
 
 def encode_image_to_base64(file_path: Path) -> str:
@@ -69,7 +70,7 @@ async def get_mock_info(mock_type: MOCK_TYPE, payload: UserPayload) -> list[Exam
     """
     logger.debug("Get mock exam lists")
     user_id = int(payload.user_id)
-    mock_exam_data = mysql_client.query_mock_exam_list(mock_type, user_id)
+    mock_exam_data = await mysql_client.query_mock_exam_list(mock_type, user_id)
 
     return mock_exam_data
 
@@ -86,7 +87,7 @@ async def create_exam(exam_prams: ExamParamsModel) -> int:
     """
 
     logger.debug(exam_prams)
-    new_exam_id = mysql_client.insert_new_mock_exam_and_class(
+    new_exam_id = await mysql_client.insert_new_mock_exam_and_class(
         class_id=exam_prams.class_id,
         exam_name=exam_prams.exam_name,
         exam_type=exam_prams.exam_type,
@@ -100,7 +101,7 @@ async def create_exam(exam_prams: ExamParamsModel) -> int:
 
 @router.post("/new/exam/{exam_id}/question/")
 async def create_exam_question(exam_id: int, question_text: str) -> int:
-    question_id = mysql_client.insert_new_exam_question(
+    question_id = await mysql_client.insert_new_exam_question(
         exam_id=exam_id, question_text=question_text
     )
 
@@ -116,7 +117,7 @@ async def create_exam_question_option(
 ) -> int:
     option_text = option_prams.option_text
     is_correct = option_prams.is_correct
-    option_id = mysql_client.insert_new_exam_question_option(
+    option_id = await mysql_client.insert_new_exam_question_option(
         question_id=question_id, option_text=option_text, is_correct=is_correct
     )
 
@@ -143,7 +144,7 @@ async def create_exam_question_image(
         image_data = base64.b64decode(base64_image.base64_image)
         with image_path.open("wb") as image_file:
             image_file.write(image_data)
-        success = mysql_client.insert_new_exam_question_image(
+        success = await mysql_client.insert_new_exam_question_image(
             question_id=question_id,
             image_uuid=image_uuid,
         )
@@ -166,26 +167,26 @@ async def create_exam_question_image(
 
 @router.patch("/disable/exam/{exam_id}/")
 async def disable_exam(exam_id: int) -> bool:
-    return mysql_client.disable_exam(exam_id=exam_id)
+    return await mysql_client.disable_exam(exam_id=exam_id)
 
 
 @router.patch("/disable/exam/{exam_id}/question/{question_id}/")
 async def disable_exam_question(exam_id: int, question_id: int) -> bool:
-    return mysql_client.disable_exam_question(question_id=question_id)
+    return await mysql_client.disable_exam_question(question_id=question_id)
 
 
 @router.patch("/disable/exam/{exam_id}/question/{question_id}/option/{option_id}/")
 async def disable_exam_question_option(
     exam_id: int, question_id: int, option_id: int
 ) -> bool:
-    return mysql_client.disable_exam_question_option(option_id=option_id)
+    return await mysql_client.disable_exam_question_option(option_id=option_id)
 
 
 @router.patch("/disable/exam/{exam_id}/question/{question_id}/image/{image_uuid}/")
 async def disable_exam_question_image(
     exam_id: int, question_id: int, image_uuid: str
 ) -> bool:
-    success = mysql_client.disable_exam_question_image(
+    success = await mysql_client.disable_exam_question_image(
         exam_id=exam_id,
         question_id=question_id,
         image_uuid=image_uuid,
@@ -198,7 +199,7 @@ async def disable_exam_question_image(
 @router.patch("/modify/exam/{exam_id}/")
 async def modify_exam(exam_id: int, exam_prams: ExamParamsModel) -> bool:
     logger.debug((exam_id, exam_prams))
-    success = mysql_client.modify_exam(
+    success = await mysql_client.modify_exam(
         class_id=exam_prams.class_id,
         exam_id=exam_id,
         exam_name=exam_prams.exam_name,
@@ -216,7 +217,7 @@ async def modify_exam_question(
     exam_id: int, question_id: int, question_text: str
 ) -> int:
     logger.debug((exam_id, question_text))
-    success = mysql_client.modify_exam_question(
+    success = await mysql_client.modify_exam_question(
         question_id=question_id, question_text=question_text
     )
 
@@ -231,7 +232,7 @@ async def modify_exam_question_option(
 ) -> bool:
     option_text = option_prams.option_text
     is_correct = option_prams.is_correct
-    success = mysql_client.modify_exam_question_option(
+    success = await mysql_client.modify_exam_question_option(
         option_id=option_id,
         option_text=option_text,
         is_correct=is_correct,
@@ -246,7 +247,7 @@ async def modify_exam_question_option(
 async def modify_exam_question_image(
     exam_id: int, question_id: int, image_uuid: str, base64_image: str
 ) -> bool:
-    success = mysql_client.modify_exam_question_image(
+    success = await mysql_client.modify_exam_question_image(
         exam_id=exam_id,
         question_id=question_id,
         image_uuid=image_uuid,
@@ -259,34 +260,36 @@ async def modify_exam_question_image(
 
 @router.get("/info/{exam_id}/exam/")
 async def get_exam_info(exam_id: int) -> ExamsModel:
-    return mysql_client.query_exam_info(exam_id=exam_id)
+    return await mysql_client.query_exam_info(exam_id=exam_id)
 
 
 @router.get("/exam/{exam_id}/question/")
 async def get_exam_question(exam_id: int) -> list[QuestionModel]:
-    return mysql_client.query_exam_question(exam_id=exam_id)
+    return await mysql_client.query_exam_question(exam_id=exam_id)
 
 
 @router.get("/info/{question_id}/question/")
 async def get_exam_question_info(question_id: int) -> QuestionModel:
-    return mysql_client.query_question_info(question_id=question_id)
+    return await mysql_client.query_question_info(question_id=question_id)
 
 
 @router.get("/exam/{exam_id}/question/{question_id}/option/")
 async def get_exam_question_option(exam_id: int, question_id: int) -> list[OptionModel]:
-    return mysql_client.query_question_option(exam_id=exam_id, question_id=question_id)
+    return await mysql_client.query_question_option(
+        exam_id=exam_id, question_id=question_id
+    )
 
 
 @router.get("/info/{option_id}/option/")
 async def get_exam_question_option_info(option_id: int) -> OptionModel:
-    return mysql_client.query_question_option_info(option_id=option_id)
+    return await mysql_client.query_question_option_info(option_id=option_id)
 
 
 @router.get("/exam/{exam_id}/question/{question_id}/image/")
 async def get_exam_question_image(
     exam_id: int, question_id: int
 ) -> list[QuestionImageBase64Model]:
-    question_images = mysql_client.query_question_image(
+    question_images = await mysql_client.query_question_image(
         exam_id=exam_id, question_id=question_id
     )
     encoded_question_images: list[QuestionImageBase64Model] = []
@@ -311,12 +314,12 @@ async def get_exam_question_image(
 
 @router.get("/info/{image_uuid}/image/")
 async def get_exam_question_image_info(image_uuid: str) -> QuestionImageModel:
-    return mysql_client.query_question_image_info(image_uuid=image_uuid)
+    return await mysql_client.query_question_image_info(image_uuid=image_uuid)
 
 
 @router.get("/tag/list/")
 async def get_tag_list() -> list[TagModel]:
-    tag_list = mysql_client.query_tag_list()
+    tag_list = await mysql_client.query_tag_list()
     logger.info(tag_list)
 
     return tag_list
@@ -324,7 +327,7 @@ async def get_tag_list() -> list[TagModel]:
 
 @router.get("/tag/{tag_id}/")
 async def get_tag(tag_id: int) -> TagModel:
-    tag = mysql_client.query_tag(tag_id=tag_id)
+    tag = await mysql_client.query_tag(tag_id=tag_id)
 
     if not tag:
         raise HTTPException(status_code=404, detail="Tag Not Found")
@@ -335,27 +338,31 @@ async def get_tag(tag_id: int) -> TagModel:
 
 @router.get("/tag/question/{question_id}/")
 async def get_question_tag(question_id: int) -> list[TagModel]:
-    return mysql_client.query_question_tags(question_id=question_id)
+    return await mysql_client.query_question_tags(question_id=question_id)
 
 
 @router.post("/tag/create/")
 async def create_tag(tag_name: str, tag_description: str) -> bool:
-    return mysql_client.create_tag(tag_name=tag_name, tag_description=tag_description)
+    return await mysql_client.create_tag(
+        tag_name=tag_name, tag_description=tag_description
+    )
 
 
 @router.post("/tag/add/{question_id}/")
 async def add_tag(tag_id: int, question_id: int) -> bool:
-    return mysql_client.add_question_tag(question_id=question_id, tag_id=tag_id)
+    return await mysql_client.add_question_tag(question_id=question_id, tag_id=tag_id)
 
 
 @router.delete("/tag/remove/{question_id}/")
 async def remove_question_tag(tag_id: int, question_id: int) -> bool:
-    return mysql_client.delete_question_tag(question_id=question_id, tag_id=tag_id)
+    return await mysql_client.delete_question_tag(
+        question_id=question_id, tag_id=tag_id
+    )
 
 
 @router.delete("/tag/delete/")
 async def delete_tag(tag_id: int) -> bool:
-    return mysql_client.disable_tag(tag_id=tag_id)
+    return await mysql_client.disable_tag(tag_id=tag_id)
 
 
 @router.post("/submit/")
@@ -364,24 +371,15 @@ async def submit_mock_exam(
 ) -> int:
     user_id = int(user_payload.user_id)
     user_submitted_answer = submitted_exam.answer
-
-    correct_answer = mysql_client.query_exam_correct_answer(
-        exam_id=submitted_exam.exam_id
-    )
     logger.debug(user_submitted_answer)
-    score = 0
-    for user_ans, correct_ans in zip(user_submitted_answer, correct_answer):
-        if user_ans.selected_option_id == correct_ans.selected_option_id:
-            score += 1
 
-    submitted_exam_id = mysql_client.insert_submitted_exam(
-        exam_id=submitted_exam.exam_id, user_id=user_id, score=score
+    # graded against the cached answer key of the exam and inserted in one transaction
+    submitted_exam_id = await mysql_client.insert_graded_submission(
+        exam_id=submitted_exam.exam_id,
+        user_id=user_id,
+        answers=user_submitted_answer,
     )
+    if submitted_exam_id is None:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
 
-    for user_ans in user_submitted_answer:
-        mysql_client.insert_submitted_answer(
-            submission_id=submitted_exam_id,
-            question_id=user_ans.question_id,
-            selection_option_id=user_ans.selected_option_id,
-        )
     return submitted_exam_id
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 
 from Backend.utils.database.result import ResultDatabaseController
+from Backend.utils.database.async_database import AsyncController
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.helper.api.dependency import require_student, TAPayload
 from Backend.utils.helper.model.api.v1.result import MockResult
@@ -27,7 +28,7 @@ if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
     load_dotenv("./.env")
 
 router = APIRouter(dependencies=[Depends(require_student)])
-mysql_client = ResultDatabaseController()
+mysql_client = AsyncController(ResultDatabaseController())
 
 
 def database_frame_to_xlsx(data: list[MockResult]) -> Path:
@@ -50,7 +51,7 @@ async def get_user_mock_exam_result(submission_id: int) -> MockResult:
         ExamResultModel
     """
     logger.debug(submission_id)
-    exam_results = mysql_client.query_mock_exam_result(submission_id)
+    exam_results = await mysql_client.query_mock_exam_result(submission_id)
     if not exam_results:
         raise HTTPException(status_code=404, detail="Exam Submission ID not Found")
     logger.debug(exam_results)
@@ -62,7 +63,7 @@ async def get_user_mock_exam_result(submission_id: int) -> MockResult:
 async def get_mock_exam_results_by_class_id(
     class_id: int, payload: TAPayload
 ) -> list[MockResult]:
-    exam_data = mysql_client.query_mock_exam_result_by_class(class_id=class_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_class(class_id=class_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="Class ID not Found")
 
@@ -73,7 +74,7 @@ async def get_mock_exam_results_by_class_id(
 async def get_mock_exam_results_by_class_id_excel(
     class_id: int, payload: TAPayload
 ) -> FileResponse:
-    exam_data = mysql_client.query_mock_exam_result_by_class(class_id=class_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_class(class_id=class_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="Class ID not Found")
 
@@ -90,7 +91,7 @@ async def get_mock_exam_results_by_class_id_excel(
 async def get_mock_exam_results_by_exam_id(
     exam_id: int, payload: TAPayload
 ) -> list[MockResult]:
-    exam_data = mysql_client.query_mock_exam_result_by_exam(exam_id=exam_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_exam(exam_id=exam_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="Exam ID not Found")
 
@@ -101,7 +102,7 @@ async def get_mock_exam_results_by_exam_id(
 async def get_mock_exam_results_by_exam_id_excel(
     exam_id: int, payload: TAPayload
 ) -> FileResponse:
-    exam_data = mysql_client.query_mock_exam_result_by_exam(exam_id=exam_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_exam(exam_id=exam_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="Exam ID not Found")
 
@@ -117,7 +118,7 @@ async def get_mock_exam_results_by_exam_id_excel(
 async def get_mock_exam_results_by_user_id(
     user_id: int, payload: TAPayload
 ) -> list[MockResult]:
-    exam_data = mysql_client.query_mock_exam_result_by_user(user_id=user_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_user(user_id=user_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="User ID not Found")
 
@@ -128,7 +129,7 @@ async def get_mock_exam_results_by_user_id(
 async def get_mock_exam_results_by_user_id_excel(
     user_id: int, payload: TAPayload
 ) -> FileResponse:
-    exam_data = mysql_client.query_mock_exam_result_by_user(user_id=user_id)
+    exam_data = await mysql_client.query_mock_exam_result_by_user(user_id=user_id)
     if not exam_data:
         raise HTTPException(status_code=404, detail="User ID not Found")
 
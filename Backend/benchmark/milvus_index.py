@@ -0,0 +1,200 @@
+# Code by AkinoAlice@TyrantRey
+
+"""
+Benchmark Milvus index configs against exact search on the same corpus.
+
+Every config is built in turn on a temporary collection, then each query is run
+one at a time to report QPS, p50/p99 latency and recall@k against the exact
+nearest neighbours, which is what a FLAT index returns.
+
+The corpus is either synthetic (clustered gaussian vectors) or exported vectors
+in a .npy file of shape (n, dim). Configs are MilvusIndexConfigModel JSON objects.
+
+Usage:
+    python -m Backend.benchmark.milvus_index --synthetic 100000 --dim 768 \\
+        --config '{"index_type": "IVF_FLAT", "search_params": {"nprobe": 16}}' \\
+        --config '{"index_type": "HNSW", "search_params": {"ef": 64}}'
+"""
+
+from Backend.utils.helper.model.database.vector_database import MilvusIndexConfigModel
+from Backend.utils.database.milvus_index import resolve_index_config
+
+from pymilvus import MilvusClient  # type: ignore[import-untyped]
+from pymilvus import DataType
+
+from os import getenv
+
+import numpy as np
+import argparse
+import json
+import time
+import uuid
+
+# development
+if getenv("DEBUG") == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+def synthetic_corpus(size: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Clustered vectors, uniform random data makes every IVF index look bad"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 1000, 1), dimension), dtype=np.float32)
+    labels = rng.integers(0, len(centers), size)
+    noise = rng.standard_normal((size, dimension), dtype=np.float32) * 0.3
+    return centers[labels] + noise
+
+
+def exact_neighbours(
+    corpus: np.ndarray, queries: np.ndarray, k: int, metric_type: str
+) -> np.ndarray:
+    """Exact top k of every query, in chunks to bound memory"""
+    if metric_type == "COSINE":
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+    norms = np.einsum("ij,ij->i", corpus, corpus)
+    neighbours = []
+    for start in range(0, len(queries), 256):
+        products = queries[start : start + 256] @ corpus.T
+        scores = -products if metric_type in ["IP", "COSINE"] else norms - 2 * products
+        neighbours.append(np.argsort(scores, axis=1)[:, :k])
+    return np.concatenate(neighbours)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    corpus_group = parser.add_mutually_exclusive_group(required=True)
+    corpus_group.add_argument("--corpus", help=".npy file of exported vectors")
+    corpus_group.add_argument(
+        "--synthetic", type=int, help="number of synthetic vectors"
+    )
+    parser.add_argument("--dim", type=int, default=768, help="synthetic dimension")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument(
+        "--config",
+        action="append",
+        help="MilvusIndexConfigModel JSON, repeatable, defaults to the common index types",
+    )
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = np.ascontiguousarray(np.load(args.corpus), dtype=np.float32)
+    else:
+        corpus = synthetic_corpus(args.synthetic, args.dim)
+    dimension = corpus.shape[1]
+
+    # queries are perturbed corpus vectors, close to real questions about the documents
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.integers(0, len(corpus), args.queries)]
+    queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.1
+
+    configs = [
+        resolve_index_config(MilvusIndexConfigModel(**json.loads(config)), dimension)
+        for config in args.config
+        or [
+            '{"index_type": "FLAT"}',
+            '{"index_type": "IVF_FLAT"}',
+            '{"index_type": "IVF_SQ8"}',
+            '{"index_type": "IVF_PQ"}',
+            '{"index_type": "HNSW"}',
+        ]
+    ]
+
+    client = MilvusClient(uri=f"http://{getenv('MILVUS_HOST')}:{getenv('MILVUS_PORT')}")
+    collection_name = f"benchmark_{uuid.uuid4().hex[:8]}"
+
+    schema = MilvusClient.create_schema(auto_id=False, enable_dynamic_field=False)
+    schema.add_field(field_name="id", datatype=DataType.INT64, is_primary=True)
+    schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=dimension)
+    client.create_collection(collection_name=collection_name, schema=schema)
+
+    try:
+        for start in range(0, len(corpus), 5000):
+            client.insert(
+                collection_name=collection_name,
+                data=[
+                    {"id": start + i, "vector": vector}
+                    for i, vector in enumerate(corpus[start : start + 5000])
+                ],
+            )
+        client.flush(collection_name=collection_name)
+
+        truth: dict[str, np.ndarray] = {}
+
+        print(f"corpus {corpus.shape}, {len(queries)} queries, k = {args.k}")
+        print(
+            f"{'index':<10} {'build s':>8} {'qps':>8} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'recall':>7}  params"
+        )
+
+        for config in configs:
+            if config.metric_type not in truth:
+                truth[config.metric_type] = exact_neighbours(
+                    corpus, queries, args.k, config.metric_type
+                )
+
+            client.release_collection(collection_name=collection_name)
+            for index_name in client.list_indexes(collection_name=collection_name):
+                client.drop_index(
+                    collection_name=collection_name, index_name=index_name
+                )
+
+            index_params = client.prepare_index_params()
+            index_params.add_index(
+                field_name="vector",
+                index_type=config.index_type,
+                metric_type=config.metric_type,
+                params=config.index_params,
+            )
+
+            build_start = time.perf_counter()
+            client.create_index(
+                collection_name=collection_name, index_params=index_params
+            )
+            client.load_collection(collection_name=collection_name)
+            build_time = time.perf_counter() - build_start
+
+            search_params = {
+                "metric_type": config.metric_type,
+                "params": config.search_params,
+            }
+            # warm up
+            client.search(
+                collection_name=collection_name,
+                data=[queries[0]],
+                limit=args.k,
+                search_params=search_params,
+            )
+
+            latencies = []
+            hits = 0
+            total_start = time.perf_counter()
+            for query, neighbours in zip(queries, truth[config.metric_type]):
+                start = time.perf_counter()
+                result = client.search(
+                    collection_name=collection_name,
+                    data=[query],
+                    limit=args.k,
+                    search_params=search_params,
+                )[0]
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len({hit["id"] for hit in result} & set(neighbours.tolist()))
+            total_time = time.perf_counter() - total_start
+
+            print(
+                f"{config.index_type:<10} {build_time:>8.2f} "
+                f"{len(queries) / total_time:>8.1f} "
+                f"{np.percentile(latencies, 50):>8.2f} "
+                f"{np.percentile(latencies, 99):>8.2f} "
+                f"{hits / (len(queries) * args.k):>7.3f}  "
+                f"{json.dumps(config.index_params)} {json.dumps(config.search_params)}"
+            )
+    finally:
+        client.drop_collection(collection_name=collection_name)
+
+
+if __name__ == "__main__":
+    main()
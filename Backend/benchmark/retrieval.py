@@ -0,0 +1,91 @@
+# Code by AkinoAlice@TyrantRey
+
+"""
+Compare the latency and recall of the vector, keyword and hybrid retrieval modes.
+
+The question file is JSON lines, one question per line:
+    {"question": "什麼是需求的價格彈性", "relevant": ["價格彈性"]}
+A question is recalled when any of the top k chunks contains one of its `relevant`
+strings or comes from a source listed in it.
+
+Usage:
+    python -m Backend.benchmark.retrieval questions.jsonl --collection default -k 3
+"""
+
+from Backend.utils.database.vector_database import milvus_client
+from Backend.utils.RAG.keyword_index import keyword_index, reciprocal_rank_fusion
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.helper.model.database.vector_database import SearchSimilarityModel
+
+from typing import Callable
+
+import numpy as np
+import argparse
+import json
+import time
+
+
+def recalled(chunks: list[SearchSimilarityModel], relevant: list[str]) -> bool:
+    return any(
+        target in chunk.content or target == chunk.source
+        for chunk in chunks
+        for target in relevant
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("questions", help="JSON lines file of questions")
+    parser.add_argument("--collection", default="default")
+    parser.add_argument("-k", type=int, default=3, help="chunks retrieved per question")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as file:
+        questions = [json.loads(line) for line in file if line.strip()]
+
+    # embedding is shared by every mode, measure the retrieval only
+    vectors = encoder_client.encode_batch([item["question"] for item in questions])
+
+    def vector_search(question: str, vector: np.ndarray, limit: int):
+        return milvus_client.search_similarity(
+            vector, collection_name=args.collection, limit=limit
+        )
+
+    def keyword_search(question: str, vector: np.ndarray, limit: int):
+        return keyword_index.search(question, args.collection, limit)
+
+    def hybrid_search(question: str, vector: np.ndarray, limit: int):
+        return reciprocal_rank_fusion(
+            [
+                vector_search(question, vector, keyword_index.fetch_k),
+                keyword_search(question, vector, keyword_index.fetch_k),
+            ],
+            limit,
+            keyword_index.rrf_k,
+        )
+
+    modes: dict[str, Callable] = {
+        "vector": vector_search,
+        "keyword": keyword_search,
+        "hybrid": hybrid_search,
+    }
+
+    print(f"{len(questions)} questions, k = {args.k}")
+    print(f"{'mode':<8} {'p50 ms':>8} {'p99 ms':>8} {'recall@k':>9}")
+    for mode, search in modes.items():
+        latencies = []
+        hits = 0
+        for item, vector in zip(questions, vectors):
+            start = time.perf_counter()
+            chunks = search(item["question"], vector, args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += recalled(chunks, item["relevant"])
+
+        print(
+            f"{mode:<8} {np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 99):>8.2f} {hits / len(questions):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
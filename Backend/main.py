@@ -11,9 +11,7 @@ from Backend.api.v1 import (
     excel,
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
-from Backend.utils.database.database import mysql_client
 
-from apscheduler.schedulers.background import BackgroundScheduler  # type:ignore[import-untyped]
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request
 
@@ -125,11 +123,6 @@ logger.debug("| Excel Loading Finished |")
 
 logger.debug("| Backend Loading Finished |")
 
-# Keep mysql working
-scheduler = BackgroundScheduler()
-scheduler.add_job(mysql_client.keep_alive, "interval", minutes=30)
-scheduler.start()
-
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
@@ -0,0 +1,192 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.RAG.answer_cache import (
+    AnswerCacheStatsModel,
+    CachedAnswerModel,
+)
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from collections import OrderedDict
+from typing import Literal, Optional
+from os import getenv
+
+import numpy as np
+import threading
+import hashlib
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated answers.
+
+    Answers are grouped by (collection, question_type, language, retrieved documents),
+    inside a group a question hits when the cosine similarity between its embedding
+    and a cached question embedding reaches ANSWER_CACHE_THRESHOLD.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _cache_size = getenv("ANSWER_CACHE_SIZE", "1024")
+        _threshold = getenv("ANSWER_CACHE_THRESHOLD", "0.95")
+
+        assert _cache_size.isdigit(), (
+            "ANSWER_CACHE_SIZE environment variable is not valid"
+        )
+        assert 0 < float(_threshold) <= 1, (
+            "ANSWER_CACHE_THRESHOLD environment variable is not valid"
+        )
+
+        self.cache_size = int(_cache_size)
+        self.threshold = float(_threshold)
+
+        # entry id -> (group key, normalized question vector, cached answer)
+        self.entries: OrderedDict[
+            int, tuple[tuple[str, ...], np.ndarray, CachedAnswerModel]
+        ] = OrderedDict()
+        self.groups: dict[tuple[str, ...], list[int]] = {}
+        self.next_entry_id = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        self.logger.debug(
+            f"Answer cache size: {self.cache_size}, threshold: {self.threshold}"
+        )
+
+    @staticmethod
+    def _group_key(
+        collection: str,
+        question_type: Literal["CHATTING", "TESTING", "THEOREM"],
+        language: Literal["ENGLISH", "CHINESE"],
+        queried_document: list[str],
+    ) -> tuple[str, ...]:
+        documents_hash = hashlib.sha256(
+            "\0".join(sorted(queried_document)).encode()
+        ).hexdigest()
+        return (collection, question_type, language, documents_hash)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(
+        self,
+        question_vector: np.ndarray,
+        collection: str,
+        question_type: Literal["CHATTING", "TESTING", "THEOREM"],
+        language: Literal["ENGLISH", "CHINESE"],
+        queried_document: list[str],
+    ) -> Optional[CachedAnswerModel]:
+        """
+        Look up a cached answer for a semantically equivalent question.
+
+        Args:
+            question_vector (np.ndarray): Embedding of the question.
+            collection (str): Milvus collection the documents were retrieved from.
+            question_type (Literal["CHATTING", "TESTING", "THEOREM"]): Type of prompt.
+            language (Literal["ENGLISH", "CHINESE"]): Language of the response.
+            queried_document (list[str]): Contents of the retrieved documents.
+
+        Returns:
+            Optional[CachedAnswerModel]: The most similar cached answer, None on a miss.
+        """
+        key = self._group_key(collection, question_type, language, queried_document)
+        query = self._normalize(question_vector)
+
+        with self.lock:
+            entry_ids = self.groups.get(key, [])
+            if not entry_ids:
+                self.misses += 1
+                return None
+
+            matrix = np.stack([self.entries[entry_id][1] for entry_id in entry_ids])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry_id = entry_ids[best]
+            self.entries.move_to_end(entry_id)
+            cached_answer = self.entries[entry_id][2]
+
+        return cached_answer.model_copy(
+            update={"similarity": float(similarities[best])}
+        )
+
+    def set(
+        self,
+        question_vector: np.ndarray,
+        collection: str,
+        question_type: Literal["CHATTING", "TESTING", "THEOREM"],
+        language: Literal["ENGLISH", "CHINESE"],
+        queried_document: list[str],
+        answer: str,
+        token_size: int,
+    ) -> None:
+        """Store a generated answer, evicting the least recently used entries when full"""
+        if self.cache_size == 0 or not answer:
+            return
+
+        key = self._group_key(collection, question_type, language, queried_document)
+
+        with self.lock:
+            entry_id = self.next_entry_id
+            self.next_entry_id += 1
+
+            self.entries[entry_id] = (
+                key,
+                self._normalize(question_vector),
+                CachedAnswerModel(answer=answer, token_size=token_size, similarity=1.0),
+            )
+            self.groups.setdefault(key, []).append(entry_id)
+
+            while len(self.entries) > self.cache_size:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, collection: str) -> None:
+        """Drop every cached answer of `collection`, called after it is re-ingested"""
+        with self.lock:
+            stale_ids = [
+                entry_id
+                for entry_id, (key, _, _) in self.entries.items()
+                if key[0] == collection
+            ]
+            for entry_id in stale_ids:
+                self._remove(entry_id)
+
+        self.logger.info(f"Invalidated {len(stale_ids)} cached answers of {collection}")
+
+    def stats(self) -> AnswerCacheStatsModel:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return AnswerCacheStatsModel(
+                entries=len(self.entries),
+                hits=self.hits,
+                misses=self.misses,
+                hit_rate=self.hits / lookups if lookups else 0.0,
+            )
+
+    def _remove(self, entry_id: int) -> None:
+        key, _, _ = self.entries.pop(entry_id)
+        self.groups[key].remove(entry_id)
+        if not self.groups[key]:
+            del self.groups[key]
+
+
+answer_cache = AnswerCache()
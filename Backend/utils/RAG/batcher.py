@@ -0,0 +1,228 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import (
+    SearchSimilarityModel,
+    SearchFilterModel,
+)
+from Backend.utils.helper.model.RAG.batcher import MicroBatchStatsModel
+from Backend.utils.database.vector_database import milvus_client
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+from collections import deque
+from os import getenv
+
+import numpy as np
+import asyncio
+import time
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+class MicroBatcher(Generic[ItemT, ResultT]):
+    """
+    Coalesce concurrent calls into batches.
+
+    The first item of a key opens a window of `window` seconds, every item with the
+    same key submitted before the window closes (or until `max_size` items are queued)
+    is handed to `handler` in a single call, whose results are fanned back out to the
+    waiting callers in submission order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Hashable, list[ItemT]], Awaitable[list[ResultT]]],
+        window: float,
+        max_size: int,
+    ) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+
+        # key -> queued (item, future, enqueue time)
+        self.pending: dict[
+            Hashable, list[tuple[ItemT, asyncio.Future[ResultT], float]]
+        ] = {}
+        self.timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task[None]] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.queue_delays: deque[float] = deque(maxlen=4096)
+
+    async def submit(self, key: Hashable, item: ItemT) -> ResultT:
+        """
+        Queue an item and wait for the result of its batch.
+
+        Args:
+            key (Hashable): Only items with equal keys are batched together.
+            item (ItemT): The item passed to the handler.
+
+        Returns:
+            ResultT: The handler result at the position of this item.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[ResultT] = loop.create_future()
+
+        queue = self.pending.setdefault(key, [])
+        queue.append((item, future, time.perf_counter()))
+
+        if len(queue) >= self.max_size:
+            self._flush(key)
+        elif len(queue) == 1:
+            self.timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def stats(self) -> MicroBatchStatsModel:
+        delays = np.asarray(self.queue_delays or [0.0]) * 1000
+        return MicroBatchStatsModel(
+            name=self.name,
+            batches=self.batches,
+            items=self.items,
+            mean_batch_size=self.items / self.batches if self.batches else 0.0,
+            max_batch_size=self.max_batch_size,
+            queue_delay_p50_ms=float(np.percentile(delays, 50)),
+            queue_delay_p99_ms=float(np.percentile(delays, 99)),
+        )
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        queue = self.pending.pop(key, [])
+        if not queue:
+            return
+
+        now = time.perf_counter()
+        self.batches += 1
+        self.items += len(queue)
+        self.max_batch_size = max(self.max_batch_size, len(queue))
+        self.queue_delays.extend(now - enqueued_at for _, _, enqueued_at in queue)
+
+        task = asyncio.ensure_future(self._run(key, queue))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(
+        self,
+        key: Hashable,
+        queue: list[tuple[ItemT, asyncio.Future[ResultT], float]],
+    ) -> None:
+        try:
+            results = await self.handler(key, [item for item, _, _ in queue])
+            assert len(results) == len(queue), (
+                f"{self.name} handler returned {len(results)} results for {len(queue)} items"
+            )
+        except Exception as error:
+            self.logger.error(f"{self.name} batch of {len(queue)} failed: {error}")
+            for _, future, _ in queue:
+                # the caller may have been cancelled while waiting
+                if not future.done():
+                    future.set_exception(error)
+            return
+        except BaseException:
+            # cancelled (or interrupted), the waiting callers are cancelled with the batch
+            for _, future, _ in queue:
+                future.cancel()
+            raise
+
+        for (_, future, _), result in zip(queue, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class QuestionBatcher:
+    """
+    Micro batching of the question embeddings and vector searches.
+
+    Concurrent questions are embedded with one multi input embedding call, and
+    questions searching the same collection with the same limit and filter are
+    sent to the vector database as one multi vector search.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _window = getenv("QUESTION_BATCH_WINDOW_MS", "10")
+        _max_size = getenv("QUESTION_BATCH_MAX_SIZE", "32")
+
+        assert _window.replace(".", "", 1).isdigit(), (
+            "QUESTION_BATCH_WINDOW_MS environment variable is not valid"
+        )
+        assert _max_size.isdigit() and int(_max_size) > 0, (
+            "QUESTION_BATCH_MAX_SIZE environment variable is not valid"
+        )
+
+        window = float(_window) / 1000
+        max_size = int(_max_size)
+
+        self.embedding_batcher: MicroBatcher[str, np.ndarray] = MicroBatcher(
+            "embedding", self._encode_batch, window, max_size
+        )
+        self.search_batcher: MicroBatcher[np.ndarray, list[SearchSimilarityModel]] = (
+            MicroBatcher("vector_search", self._search_batch, window, max_size)
+        )
+
+        self.logger.debug(f"Question batch window: {_window}ms, max size: {max_size}")
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Same as `VectorHandler.async_encoder`, batched with concurrent questions"""
+        return await self.embedding_batcher.submit(None, text)
+
+    async def search_similarity(
+        self,
+        question_vector: np.ndarray,
+        collection_name: str = "default",
+        limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> list[SearchSimilarityModel]:
+        """Same as `MilvusHandler.search_similarity`, batched with concurrent questions"""
+        filter_key = search_filter.model_dump_json() if search_filter else None
+        return await self.search_batcher.submit(
+            (collection_name, limit, filter_key), question_vector
+        )
+
+    def stats(self) -> list[MicroBatchStatsModel]:
+        return [self.embedding_batcher.stats(), self.search_batcher.stats()]
+
+    @staticmethod
+    async def _encode_batch(_: Any, texts: list[str]) -> list[np.ndarray]:
+        return list(await encoder_client.async_encode_batch(texts))
+
+    @staticmethod
+    async def _search_batch(
+        key: Any, question_vectors: list[np.ndarray]
+    ) -> list[list[SearchSimilarityModel]]:
+        collection_name, limit, filter_key = key
+        search_filter = (
+            SearchFilterModel.model_validate_json(filter_key) if filter_key else None
+        )
+        return await asyncio.to_thread(
+            milvus_client.search_similarity_batch,
+            np.stack(question_vectors),
+            collection_name,
+            limit,
+            search_filter,
+        )
+
+
+question_batcher = QuestionBatcher()
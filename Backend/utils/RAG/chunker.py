@@ -0,0 +1,228 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.RAG.document_handler import DocumentElementModel
+
+from typing import Iterator, Protocol
+from os import getenv
+
+import re
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+# han, kana and hangul are roughly one token per character
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_PUNCTUATION = r"\u3000-\u303f\uff00-\uffef"
+
+_TOKEN_PATTERN = re.compile(rf"[{_CJK}]|[A-Za-z]{{1,32}}|\d{{1,32}}|[^\s{_CJK}A-Za-z\d]")
+_CJK_SPACE_PATTERN = re.compile(
+    rf"(?<=[{_CJK}{_CJK_PUNCTUATION}])\s+|\s+(?=[{_CJK}{_CJK_PUNCTUATION}])"
+)
+_SENTENCE_PATTERN = re.compile(r"(?<=[。！？；!?;])\s*|(?<=\.)\s+|\n+")
+_CJK_EDGE_PATTERN = re.compile(rf"[{_CJK}{_CJK_PUNCTUATION}]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a model specific tokenizer.
+
+    Each CJK character, number and punctuation mark counts as one token and
+    each Latin word counts as one token per four letters.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        tokens += (len(token) + 3) // 4 if token.isalpha() and token.isascii() else 1
+    return tokens
+
+
+class Chunker(Protocol):
+    def chunk(self, elements: list[DocumentElementModel]) -> list[str]: ...
+
+
+class SentenceChunker:
+    """Legacy chunker, removes every space and newline and splits on '。'"""
+
+    def chunk(self, elements: list[DocumentElementModel]) -> list[str]:
+        return "".join(
+            [element.text.replace("\n", "").replace(" ", "") for element in elements]
+        ).split("。")
+
+
+class TokenChunker:
+    """
+    Pack sentences into chunks of about CHUNK_TARGET_TOKENS tokens.
+
+    Sentences are split on CJK and Latin sentence punctuation and on newlines,
+    so bullet lists break per item. A chunk never exceeds CHUNK_MAX_TOKENS tokens
+    or CHUNK_MAX_BYTES utf-8 bytes (the Milvus content field), longer sentences are
+    cut on token boundaries. Consecutive chunks share up to CHUNK_OVERLAP_TOKENS
+    tokens of trailing sentences. A new page or slide starts a new chunk unless the
+    current one is still shorter than a quarter of the target, so tiny slides are
+    merged with their neighbour instead of becoming chunks of their own.
+    """
+
+    def __init__(self) -> None:
+        _target_tokens = getenv("CHUNK_TARGET_TOKENS", "256")
+        _max_tokens = getenv("CHUNK_MAX_TOKENS", "512")
+        _overlap_tokens = getenv("CHUNK_OVERLAP_TOKENS", "32")
+        _max_bytes = getenv("CHUNK_MAX_BYTES", "4096")
+
+        assert _target_tokens.isdigit() and int(_target_tokens) > 0, (
+            "CHUNK_TARGET_TOKENS environment variable is not valid"
+        )
+        assert _max_tokens.isdigit() and int(_max_tokens) >= int(_target_tokens), (
+            "CHUNK_MAX_TOKENS environment variable is not valid"
+        )
+        assert _overlap_tokens.isdigit() and int(_overlap_tokens) < int(
+            _target_tokens
+        ), "CHUNK_OVERLAP_TOKENS environment variable is not valid"
+        assert _max_bytes.isdigit() and int(_max_bytes) >= 16, (
+            "CHUNK_MAX_BYTES environment variable is not valid"
+        )
+
+        self.target_tokens = int(_target_tokens)
+        self.max_tokens = int(_max_tokens)
+        self.overlap_tokens = int(_overlap_tokens)
+        self.max_bytes = int(_max_bytes)
+        self.min_tokens = self.target_tokens // 4
+
+    def chunk(self, elements: list[DocumentElementModel]) -> list[str]:
+        """
+        Split document elements into length bounded chunks.
+
+        Args:
+            elements (list[DocumentElementModel]): Extracted elements in document order.
+
+        Returns:
+            list[str]: Chunk contents.
+        """
+        chunks: list[str] = []
+        # (sentence, tokens, bytes) of the chunk being built
+        current: list[tuple[str, int, int]] = []
+        page_number = None
+
+        def flush(overlap: bool) -> list[tuple[str, int, int]]:
+            chunks.append(self._join([sentence for sentence, _, _ in current]))
+            if not overlap:
+                return []
+
+            carried: list[tuple[str, int, int]] = []
+            carried_tokens = 0
+            for sentence in reversed(current[1:]):
+                if carried_tokens + sentence[1] > self.overlap_tokens:
+                    break
+                carried.insert(0, sentence)
+                carried_tokens += sentence[1]
+            return carried
+
+        for element in elements:
+            if (
+                element.page_number != page_number
+                and current
+                and sum(tokens for _, tokens, _ in current) >= self.min_tokens
+            ):
+                current = flush(overlap=False)
+            page_number = element.page_number
+
+            for sentence in self._sentences(element.text):
+                for piece in self._fit(sentence):
+                    piece_tokens = estimate_tokens(piece)
+                    piece_bytes = len(piece.encode()) + 1
+
+                    if current and (
+                        sum(tokens for _, tokens, _ in current) + piece_tokens
+                        > self.target_tokens
+                        or sum(size for _, _, size in current) + piece_bytes
+                        > self.max_bytes
+                    ):
+                        current = flush(overlap=True)
+
+                        # drop the overlap when it would push the chunk past its bounds
+                        if (
+                            sum(tokens for _, tokens, _ in current) + piece_tokens
+                            > self.max_tokens
+                            or sum(size for _, _, size in current) + piece_bytes
+                            > self.max_bytes
+                        ):
+                            current = []
+
+                    current.append((piece, piece_tokens, piece_bytes))
+
+        if current:
+            flush(overlap=False)
+
+        return chunks
+
+    def _sentences(self, text: str) -> Iterator[str]:
+        for line in text.splitlines():
+            line = _CJK_SPACE_PATTERN.sub("", " ".join(line.split()))
+            for sentence in _SENTENCE_PATTERN.split(line):
+                if sentence.strip():
+                    yield sentence.strip()
+
+    def _fit(self, sentence: str) -> Iterator[str]:
+        """Cut a sentence that exceeds the chunk bounds on token boundaries"""
+        if (
+            estimate_tokens(sentence) <= self.max_tokens
+            and len(sentence.encode()) < self.max_bytes
+        ):
+            yield sentence
+            return
+
+        start = 0
+        tokens = 0
+        for match in _TOKEN_PATTERN.finditer(sentence):
+            token_tokens = estimate_tokens(match.group())
+            if tokens and (
+                tokens + token_tokens > self.max_tokens
+                or len(sentence[start : match.end()].encode()) >= self.max_bytes
+            ):
+                yield sentence[start : match.start()].strip()
+                start = match.start()
+                tokens = 0
+            tokens += token_tokens
+
+        if sentence[start:].strip():
+            yield sentence[start:].strip()
+
+    def _join(self, sentences: list[str]) -> str:
+        content = ""
+        for sentence in sentences:
+            if (
+                content
+                and not _CJK_EDGE_PATTERN.fullmatch(content[-1])
+                and not _CJK_EDGE_PATTERN.fullmatch(sentence[0])
+            ):
+                content += " "
+            content += sentence
+        return content
+
+
+def get_chunker() -> Chunker:
+    """
+    Create the chunker selected by CHUNK_STRATEGY.
+
+    Returns:
+        Chunker: TokenChunker for "token", SentenceChunker for "sentence".
+    """
+    strategy = getenv("CHUNK_STRATEGY", "token")
+    assert strategy in ["token", "sentence"], (
+        "CHUNK_STRATEGY environment variable is not valid"
+    )
+
+    if strategy == "sentence":
+        return SentenceChunker()
+    return TokenChunker()
@@ -0,0 +1,198 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import SearchSimilarityModel
+from Backend.utils.helper.model.RAG.context_selector import ContextSelectionModel
+from Backend.utils.helper.logger import CustomLoggerHandler
+from Backend.utils.RAG.chunker import estimate_tokens
+
+from typing import Optional
+from os import getenv
+
+import numpy as np
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class ContextSelector:
+    """
+    Select the retrieved chunks that are worth sending to the LLM.
+
+    Up to `fetch_k` chunks are retrieved, then in ranking order
+        - chunks further than RETRIEVAL_DISTANCE_THRESHOLD are dropped (vector retrieval only),
+        - the ranking is cut where the relevance falls by more than RETRIEVAL_ADAPTIVE_DROP from
+          one chunk to the next, keeping at least RETRIEVAL_MIN_K chunks,
+        - chunks are added until RETRIEVAL_MAX_CONTEXT_TOKENS would be exceeded.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _max_k = getenv("RETRIEVAL_MAX_K", "6")
+        _min_k = getenv("RETRIEVAL_MIN_K", "1")
+        _threshold = getenv("RETRIEVAL_DISTANCE_THRESHOLD", "")
+        _adaptive_drop = getenv("RETRIEVAL_ADAPTIVE_DROP", "0.1")
+        _max_context_tokens = getenv("RETRIEVAL_MAX_CONTEXT_TOKENS", "2048")
+
+        assert _max_k.isdigit() and int(_max_k) > 0, (
+            "RETRIEVAL_MAX_K environment variable is not valid"
+        )
+        assert _min_k.isdigit() and int(_min_k) <= int(_max_k), (
+            "RETRIEVAL_MIN_K environment variable is not valid"
+        )
+        try:
+            threshold = float(_threshold) if _threshold else None
+            adaptive_drop = float(_adaptive_drop) if _adaptive_drop else None
+        except ValueError:
+            raise AssertionError(
+                "RETRIEVAL_DISTANCE_THRESHOLD or RETRIEVAL_ADAPTIVE_DROP environment variable is not valid"
+            )
+        assert _max_context_tokens.isdigit(), (
+            "RETRIEVAL_MAX_CONTEXT_TOKENS environment variable is not valid"
+        )
+
+        self.fetch_k = int(_max_k)
+        self.min_k = int(_min_k)
+        # None disables the threshold and the adaptive k, 0 tokens disables the budget
+        self.threshold: Optional[float] = threshold
+        self.adaptive_drop: Optional[float] = adaptive_drop
+        self.max_context_tokens = int(_max_context_tokens)
+
+        self.logger.debug(
+            f"Context selection fetch_k: {self.fetch_k}, min_k: {self.min_k}, "
+            f"threshold: {self.threshold}, adaptive_drop: {self.adaptive_drop}, "
+            f"max_context_tokens: {self.max_context_tokens}"
+        )
+
+    def select(
+        self,
+        documents: list[SearchSimilarityModel],
+        metric_type: Optional[str] = None,
+    ) -> ContextSelectionModel:
+        """
+        Select the chunks sent as context, `cut` followed by `budget`.
+
+        Args:
+            documents (list[SearchSimilarityModel]): Retrieved chunks, most relevant first.
+            metric_type (str, optional): Metric of `distance` for vector retrieval ("L2", "IP" or "COSINE"),
+                None when the chunks are ranked by `score` (keyword and hybrid retrieval). Defaults to None.
+
+        Returns:
+            ContextSelectionModel: The selected chunks and the number of chunks and estimated tokens used.
+        """
+        return self.budget(self.cut(documents, metric_type), len(documents))
+
+    def cut(
+        self,
+        documents: list[SearchSimilarityModel],
+        metric_type: Optional[str] = None,
+    ) -> list[SearchSimilarityModel]:
+        """
+        Apply the distance threshold and the adaptive k, on the retrieval ranking.
+
+        Args:
+            documents (list[SearchSimilarityModel]): Retrieved chunks, most relevant first.
+            metric_type (str, optional): Same as `select`. Defaults to None.
+
+        Returns:
+            list[SearchSimilarityModel]: The kept chunks, in ranking order.
+        """
+        selected = documents
+        relevance = self._relevance(documents, metric_type)
+
+        if metric_type is not None and self.threshold is not None:
+            distance = np.asarray(
+                [document.distance for document in documents], dtype=np.float64
+            )
+            keep = (
+                distance <= self.threshold
+                if metric_type == "L2"
+                else distance >= self.threshold
+            )
+            selected = [document for document, kept in zip(selected, keep) if kept]
+            relevance = relevance[keep]
+
+        if self.adaptive_drop is not None and len(selected) > self.min_k:
+            selected = selected[: self._adaptive_k(relevance)]
+
+        return selected
+
+    def budget(
+        self,
+        documents: list[SearchSimilarityModel],
+        retrieved_chunks: int,
+    ) -> ContextSelectionModel:
+        """
+        Add chunks in order until RETRIEVAL_MAX_CONTEXT_TOKENS would be exceeded.
+
+        Args:
+            documents (list[SearchSimilarityModel]): Chunks kept by `cut`, in the order they should be used.
+            retrieved_chunks (int): Number of chunks retrieved before `cut`.
+
+        Returns:
+            ContextSelectionModel: The selected chunks and the number of chunks and estimated tokens used.
+        """
+        context: list[SearchSimilarityModel] = []
+        context_tokens = 0
+        for document in documents:
+            tokens = estimate_tokens(document.content)
+            if (
+                self.max_context_tokens
+                and context_tokens + tokens > self.max_context_tokens
+            ):
+                break
+            context.append(document)
+            context_tokens += tokens
+
+        self.logger.info(
+            f"Context: {len(context)}/{retrieved_chunks} chunks, {context_tokens} tokens"
+        )
+
+        return ContextSelectionModel(
+            documents=context,
+            retrieved_chunks=retrieved_chunks,
+            context_chunks=len(context),
+            context_tokens=context_tokens,
+        )
+
+    @staticmethod
+    def _relevance(
+        documents: list[SearchSimilarityModel],
+        metric_type: Optional[str],
+    ) -> np.ndarray:
+        """
+        Relevance of the chunks on a common scale, higher is more relevant.
+
+        Vector chunks get their cosine similarity, embeddings are normalized by `VectorHandler`
+        and the squared L2 distance `d` of unit vectors is `2 - 2 * cos`. Keyword and hybrid scores are divided by the top score,
+        so a chunk ranked by both retrievals (hybrid) or matching every term (keyword) is 1.
+        """
+        if metric_type is not None:
+            distance = np.asarray(
+                [document.distance for document in documents], dtype=np.float64
+            )
+            return 1 - distance / 2 if metric_type == "L2" else distance
+
+        score = np.asarray([document.score for document in documents], dtype=np.float64)
+        top = score.max(initial=0.0)
+        return score / top if top > 0 else score
+
+    def _adaptive_k(self, relevance: np.ndarray) -> int:
+        """Number of chunks before the first sharp relevance drop, at least `min_k`"""
+        assert self.adaptive_drop is not None
+
+        # absolute gap, every metric has been mapped to a cosine like [0, 1] relevance
+        drops = relevance[:-1] - relevance[1:]
+        sharp_drops = np.flatnonzero(drops > self.adaptive_drop)
+        sharp_drops = sharp_drops[sharp_drops + 1 >= self.min_k]
+
+        return int(sharp_drops[0]) + 1 if len(sharp_drops) else len(relevance)
+
+
+context_selector = ContextSelector()
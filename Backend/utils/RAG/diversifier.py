@@ -0,0 +1,152 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import SearchSimilarityModel
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from os import getenv
+
+import numpy as np
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class Diversifier:
+    """
+    Post retrieval removal of near duplicate chunks.
+
+    The vectors returned by the vector search are reused, chunks without one (keyword
+    retrieval) are embedded, and compared in a single cosine similarity matrix,
+        - dedup: a chunk is dropped when it is at least RETRIEVAL_DUPLICATE_THRESHOLD similar
+          to a higher ranked chunk that was kept,
+        - mmr: duplicates are dropped as well, then the remaining chunks are re-ranked with
+          maximal marginal relevance, RETRIEVAL_MMR_LAMBDA weighting relevance against novelty,
+        - none: the ranking is returned as is.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        self.mode = getenv("RETRIEVAL_DIVERSITY", "dedup")
+        _threshold = getenv("RETRIEVAL_DUPLICATE_THRESHOLD", "0.95")
+        _mmr_lambda = getenv("RETRIEVAL_MMR_LAMBDA", "0.7")
+
+        assert self.mode in ["dedup", "mmr", "none"], (
+            "RETRIEVAL_DIVERSITY environment variable is not valid"
+        )
+        assert 0 < float(_threshold) <= 1, (
+            "RETRIEVAL_DUPLICATE_THRESHOLD environment variable is not valid"
+        )
+        assert 0 <= float(_mmr_lambda) <= 1, (
+            "RETRIEVAL_MMR_LAMBDA environment variable is not valid"
+        )
+
+        self.threshold = float(_threshold)
+        self.mmr_lambda = float(_mmr_lambda)
+
+        self.logger.debug(
+            f"Diversity mode: {self.mode}, threshold: {self.threshold}, mmr lambda: {self.mmr_lambda}"
+        )
+
+    async def diversify(
+        self,
+        question_vector: np.ndarray,
+        documents: list[SearchSimilarityModel],
+    ) -> list[SearchSimilarityModel]:
+        """
+        Remove near duplicates from the retrieved chunks and optionally diversify their order.
+
+        Args:
+            question_vector (np.ndarray): Embedding of the question, used by mmr.
+            documents (list[SearchSimilarityModel]): Chunks kept by `ContextSelector.cut`, most relevant first.
+
+        Returns:
+            list[SearchSimilarityModel]: The kept chunks, in the order they should be used.
+        """
+        if self.mode == "none" or len(documents) < 2:
+            return documents
+
+        vectors = self._normalize(await self._vectors(documents))
+        similarity = vectors @ vectors.T
+
+        kept = self._deduplicate(similarity)
+        if self.mode == "mmr":
+            relevance = vectors[kept] @ self._normalize(question_vector)
+            kept = [
+                kept[i] for i in self._mmr(relevance, similarity[np.ix_(kept, kept)])
+            ]
+
+        if len(kept) < len(documents):
+            self.logger.info(
+                f"Removed {len(documents) - len(kept)} near duplicate chunks"
+            )
+
+        return [documents[i] for i in kept]
+
+    @staticmethod
+    async def _vectors(documents: list[SearchSimilarityModel]) -> np.ndarray:
+        """Stored vectors of the chunks, the missing ones encoded (served by the embedding cache)"""
+        vectors = np.zeros(
+            (len(documents), encoder_client.vector_dim), dtype=np.float32
+        )
+        missing: list[int] = []
+        for i, document in enumerate(documents):
+            if document.vector is None:
+                missing.append(i)
+            else:
+                vectors[i] = document.vector
+
+        if missing:
+            vectors[missing] = await encoder_client.async_encode_batch(
+                [documents[i].content for i in missing]
+            )
+
+        return vectors
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _deduplicate(self, similarity: np.ndarray) -> list[int]:
+        """Indexes of the chunks not similar to a higher ranked kept chunk, in ranking order"""
+        duplicate = np.triu(similarity >= self.threshold, k=1)
+
+        kept: list[int] = []
+        removed = np.zeros(len(similarity), dtype=bool)
+        for i in range(len(similarity)):
+            if removed[i]:
+                continue
+            kept.append(i)
+            removed |= duplicate[i]
+
+        return kept
+
+    def _mmr(self, relevance: np.ndarray, similarity: np.ndarray) -> list[int]:
+        """Maximal marginal relevance order of the chunks"""
+        order = [int(np.argmax(relevance))]
+        # highest similarity of every chunk to the already ordered chunks
+        redundancy = similarity[order[0]].copy()
+        remaining = np.ones(len(relevance), dtype=bool)
+        remaining[order[0]] = False
+
+        while remaining.any():
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+            scores[~remaining] = -np.inf
+            best = int(np.argmax(scores))
+            order.append(best)
+            remaining[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+
+        return order
+
+
+diversifier = Diversifier()
@@ -1,6 +1,13 @@
 # Code by AkinoAlice@TyrantRey
 
-from Backend.utils.helper.error import FormatError, UnsupportedFileFormat
+from Backend.utils.helper.error import (
+    FormatError,
+    PartitionTimeoutError,
+    UnsupportedFileFormat,
+)
+from Backend.utils.helper.model.RAG.document_handler import DocumentElementModel
+from Backend.utils.helper.logger import CustomLoggerHandler
+from Backend.utils.RAG.chunker import Chunker, get_chunker
 
 from unstructured.partition.pptx import partition_pptx
 from unstructured.partition.docx import partition_docx
@@ -8,23 +15,188 @@ from unstructured.partition.ppt import partition_ppt
 from unstructured.partition.doc import partition_doc
 from unstructured.partition.pdf import partition_pdf
 
-from typing import Literal
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from multiprocessing.connection import Connection
+from typing import Any, Literal, Optional
+from pypdf import PdfReader, PdfWriter
+from os import getenv
+
+import multiprocessing
+import threading
+import time
+import io
+import os
+
+FILE_TYPE = Literal["pptx", "docx", "ppt", "doc", "pdf"]
+
+
+def partition_document(
+    document_path: str,
+    file_type: FILE_TYPE,
+    page_range: Optional[tuple[int, int]] = None,
+) -> list[DocumentElementModel]:
+    """
+    Extract the non empty text elements of a document.
+
+    This is a module level function so it can run inside the partition process pool.
+
+    Args:
+        document_path (str): The path to the document file.
+        file_type (Literal["pptx", "docx", "ppt", "doc", "pdf"]): The type of the document file.
+        page_range (tuple[int, int], optional): Zero based [start, end) pages to partition,
+            only used for pdf. Defaults to the whole document.
+
+    Returns:
+        list[DocumentElementModel]: The text and page number of each extracted element.
+
+    Raises:
+        UnsupportedFileFormat: If the specified file_type is not supported.
+    """
+    if file_type == "pdf" and page_range is not None:
+        reader = PdfReader(document_path)
+        writer = PdfWriter()
+        for page in reader.pages[page_range[0] : page_range[1]]:
+            writer.add_page(page)
+
+        pages = io.BytesIO()
+        writer.write(pages)
+        pages.seek(0)
+        extracted_page = partition_pdf(file=pages)
+
+    elif file_type == "pdf":
+        extracted_page = partition_pdf(document_path)
+
+    elif file_type == "pptx":
+        extracted_page = partition_pptx(document_path)
+
+    elif file_type == "ppt":
+        extracted_page = partition_ppt(document_path)
+
+    elif file_type == "docx":
+        extracted_page = partition_docx(document_path)
+
+    elif file_type == "doc":
+        extracted_page = partition_doc(document_path)
+
+    else:
+        # TO BE COMPLETED: Implement other file types (e.g., txt, jpg, png) splitters here.
+        raise UnsupportedFileFormat(file_type)
+
+    # page numbers of a pdf page range restart from 1
+    page_offset = page_range[0] if file_type == "pdf" and page_range is not None else 0
+
+    return [
+        DocumentElementModel(
+            text=str(page_content),
+            page_number=page_content.metadata.page_number + page_offset
+            if page_content.metadata.page_number is not None
+            else None,
+        )
+        for page_content in extracted_page
+        if str(page_content)
+    ]
+
+
+def _partition_worker(connection: Connection) -> None:
+    """Partition the documents received on `connection` until the parent closes it"""
+    while True:
+        try:
+            arguments = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            connection.send((True, partition_document(*arguments)))
+        except Exception as error:
+            # the exception may not be picklable
+            try:
+                connection.send((False, error))
+            except Exception:
+                connection.send((False, RuntimeError(str(error))))
+
+
+class PartitionWorker:
+    """A spawned process partitioning one document or pdf page range at a time"""
+
+    def __init__(self) -> None:
+        # spawn avoids forking the api process together with its client threads
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_partition_worker, args=(child_connection,), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def run(self, arguments: tuple, timeout: float) -> tuple[bool, Any]:
+        """
+        Partition in the worker process.
+
+        Returns:
+            tuple[bool, Any]: (True, the elements) or (False, the exception raised by the partition).
+
+        Raises:
+            TimeoutError: If the worker did not answer within `timeout` seconds.
+            EOFError: If the worker process died.
+        """
+        self.connection.send(arguments)
+        if not self.connection.poll(max(timeout, 0)):
+            raise TimeoutError
+        return self.connection.recv()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
 
 
 class DocumentSplitter:
-    def __init__(self) -> None: ...
+    def __init__(self, chunker: Optional[Chunker] = None) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+        self.chunker = chunker if chunker is not None else get_chunker()
+
+        _mode = getenv("DOCUMENT_PARTITION_MODE", "process")
+        _workers = getenv("DOCUMENT_PARTITION_WORKERS") or str(os.cpu_count() or 1)
+        _timeout = getenv("DOCUMENT_PARTITION_TIMEOUT", "600")
+        _pdf_pages_per_task = getenv("DOCUMENT_PDF_PAGES_PER_TASK", "20")
+
+        assert _mode in ["inline", "process"], (
+            "DOCUMENT_PARTITION_MODE environment variable is not valid"
+        )
+        assert _workers.isdigit() and int(_workers) > 0, (
+            "DOCUMENT_PARTITION_WORKERS environment variable is not valid"
+        )
+        assert float(_timeout) > 0, (
+            "DOCUMENT_PARTITION_TIMEOUT environment variable is not valid"
+        )
+        assert _pdf_pages_per_task.isdigit() and int(_pdf_pages_per_task) > 0, (
+            "DOCUMENT_PDF_PAGES_PER_TASK environment variable is not valid"
+        )
+
+        self.mode = _mode
+        self.workers = int(_workers)
+        self.timeout = float(_timeout)
+        self.pdf_pages_per_task = int(_pdf_pages_per_task)
+
+        # workers are spawned on first use, so importing this module in a worker stays cheap,
+        # and reused until one has to be killed after a timeout
+        self.lock = threading.Lock()
+        self.idle_workers: list[PartitionWorker] = []
+        self.worker_slots = threading.BoundedSemaphore(self.workers)
+        # threads driving the workers, shared by every ingestion job
+        self.dispatcher: Optional[ThreadPoolExecutor] = None
 
     def document_splitter(
         self,
         document_path: str,
-        file_type: Literal["pptx", "docx", "ppt", "doc", "pdf"],
+        file_type: FILE_TYPE,
     ) -> list[str]:
         """
         Split a document into a list of content strings.
 
         This method takes a document path and its file type, verifies the file extension,
-        extracts the content using the appropriate partition function, and then processes
-        the extracted content into a list of strings.
+        extracts the content using the appropriate partition function, and then splits
+        the extracted content into chunks with the configured chunker.
 
         Args:
             document_path (str): The path to the document file.
@@ -36,46 +208,140 @@ class DocumentSplitter:
         Raises:
             FormatError: If the document's extension doesn't match the specified file_type.
             UnsupportedFileFormat: If the specified file_type is not supported.
+            PartitionTimeoutError: If partitioning takes longer than DOCUMENT_PARTITION_TIMEOUT.
 
         Note:
-            The method removes all newlines and spaces from the extracted content and
-            splits it into sentences using the '。' character as a delimiter.
+            The chunker is selected by CHUNK_STRATEGY, see Backend.utils.RAG.chunker.
         """
+        return self.document_splitter_many([(document_path, file_type)])[0]
 
-        document_extension = document_path.split(".")[-1]
+    def document_splitter_many(
+        self, documents: list[tuple[str, FILE_TYPE]]
+    ) -> list[list[str]]:
+        """
+        Split several documents, partitioning them in parallel in the process pool.
 
-        assert document_extension == file_type, FormatError(
-            document_extension, file_type
-        )
+        Args:
+            documents (list[tuple[str, FILE_TYPE]]): (document_path, file_type) pairs.
+
+        Returns:
+            list[list[str]]: The content strings of each document, in input order.
+        """
+        for document_path, file_type in documents:
+            document_extension = document_path.split(".")[-1]
+
+            assert document_extension == file_type, FormatError(
+                document_extension, file_type
+            )
+
+        if self.mode == "inline":
+            return [
+                self.chunker.chunk(partition_document(document_path, file_type))
+                for document_path, file_type in documents
+            ]
 
-        if file_type == "pdf":
-            extracted_page = partition_pdf(document_path)
+        # submit every file before waiting so they are partitioned concurrently
+        dispatcher = self._dispatcher()
+        futures = []
+        for document_path, file_type in documents:
+            deadline = time.monotonic() + self.timeout
+            futures.append(
+                [
+                    dispatcher.submit(
+                        self._partition, deadline, document_path, file_type, page_range
+                    )
+                    for page_range in self._page_ranges(document_path, file_type)
+                ]
+            )
 
-        elif file_type == "pptx":
-            extracted_page = partition_pptx(document_path)
+        return [
+            self.chunker.chunk(self._collect(document_path, document_futures))
+            for (document_path, _), document_futures in zip(documents, futures)
+        ]
 
-        elif file_type == "ppt":
-            extracted_page = partition_ppt(document_path)
+    def _dispatcher(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.dispatcher is None:
+                self.dispatcher = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="partition"
+                )
+            return self.dispatcher
 
-        elif file_type == "docx":
-            extracted_page = partition_docx(document_path)
+    def _partition(
+        self,
+        deadline: float,
+        document_path: str,
+        file_type: FILE_TYPE,
+        page_range: Optional[tuple[int, int]],
+    ) -> list[DocumentElementModel]:
+        """Partition in an idle worker, killing the worker if the document deadline passes"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.worker_slots.acquire(timeout=remaining):
+            raise PartitionTimeoutError(document_path, self.timeout)
 
-        elif file_type == "doc":
-            extracted_page = partition_doc(document_path)
+        worker: Optional[PartitionWorker] = None
+        try:
+            with self.lock:
+                worker = self.idle_workers.pop() if self.idle_workers else None
+            if worker is None:
+                worker = PartitionWorker()
 
-        else:
-            # TO BE COMPLETED: Implement other file types (e.g., txt, jpg, png) splitters here.
-            raise UnsupportedFileFormat(file_type)
+            success, result = worker.run(
+                (document_path, file_type, page_range), deadline - time.monotonic()
+            )
+        except BaseException as error:
+            # a stuck worker cannot be interrupted, only this task's worker is killed
+            if worker is not None:
+                worker.kill()
+            self.worker_slots.release()
+            if isinstance(error, TimeoutError):
+                self.logger.error(
+                    f"Partition timed out, killed worker {worker.process.pid if worker else None}: {document_path}"
+                )
+                raise PartitionTimeoutError(document_path, self.timeout)
+            raise
 
-        extracted_page = list(filter(lambda x: str(x) != "", extracted_page))
-        splitted_page_content = "".join(
-            [
-                str(page_content).replace("\n", "").replace(" ", "")
-                for page_content in extracted_page
-            ]
-        ).split("。")
+        with self.lock:
+            self.idle_workers.append(worker)
+        self.worker_slots.release()
+
+        if not success:
+            raise result
+        return result
+
+    def _page_ranges(
+        self, document_path: str, file_type: FILE_TYPE
+    ) -> list[Optional[tuple[int, int]]]:
+        """Split large pdf into page ranges, other documents are partitioned whole"""
+        if file_type != "pdf":
+            return [None]
+
+        page_count = len(PdfReader(document_path).pages)
+        if page_count <= self.pdf_pages_per_task:
+            return [None]
+
+        return [
+            (start, min(start + self.pdf_pages_per_task, page_count))
+            for start in range(0, page_count, self.pdf_pages_per_task)
+        ]
+
+    def _collect(
+        self, document_path: str, futures: list[Future]
+    ) -> list[DocumentElementModel]:
+        """Wait for the partition tasks of one document, in page order"""
+        _, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+        # a failed or timed out page range fails the document, its queued ranges are dropped,
+        # the running ones stop at the same deadline
+        for future in not_done:
+            future.cancel()
+        wait(futures)
+
+        for future in futures:
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()  # type: ignore[misc]
 
-        return splitted_page_content
+        return [element for future in futures for element in future.result()]
 
 
 docs_client = DocumentSplitter()
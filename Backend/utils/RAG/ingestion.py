@@ -0,0 +1,359 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.RAG.ingestion import IngestionJobModel
+from Backend.utils.database.vector_database import milvus_client
+from Backend.utils.RAG.document_handler import docs_client
+from Backend.utils.RAG.keyword_index import keyword_index
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.RAG.answer_cache import answer_cache
+from Backend.utils.RAG.retrieval_cache import retrieval_cache
+from Backend.utils.RAG.near_duplicate import near_duplicate_index
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+from os import getenv
+
+import threading
+import sqlite3
+import uuid
+import json
+import time
+import os
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class IngestionQueue:
+    """
+    Background queue running partition -> chunk -> deduplicate -> embed -> insert for uploaded documents.
+
+    Jobs and their chunks are persisted in a local SQLite file, unfinished jobs are
+    resubmitted on startup and continue from the last inserted batch.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _workers = getenv("INGESTION_WORKERS", "2")
+        _batch_size = getenv("INGESTION_BATCH_SIZE", "256")
+        _database_path = getenv("INGESTION_JOB_PATH", "./cache/ingestion.sqlite3")
+
+        assert _workers.isdigit() and int(_workers) > 0, (
+            "INGESTION_WORKERS environment variable is not valid"
+        )
+        assert _batch_size.isdigit() and int(_batch_size) > 0, (
+            "INGESTION_BATCH_SIZE environment variable is not valid"
+        )
+        assert _database_path != "", (
+            "INGESTION_JOB_PATH environment variable is not set"
+        )
+
+        self.workers = int(_workers)
+        self.batch_size = int(_batch_size)
+        self.database_path = _database_path
+
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.database.row_factory = sqlite3.Row
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_job (
+                job_id TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                docs_type TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '[]',
+                status TEXT NOT NULL DEFAULT 'queued',
+                stage TEXT NOT NULL DEFAULT 'queued',
+                chunks TEXT,
+                chunks_total INTEGER NOT NULL DEFAULT 0,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                chunks_duplicated INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_time REAL NOT NULL,
+                started_time REAL,
+                updated_time REAL NOT NULL
+            );
+            """
+        )
+        # jobs queued before search filters
+        columns = [
+            column[1]
+            for column in self.database.execute("PRAGMA table_info(ingestion_job);")
+        ]
+        if "docs_type" not in columns:
+            self.database.execute(
+                "ALTER TABLE ingestion_job ADD COLUMN docs_type TEXT NOT NULL DEFAULT '';"
+            )
+            self.database.execute(
+                "ALTER TABLE ingestion_job ADD COLUMN tags TEXT NOT NULL DEFAULT '[]';"
+            )
+        # jobs queued before near duplicate detection
+        if "chunks_duplicated" not in columns:
+            self.database.execute(
+                "ALTER TABLE ingestion_job ADD COLUMN chunks_duplicated INTEGER NOT NULL DEFAULT 0;"
+            )
+        self.database.commit()
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="ingestion"
+        )
+
+        self._resume()
+
+        self.logger.debug(
+            f"Ingestion workers: {self.workers}, batch size: {self.batch_size}"
+        )
+
+    def submit(
+        self,
+        file_id: str,
+        filename: str,
+        file_path: str,
+        file_type: Literal["pptx", "docx", "ppt", "doc", "pdf"],
+        collection: str = "default",
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> str:
+        """
+        Enqueue an ingestion job for an uploaded document.
+
+        Args:
+            file_id (str): The unique identifier of the uploaded file.
+            filename (str): The original filename, stored as the chunks source.
+            file_path (str): The path of the saved file.
+            file_type (Literal["pptx", "docx", "ppt", "doc", "pdf"]): The type of the document file.
+            collection (str, optional): The Milvus collection to insert into. Defaults to "default".
+            docs_type (str, optional): The type of the document, used by search filters. Defaults to "".
+            tags (list[str], optional): The tags of the document, used by search filters. Defaults to None.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self.lock:
+            self.database.execute(
+                """
+                INSERT INTO ingestion_job (
+                    job_id, file_id, filename, file_path, file_type, collection,
+                    docs_type, tags, created_time, updated_time
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                (
+                    job_id,
+                    file_id,
+                    filename,
+                    file_path,
+                    file_type,
+                    collection,
+                    docs_type,
+                    json.dumps(tags or [], ensure_ascii=False),
+                    now,
+                    now,
+                ),
+            )
+            self.database.commit()
+
+        self.executor.submit(self._run, job_id)
+        self.logger.info(f"Queued ingestion job {job_id} for {filename}")
+
+        return job_id
+
+    def get(self, job_id: str) -> Optional[IngestionJobModel]:
+        """
+        Report the progress of an ingestion job.
+
+        Args:
+            job_id (str): The job id returned by `submit`.
+
+        Returns:
+            Optional[IngestionJobModel]: The job progress, None if the job does not exist.
+        """
+        job = self._fetch(job_id)
+        if job is None:
+            return None
+
+        elapsed = (
+            (job["updated_time"] - job["started_time"]) if job["started_time"] else 0
+        )
+
+        return IngestionJobModel(
+            job_id=job["job_id"],
+            file_id=job["file_id"],
+            filename=job["filename"],
+            collection=job["collection"],
+            status=job["status"],
+            stage=job["stage"],
+            chunks_total=job["chunks_total"],
+            chunks_done=job["chunks_done"],
+            chunks_duplicated=job["chunks_duplicated"],
+            chunks_per_second=job["chunks_done"] / elapsed if elapsed > 0 else 0.0,
+            error=job["error"],
+            created_time=job["created_time"],
+            updated_time=job["updated_time"],
+        )
+
+    def _resume(self) -> None:
+        """Resubmit the jobs that were queued or running when the server stopped"""
+        with self.lock:
+            rows = self.database.execute(
+                """
+                SELECT job_id FROM ingestion_job
+                WHERE status IN ('queued', 'running')
+                ORDER BY created_time;
+                """
+            ).fetchall()
+
+        for row in rows:
+            self.logger.info(f"Resuming ingestion job {row['job_id']}")
+            self.executor.submit(self._run, row["job_id"])
+
+    def _fetch(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self.lock:
+            return self.database.execute(
+                "SELECT * FROM ingestion_job WHERE job_id = ?;", (job_id,)
+            ).fetchone()
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_time"] = time.time()
+        columns = ", ".join(f"{column} = ?" for column in fields)
+
+        with self.lock:
+            self.database.execute(
+                f"UPDATE ingestion_job SET {columns} WHERE job_id = ?;",
+                (*fields.values(), job_id),
+            )
+            self.database.commit()
+
+    def _run(self, job_id: str) -> None:
+        try:
+            self._process(job_id)
+        except Exception as error:
+            self.logger.error(f"Ingestion job {job_id} failed: {error}")
+            self._update(job_id, status="failed", error=str(error))
+
+    def _process(self, job_id: str) -> None:
+        job = self._fetch(job_id)
+        assert job is not None, f"Ingestion job {job_id} not found"
+
+        self._update(
+            job_id,
+            status="running",
+            error=None,
+            started_time=job["started_time"] or time.time(),
+        )
+
+        # partitioned chunks are persisted so a resumed job skips partitioning
+        if job["chunks"] is None:
+            self._update(job_id, stage="partition")
+            splitted_content = docs_client.document_splitter(
+                job["file_path"], job["file_type"]
+            )
+
+            self._update(job_id, stage="chunk")
+            chunks = [sentence for sentence in splitted_content if sentence]
+
+            # re-uploaded revisions of a document mostly repeat chunks already stored,
+            # checking the collection first drops the signatures of a recreated one
+            self._update(job_id, stage="deduplicate")
+            milvus_client.check_collection(job["collection"])
+            chunk_ids = [
+                milvus_client.hash_id(job["filename"], content) for content in chunks
+            ]
+            duplicates = near_duplicate_index.find(
+                job["collection"],
+                job["docs_type"],
+                json.loads(job["tags"]),
+                chunk_ids,
+                chunks,
+            )
+            chunks_duplicated = sum(
+                duplicate_of is not None for duplicate_of in duplicates
+            )
+            chunks = [
+                content
+                for content, duplicate_of in zip(chunks, duplicates)
+                if duplicate_of is None
+            ]
+            self.logger.info(
+                f"Ingestion job {job_id}: collapsed {chunks_duplicated} near duplicate chunks"
+            )
+
+            self._update(
+                job_id,
+                chunks=json.dumps(chunks, ensure_ascii=False),
+                chunks_total=len(chunks),
+                chunks_duplicated=chunks_duplicated,
+            )
+        else:
+            chunks = json.loads(job["chunks"])
+
+        tags = json.loads(job["tags"])
+
+        for start in range(job["chunks_done"], len(chunks), self.batch_size):
+            batch = chunks[start : start + self.batch_size]
+
+            self._update(job_id, stage="embed")
+            vectors = encoder_client.encode_batch(batch)
+
+            self._update(job_id, stage="insert")
+            insert_info = milvus_client.insert_sentences(
+                docs_filename=job["filename"],
+                vectors=vectors,
+                contents=batch,
+                file_uuid=job["file_id"],
+                collection=job["collection"],
+                docs_type=job["docs_type"],
+                tags=tags,
+            )
+            self.logger.debug(f"Ingestion job {job_id}: {insert_info['insert_count']}")
+
+            batch_ids = [
+                milvus_client.hash_id(job["filename"], content) for content in batch
+            ]
+            keyword_index.add(
+                ids=batch_ids,
+                docs_filename=job["filename"],
+                contents=batch,
+                file_uuid=job["file_id"],
+                collection=job["collection"],
+                docs_type=job["docs_type"],
+                tags=tags,
+            )
+
+            near_duplicate_index.add(
+                job["collection"],
+                job["docs_type"],
+                tags,
+                batch_ids,
+                batch,
+                job["file_id"],
+            )
+
+            # inserted chunks are searchable, cached retrievals may miss them
+            retrieval_cache.bump(job["collection"])
+
+            self._update(job_id, chunks_done=start + len(batch))
+
+        # cached answers of this collection may rely on outdated documents
+        answer_cache.invalidate(job["collection"])
+
+        self._update(job_id, status="completed", stage="completed", chunks=None)
+        self.logger.info(f"Ingestion job {job_id} completed: {len(chunks)} chunks")
+
+
+ingestion_queue = IngestionQueue()
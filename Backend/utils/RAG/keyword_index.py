@@ -0,0 +1,451 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import (
+    SearchFilterModel,
+    SearchSimilarityModel,
+)
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from collections import Counter
+from typing import Optional
+from os import getenv
+
+import numpy as np
+import unicodedata
+import threading
+import sqlite3
+import json
+import math
+import re
+import os
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+_TERM_PATTERN = re.compile(
+    r"(?P<cjk>[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+)|(?P<word>[a-z]+|\d+(?:\.\d+)*)"
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into index terms.
+
+    Latin words are lowercased, numbers keep their dots (chapter 3.2), runs of CJK
+    characters are split into overlapping bigrams since Chinese has no word boundary.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: Terms in text order, with repetition.
+    """
+    terms = []
+    # NFKC folds full width letters and digits into ascii
+    for match in _TERM_PATTERN.finditer(unicodedata.normalize("NFKC", text).lower()):
+        cjk = match.group("cjk")
+        if cjk is None:
+            terms.append(match.group("word"))
+        elif len(cjk) == 1:
+            terms.append(cjk)
+        else:
+            terms.extend(cjk[i : i + 2] for i in range(len(cjk) - 1))
+    return terms
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[SearchSimilarityModel]], limit: int, k: int = 60
+) -> list[SearchSimilarityModel]:
+    """
+    Fuse several rankings of the same chunks with reciprocal rank fusion.
+
+    Each chunk scores sum(1 / (k + rank)) over the rankings it appears in, which only
+    depends on ranks, so BM25 scores and vector distances need no normalization.
+
+    Args:
+        rankings (list[list[SearchSimilarityModel]]): Rankings ordered from best to worst.
+        limit (int): Maximum number of chunks to return.
+        k (int, optional): Rank smoothing constant. Defaults to 60.
+
+    Returns:
+        list[SearchSimilarityModel]: Fused ranking, `score` holds the fused score.
+    """
+    scores: dict[str, float] = {}
+    chunks: dict[str, SearchSimilarityModel] = {}
+
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1 / (k + rank)
+            # the first ranking wins, so vector hits keep their distance
+            chunks.setdefault(chunk.id, chunk)
+
+    fused = sorted(scores, key=lambda chunk_id: scores[chunk_id], reverse=True)
+    return [
+        chunks[chunk_id].model_copy(update={"score": scores[chunk_id]})
+        for chunk_id in fused[:limit]
+    ]
+
+
+class CollectionPostings:
+    """In-memory inverted index of one collection, rebuilt from SQLite on first use"""
+
+    def __init__(self) -> None:
+        self.chunk_ids: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.lengths: list[int] = []
+        self.docs_types: list[str] = []
+        self.tags: list[frozenset[str]] = []
+        # term -> (chunk positions, term frequencies)
+        self.postings: dict[str, tuple[list[int], list[int]]] = {}
+        # numpy copies of the postings, dropped when a term gets new chunks
+        self.arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.length_array: Optional[np.ndarray] = None
+
+    def add(
+        self,
+        chunk_id: str,
+        frequencies: dict[str, int],
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> None:
+        if chunk_id in self.positions:
+            # same id means same source and content, the postings are already there,
+            # the document may have been ingested again with another docs_type or tags
+            position = self.positions[chunk_id]
+            self.docs_types[position] = docs_type
+            self.tags[position] = frozenset(tags or [])
+            return
+
+        position = len(self.chunk_ids)
+        self.chunk_ids.append(chunk_id)
+        self.positions[chunk_id] = position
+        self.lengths.append(sum(frequencies.values()))
+        self.docs_types.append(docs_type)
+        self.tags.append(frozenset(tags or []))
+        self.length_array = None
+
+        for term, frequency in frequencies.items():
+            positions, term_frequencies = self.postings.setdefault(term, ([], []))
+            positions.append(position)
+            term_frequencies.append(frequency)
+            self.arrays.pop(term, None)
+
+    def term_postings(self, term: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        if term not in self.postings:
+            return None
+        if term not in self.arrays:
+            positions, term_frequencies = self.postings[term]
+            self.arrays[term] = (
+                np.asarray(positions, dtype=np.int64),
+                np.asarray(term_frequencies, dtype=np.float32),
+            )
+        return self.arrays[term]
+
+    def filter_mask(self, search_filter: SearchFilterModel) -> np.ndarray:
+        """Boolean mask of the chunks matching a search filter"""
+        tags = set(search_filter.tags)
+        return np.fromiter(
+            (
+                (
+                    search_filter.docs_type is None
+                    or docs_type == search_filter.docs_type
+                )
+                and (not tags or not chunk_tags.isdisjoint(tags))
+                for docs_type, chunk_tags in zip(self.docs_types, self.tags)
+            ),
+            dtype=bool,
+            count=len(self.chunk_ids),
+        )
+
+    def chunk_lengths(self) -> np.ndarray:
+        if self.length_array is None:
+            self.length_array = np.asarray(self.lengths, dtype=np.float32)
+        return self.length_array
+
+
+class KeywordIndex:
+    """
+    Local BM25 inverted index over the ingested chunks.
+
+    The term frequencies of every chunk are computed at ingestion time and stored in
+    SQLite together with the chunk, the inverted index of a collection is rebuilt in
+    memory from them on first search and kept up to date by `add`. Chunks share the
+    primary key of their Milvus row, so keyword and vector results can be fused.
+
+    Like the near duplicate signatures, the chunks of a collection are dropped with its
+    vector collection, searches never return chunks missing from the vector database.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _database_path = getenv("KEYWORD_INDEX_PATH", "./cache/keyword_index.sqlite3")
+        _k1 = getenv("BM25_K1", "1.2")
+        _b = getenv("BM25_B", "0.75")
+        _fetch_k = getenv("HYBRID_FETCH_K", "20")
+        _rrf_k = getenv("HYBRID_RRF_K", "60")
+
+        assert _database_path != "", (
+            "KEYWORD_INDEX_PATH environment variable is not set"
+        )
+        assert float(_k1) >= 0, "BM25_K1 environment variable is not valid"
+        assert 0 <= float(_b) <= 1, "BM25_B environment variable is not valid"
+        assert _fetch_k.isdigit() and int(_fetch_k) > 0, (
+            "HYBRID_FETCH_K environment variable is not valid"
+        )
+        assert _rrf_k.isdigit(), "HYBRID_RRF_K environment variable is not valid"
+
+        self.database_path = _database_path
+        self.k1 = float(_k1)
+        self.b = float(_b)
+        self.fetch_k = int(_fetch_k)
+        self.rrf_k = int(_rrf_k)
+
+        self.collections: dict[str, CollectionPostings] = {}
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_chunk (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                file_uuid TEXT NOT NULL,
+                content TEXT NOT NULL,
+                terms TEXT NOT NULL,
+                docs_type TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '[]',
+                PRIMARY KEY (collection, chunk_id)
+            );
+            """
+        )
+        # indexes created before search filters
+        columns = [
+            column[1]
+            for column in self.database.execute("PRAGMA table_info(keyword_chunk);")
+        ]
+        if "docs_type" not in columns:
+            self.database.execute(
+                "ALTER TABLE keyword_chunk ADD COLUMN docs_type TEXT NOT NULL DEFAULT '';"
+            )
+            self.database.execute(
+                "ALTER TABLE keyword_chunk ADD COLUMN tags TEXT NOT NULL DEFAULT '[]';"
+            )
+        # id of the vector collection the chunks were stored for
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS collection_generation (
+                collection TEXT PRIMARY KEY,
+                generation TEXT NOT NULL
+            );
+            """
+        )
+        self.database.commit()
+
+        self.logger.debug(f"Keyword index: {self.database_path}")
+
+    def reset_collection(self, collection: str) -> None:
+        """Drop every chunk of a collection, called when its vector collection is dropped or created"""
+        with self.lock:
+            self._clear(collection)
+            self.database.commit()
+
+    def sync_collection(self, collection: str, generation: str) -> None:
+        """
+        Drop the chunks of a collection stored for another vector collection of the same name.
+
+        Args:
+            collection (str): The collection name.
+            generation (str): Id of the vector collection, changes when it is recreated.
+        """
+        with self.lock:
+            row = self.database.execute(
+                "SELECT generation FROM collection_generation WHERE collection = ?;",
+                (collection,),
+            ).fetchone()
+            if row is not None and row[0] == generation:
+                return
+
+            # chunks stored before the generation was tracked are kept
+            if row is not None:
+                self.logger.warning(
+                    f"Collection `{collection}` was recreated, dropping its keyword index"
+                )
+                self._clear(collection)
+            self.database.execute(
+                "INSERT OR REPLACE INTO collection_generation VALUES (?, ?);",
+                (collection, generation),
+            )
+            self.database.commit()
+
+    def add(
+        self,
+        ids: list[str],
+        docs_filename: str,
+        contents: list[str],
+        file_uuid: str,
+        collection: str = "default",
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Index the chunks of a document, replacing chunks already indexed under the same id.
+
+        Args:
+            ids (list[str]): Milvus primary keys of the chunks.
+            docs_filename (str): The filename of the document containing the chunks.
+            contents (list[str]): The chunk contents, aligned with `ids`.
+            file_uuid (str): A unique identifier for the file.
+            collection (str, optional): The collection of the chunks. Defaults to "default".
+            docs_type (str, optional): The type of the document, used by search filters. Defaults to "".
+            tags (list[str], optional): The tags of the document, used by search filters. Defaults to None.
+        """
+        frequencies = [dict(Counter(tokenize(content))) for content in contents]
+
+        with self.lock:
+            self.database.executemany(
+                "INSERT OR REPLACE INTO keyword_chunk VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                [
+                    (
+                        collection,
+                        chunk_id,
+                        docs_filename,
+                        file_uuid,
+                        content,
+                        json.dumps(chunk_frequencies, ensure_ascii=False),
+                        docs_type,
+                        json.dumps(tags or [], ensure_ascii=False),
+                    )
+                    for chunk_id, content, chunk_frequencies in zip(
+                        ids, contents, frequencies
+                    )
+                ],
+            )
+            self.database.commit()
+
+            # collections not loaded yet pick the chunks up from SQLite on first search
+            if collection in self.collections:
+                for chunk_id, chunk_frequencies in zip(ids, frequencies):
+                    self.collections[collection].add(
+                        chunk_id, chunk_frequencies, docs_type, tags
+                    )
+
+    def search(
+        self,
+        question: str,
+        collection: str = "default",
+        limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> list[SearchSimilarityModel]:
+        """
+        Rank the chunks of a collection against a question with BM25.
+
+        Args:
+            question (str): The question text.
+            collection (str, optional): The collection to search. Defaults to "default".
+            limit (int, optional): Maximum number of chunks to retrieve. Defaults to 3.
+            search_filter (SearchFilterModel, optional): Only rank the chunks of this
+                docs_type and carrying any of these tags. Defaults to None.
+
+        Returns:
+            list[SearchSimilarityModel]: Matching chunks ordered by BM25 `score`.
+        """
+        terms = set(tokenize(question))
+
+        with self.lock:
+            postings = self._load(collection)
+            if not terms or not postings.chunk_ids:
+                return []
+
+            lengths = postings.chunk_lengths()
+            chunk_count = len(lengths)
+            length_norm = self.k1 * (1 - self.b + self.b * lengths / lengths.mean())
+
+            scores = np.zeros(chunk_count, dtype=np.float32)
+            for term in terms:
+                term_postings = postings.term_postings(term)
+                if term_postings is None:
+                    continue
+
+                positions, frequencies = term_postings
+                idf = math.log(
+                    1 + (chunk_count - len(positions) + 0.5) / (len(positions) + 0.5)
+                )
+                scores[positions] += (
+                    idf
+                    * frequencies
+                    * (self.k1 + 1)
+                    / (frequencies + length_norm[positions])
+                )
+
+            if search_filter is not None:
+                scores[~postings.filter_mask(search_filter)] = 0
+
+            matched = np.flatnonzero(scores)
+            ranked = matched[np.argsort(-scores[matched], kind="stable")[:limit]]
+            ranked_ids = [postings.chunk_ids[position] for position in ranked]
+            if not ranked_ids:
+                return []
+
+            rows = self.database.execute(
+                f"""
+                SELECT chunk_id, source, file_uuid, content FROM keyword_chunk
+                WHERE collection = ? AND chunk_id IN ({", ".join("?" * len(ranked_ids))});
+                """,
+                (collection, *ranked_ids),
+            ).fetchall()
+
+        chunk_scores = dict(zip(ranked_ids, scores[ranked].tolist()))
+        chunks = {
+            chunk_id: SearchSimilarityModel(
+                id=chunk_id,
+                source=source,
+                file_uuid=file_uuid,
+                content=content,
+                score=chunk_scores[chunk_id],
+            )
+            for chunk_id, source, file_uuid, content in rows
+        }
+
+        return [chunks[chunk_id] for chunk_id in ranked_ids if chunk_id in chunks]
+
+    def _clear(self, collection: str) -> None:
+        """Drop the chunks of a collection without committing, caller holds the lock"""
+        self.database.execute(
+            "DELETE FROM keyword_chunk WHERE collection = ?;", (collection,)
+        )
+        self.database.execute(
+            "DELETE FROM collection_generation WHERE collection = ?;", (collection,)
+        )
+        self.collections.pop(collection, None)
+
+    def _load(self, collection: str) -> CollectionPostings:
+        """Build the in-memory postings of a collection from SQLite, caller holds the lock"""
+        if collection not in self.collections:
+            postings = CollectionPostings()
+            for chunk_id, terms, docs_type, tags in self.database.execute(
+                """
+                SELECT chunk_id, terms, docs_type, tags FROM keyword_chunk
+                WHERE collection = ?;
+                """,
+                (collection,),
+            ):
+                postings.add(chunk_id, json.loads(terms), docs_type, json.loads(tags))
+
+            self.collections[collection] = postings
+            self.logger.debug(
+                f"Loaded keyword index `{collection}`: {len(postings.chunk_ids)} chunks"
+            )
+
+        return self.collections[collection]
+
+
+keyword_index = KeywordIndex()
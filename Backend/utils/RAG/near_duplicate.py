@@ -0,0 +1,371 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.logger import CustomLoggerHandler
+from Backend.utils.RAG.keyword_index import tokenize
+
+from typing import Optional
+from os import getenv
+
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import json
+import os
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+_PERMUTATIONS = 128
+_BANDS = 16
+_ROWS = _PERMUTATIONS // _BANDS
+# chunks with fewer terms have unreliable signatures, only identical signatures match
+_MIN_TERMS = 8
+
+# stored signatures depend on the permutations, the seed must never change
+_random = np.random.default_rng(20250101)
+# multiply shift hashing, (a * x + b) mod 2^64 >> 32 with odd a
+_A = _random.integers(0, 1 << 63, _PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _random.integers(0, 1 << 63, _PERMUTATIONS, dtype=np.uint64)
+
+
+def minhash(text: str) -> np.ndarray:
+    """
+    MinHash signature of the term set of a text.
+
+    The fraction of equal positions between two signatures estimates the Jaccard
+    similarity of the two term sets.
+
+    Args:
+        text (str): Text to fingerprint.
+
+    Returns:
+        np.ndarray: uint32 signature of 128 permutations.
+    """
+    terms = set(tokenize(text))
+    if not terms:
+        return np.zeros(_PERMUTATIONS, dtype=np.uint32)
+
+    hashes = np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(term.encode(), digest_size=4).digest(), "little"
+            )
+            for term in terms
+        ),
+        dtype=np.uint64,
+        count=len(terms),
+    )
+    # uint64 arithmetic wraps, which is the mod 2^64
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class CollectionSignatures:
+    """In memory LSH buckets of the chunk signatures of a collection scope"""
+
+    def __init__(self) -> None:
+        self.chunk_ids: list[str] = []
+        self.signatures: list[np.ndarray] = []
+        self.buckets: dict[tuple[int, bytes], list[int]] = {}
+
+    @staticmethod
+    def band_keys(signature: np.ndarray) -> list[tuple[int, bytes]]:
+        return [
+            (band, signature[band * _ROWS : (band + 1) * _ROWS].tobytes())
+            for band in range(_BANDS)
+        ]
+
+    def add(self, chunk_id: str, signature: np.ndarray) -> None:
+        position = len(self.chunk_ids)
+        self.chunk_ids.append(chunk_id)
+        self.signatures.append(signature)
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, []).append(position)
+
+    def nearest(self, signature: np.ndarray, threshold: float) -> Optional[str]:
+        """Chunk id of the most similar signature reaching `threshold`, None if there is none"""
+        candidates = {
+            position
+            for key in self.band_keys(signature)
+            for position in self.buckets.get(key, [])
+        }
+        if not candidates:
+            return None
+
+        positions = list(candidates)
+        similarities = (
+            np.stack([self.signatures[position] for position in positions]) == signature
+        ).mean(axis=1)
+        best = int(np.argmax(similarities))
+
+        return (
+            self.chunk_ids[positions[best]] if similarities[best] >= threshold else None
+        )
+
+
+class NearDuplicateIndex:
+    """
+    Ingestion time near duplicate detection.
+
+    Every stored chunk gets a MinHash signature split into 16 bands of 8 rows used as
+    LSH buckets, chunks sharing a bucket are compared on their whole signature, which
+    estimates the Jaccard similarity of their terms. Signatures are persisted in a
+    local SQLite file and loaded per scope on first use.
+
+    A scope is a collection, docs_type and tag set. Chunks are only compared with chunks
+    stored under the same search filter metadata, so a document uploaded again under
+    another docs_type or other tags is stored with that metadata and filtered searches
+    still find it.
+
+    Signatures live as long as the vector collection their chunks were inserted into.
+    The vector database drops them when it drops or creates the collection
+    (`reset_collection`) and when it reports another collection id than the one they
+    were registered for (`sync_collection`), so a recreated collection is filled again.
+
+    NEAR_DUPLICATE_MODE
+        - skip: near duplicates of stored chunks are not inserted,
+        - off: every chunk is inserted.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        self.mode = getenv("NEAR_DUPLICATE_MODE", "skip")
+        _threshold = getenv("NEAR_DUPLICATE_THRESHOLD", "0.8")
+        _database_path = getenv(
+            "NEAR_DUPLICATE_INDEX_PATH", "./cache/near_duplicate.sqlite3"
+        )
+
+        assert self.mode in ["skip", "off"], (
+            "NEAR_DUPLICATE_MODE environment variable is not valid"
+        )
+        assert 0 < float(_threshold) <= 1, (
+            "NEAR_DUPLICATE_THRESHOLD environment variable is not valid"
+        )
+        assert _database_path != "", (
+            "NEAR_DUPLICATE_INDEX_PATH environment variable is not set"
+        )
+
+        self.threshold = float(_threshold)
+        self.database_path = _database_path
+
+        # (collection, docs_type, tags json) -> signatures
+        self.scopes: dict[tuple[str, str, str], CollectionSignatures] = {}
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_signature (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                file_uuid TEXT NOT NULL,
+                docs_type TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '[]',
+                signature BLOB NOT NULL,
+                PRIMARY KEY (collection, chunk_id)
+            );
+            """
+        )
+        # signatures registered before scopes
+        columns = [
+            column[1]
+            for column in self.database.execute("PRAGMA table_info(chunk_signature);")
+        ]
+        if "docs_type" not in columns:
+            self.database.execute(
+                "ALTER TABLE chunk_signature ADD COLUMN docs_type TEXT NOT NULL DEFAULT '';"
+            )
+            self.database.execute(
+                "ALTER TABLE chunk_signature ADD COLUMN tags TEXT NOT NULL DEFAULT '[]';"
+            )
+        # id of the vector collection the signatures were registered for
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS collection_generation (
+                collection TEXT PRIMARY KEY,
+                generation TEXT NOT NULL
+            );
+            """
+        )
+        self.database.commit()
+
+        self.logger.debug(
+            f"Near duplicate mode: {self.mode}, threshold: {self.threshold}"
+        )
+
+    def reset_collection(self, collection: str) -> None:
+        """Drop every signature of a collection, called when its vector collection is dropped or created"""
+        with self.lock:
+            self._clear(collection)
+            self.database.commit()
+
+    def sync_collection(self, collection: str, generation: str) -> None:
+        """Drop the signatures of a collection registered for another vector collection of the same name"""
+        with self.lock:
+            row = self.database.execute(
+                "SELECT generation FROM collection_generation WHERE collection = ?;",
+                (collection,),
+            ).fetchone()
+            if row is not None and row[0] == generation:
+                return
+
+            # signatures registered before the generation was tracked are kept
+            if row is not None:
+                self.logger.warning(
+                    f"Collection `{collection}` was recreated, dropping its signatures"
+                )
+                self._clear(collection)
+            self.database.execute(
+                "INSERT OR REPLACE INTO collection_generation VALUES (?, ?);",
+                (collection, generation),
+            )
+            self.database.commit()
+
+    @staticmethod
+    def scope(collection: str, docs_type: str, tags: list[str]) -> tuple[str, str, str]:
+        """Key of the chunks sharing a collection and search filter metadata"""
+        return collection, docs_type, json.dumps(sorted(set(tags)), ensure_ascii=False)
+
+    def find(
+        self,
+        collection: str,
+        docs_type: str,
+        tags: list[str],
+        chunk_ids: list[str],
+        contents: list[str],
+    ) -> list[Optional[str]]:
+        """
+        Find the near duplicates among chunks about to be inserted.
+
+        A chunk is a near duplicate when the estimated Jaccard similarity of its terms
+        reaches NEAR_DUPLICATE_THRESHOLD with a chunk stored in `collection` under the
+        same docs_type and tags, or with an earlier chunk of the same upload.
+
+        Args:
+            collection (str): The collection the chunks are inserted into.
+            docs_type (str): The type of the document of the chunks.
+            tags (list[str]): The tags of the document of the chunks.
+            chunk_ids (list[str]): Primary keys of the chunks.
+            contents (list[str]): Contents of the chunks.
+
+        Returns:
+            list[Optional[str]]: For every chunk, the chunk id it duplicates, None if it is new.
+        """
+        if self.mode == "off":
+            return [None] * len(contents)
+
+        upload = CollectionSignatures()
+        duplicates: list[Optional[str]] = []
+
+        with self.lock:
+            stored = self._load(self.scope(collection, docs_type, tags))
+
+            for chunk_id, content in zip(chunk_ids, contents):
+                signature = minhash(content)
+                threshold = (
+                    self.threshold if len(set(tokenize(content))) >= _MIN_TERMS else 1.0
+                )
+                duplicate_of = stored.nearest(signature, threshold) or upload.nearest(
+                    signature, threshold
+                )
+                duplicates.append(duplicate_of)
+                if duplicate_of is None:
+                    upload.add(chunk_id, signature)
+
+        return duplicates
+
+    def add(
+        self,
+        collection: str,
+        docs_type: str,
+        tags: list[str],
+        chunk_ids: list[str],
+        contents: list[str],
+        file_uuid: str,
+    ) -> None:
+        """Register the signatures of chunks inserted into `collection` with `docs_type` and `tags`"""
+        if self.mode == "off":
+            return
+
+        scope = self.scope(collection, docs_type, tags)
+        signatures = [minhash(content) for content in contents]
+
+        with self.lock:
+            # an upsert moved these chunks out of another scope, reload it without them
+            inserted = set(chunk_ids)
+            for other_scope in [
+                other_scope
+                for other_scope, stored in self.scopes.items()
+                if other_scope[0] == collection
+                and other_scope != scope
+                and not inserted.isdisjoint(stored.chunk_ids)
+            ]:
+                del self.scopes[other_scope]
+
+            stored = self._load(scope)
+            for chunk_id, signature in zip(chunk_ids, signatures):
+                stored.add(chunk_id, signature)
+
+            self.database.executemany(
+                """
+                INSERT OR REPLACE INTO chunk_signature (
+                    collection, chunk_id, file_uuid, docs_type, tags, signature
+                )
+                VALUES (?, ?, ?, ?, ?, ?);
+                """,
+                [
+                    (
+                        collection,
+                        chunk_id,
+                        file_uuid,
+                        scope[1],
+                        scope[2],
+                        signature.tobytes(),
+                    )
+                    for chunk_id, signature in zip(chunk_ids, signatures)
+                ],
+            )
+            self.database.commit()
+
+    def _clear(self, collection: str) -> None:
+        """Drop the signatures of a collection without committing, caller holds the lock"""
+        self.database.execute(
+            "DELETE FROM chunk_signature WHERE collection = ?;", (collection,)
+        )
+        self.database.execute(
+            "DELETE FROM collection_generation WHERE collection = ?;", (collection,)
+        )
+        for scope in [scope for scope in self.scopes if scope[0] == collection]:
+            del self.scopes[scope]
+
+    def _load(self, scope: tuple[str, str, str]) -> CollectionSignatures:
+        """Signatures of a scope, loaded from SQLite on first use, caller holds the lock"""
+        if scope in self.scopes:
+            return self.scopes[scope]
+
+        signatures = CollectionSignatures()
+        for chunk_id, signature in self.database.execute(
+            """
+            SELECT chunk_id, signature FROM chunk_signature
+            WHERE collection = ? AND docs_type = ? AND tags = ?;
+            """,
+            scope,
+        ):
+            signatures.add(chunk_id, np.frombuffer(signature, dtype=np.uint32))
+
+        self.scopes[scope] = signatures
+        self.logger.debug(f"Loaded {len(signatures.chunk_ids)} signatures of {scope}")
+        return signatures
+
+
+near_duplicate_index = NearDuplicateIndex()
@@ -14,7 +14,7 @@ from .responser.openai_responser import OpenAIResponser
 from .responser.afs_responser import AFSResponser
 from .responser.openai_compatible_responser import OpenaiCompatibleResponser
 
-from typing import Literal, Optional, Union
+from typing import AsyncIterator, Literal, Optional, Union
 from pprint import pformat
 from os import getenv
 
@@ -154,6 +154,83 @@ class ResponseHandler:
 
         return answer, token
 
+    async def async_generate_response(
+        self,
+        question: list[str],
+        queried_document: list[str],
+        images: Optional[list[str] | None] = None,
+        question_type: Literal["CHATTING", "TESTING", "THEOREM"] = "CHATTING",
+        language: Literal["ENGLISH", "CHINESE"] = "CHINESE",
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> tuple[str, int]:
+        """Same as `generate_response` but awaits the responser without blocking the event loop"""
+        conversation = self._format_conversation_messages(
+            chat_history=question,
+            language=language,
+            question_type=question_type,
+            queried_document=queried_document,
+        )
+
+        self.logger.debug(pformat(conversation.model_dump(mode="python")))
+
+        answer, token = await self.Responser.async_response(
+            conversation=conversation,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p,
+            frequence_penalty=frequence_penalty,
+            images=images,
+        )
+
+        self.logger.debug(f"Response: {answer} ,Token count: {token}")
+
+        return answer, token
+
+    async def async_stream_response(
+        self,
+        question: list[str],
+        queried_document: list[str],
+        images: Optional[list[str] | None] = None,
+        question_type: Literal["CHATTING", "TESTING", "THEOREM"] = "CHATTING",
+        language: Literal["ENGLISH", "CHINESE"] = "CHINESE",
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> AsyncIterator[tuple[str, int]]:
+        """
+        Stream the response as the responser produces it.
+
+        Yields:
+            tuple[str, int]: The generated text delta and the token count reported so far,
+                the token count is 0 on chunks that do not carry usage information.
+        """
+        conversation = self._format_conversation_messages(
+            chat_history=question,
+            language=language,
+            question_type=question_type,
+            queried_document=queried_document,
+        )
+
+        self.logger.debug(pformat(conversation.model_dump(mode="python")))
+
+        async for text, token in self.Responser.async_stream_response(
+            conversation=conversation,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p,
+            frequence_penalty=frequence_penalty,
+            images=images,
+        ):
+            yield text, token
+
     def _format_conversation_messages(
         self,
         queried_document: list[str],
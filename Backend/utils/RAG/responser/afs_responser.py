@@ -6,10 +6,11 @@ from Backend.utils.helper.model.RAG.response_handler import (
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
 
-from typing import Optional
+from typing import AsyncIterator, Optional
 from os import getenv
 
 import requests  # type: ignore
+import httpx
 import json
 
 # development
@@ -43,6 +44,9 @@ class AFSResponser:
         self.api_key = self.AFS_config.afs_api_key
         self.model_name = self.AFS_config.afs_model_name
 
+        # pooled client shared by every async request
+        self.async_client = httpx.AsyncClient(timeout=None)
+
     def response(
         self,
         conversation: ConversationMessagesModel,
@@ -76,15 +80,125 @@ class AFSResponser:
             ValueError: If the API response is invalid or missing expected data.
         """
 
-        headers = {
+        response = requests.post(
+            self.url,
+            headers=self._headers(),
+            data=json.dumps(
+                self._request_data(
+                    conversation,
+                    max_tokens,
+                    temperature,
+                    top_k,
+                    top_p,
+                    frequence_penalty,
+                )
+            ),
+        )
+
+        return self._parse_response(response.json())
+
+    async def async_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> tuple[str, int]:
+        """Same as `response` but sent through the pooled async HTTP client"""
+        response = await self.async_client.post(
+            self.url,
+            headers=self._headers(),
+            content=json.dumps(
+                self._request_data(
+                    conversation,
+                    max_tokens,
+                    temperature,
+                    top_k,
+                    top_p,
+                    frequence_penalty,
+                )
+            ),
+        )
+
+        return self._parse_response(response.json())
+
+    async def async_stream_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> AsyncIterator[tuple[str, int]]:
+        """
+        Stream the response from AFS chunk by chunk using `"stream": true`,
+        AFS replies with server-sent events carrying one `generated_text` delta each.
+
+        Yields:
+            tuple[str, int]: The generated text delta and the prompt token count.
+        """
+        data = self._request_data(
+            conversation, max_tokens, temperature, top_k, top_p, frequence_penalty
+        )
+        data["stream"] = True
+
+        async with self.async_client.stream(
+            "POST", self.url, headers=self._headers(), content=json.dumps(data)
+        ) as response:
+            # a trailing "*" is held back, the other half of a "**" may be in the next delta
+            pending = ""
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                payload = line.removeprefix("data:").strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipped AFS stream line: {payload}")
+                    continue
+                if not isinstance(chunk, dict):
+                    continue
+
+                text = (pending + (chunk.get("generated_text") or "")).replace("**", "")
+                pending = "*" if text.endswith("*") else ""
+                yield text.removesuffix(pending), chunk.get("prompt_tokens") or 0
+
+            if pending:
+                yield pending, 0
+
+    def _headers(self) -> dict[str, str]:
+        return {
             "Content-Type": "application/json",
             "X-API-HOST": "afs-inference",
             "X-API-KEY": self.api_key,
         }
 
-        data = {
+    def _request_data(
+        self,
+        conversation: ConversationMessagesModel,
+        max_tokens: int,
+        temperature: float,
+        top_k: int,
+        top_p: int,
+        frequence_penalty: int,
+    ) -> dict:
+        messages = conversation.model_dump(mode="python")["message"]
+
+        # AFS conversation API takes plain text content
+        for message in messages:
+            message["content"] = message["content"][0]["text"]
+
+        return {
             "model": self.model_name,
-            "messages": conversation,
+            "messages": messages,
             "parameters": {
                 "max_new_tokens": max_tokens,
                 "temperature": temperature,
@@ -94,8 +208,7 @@ class AFSResponser:
             },
         }
 
-        response = requests.post(self.url, headers=headers, data=json.dumps(data))
-        response_data = response.json()
+    def _parse_response(self, response_data: dict) -> tuple[str, int]:
         return response_data.get("generated_text").replace("**", ""), response_data.get(
             "prompt_tokens"
         )
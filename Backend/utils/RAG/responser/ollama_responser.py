@@ -6,9 +6,9 @@ from Backend.utils.helper.model.RAG.response_handler import (
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
 
-from ollama import Client
+from ollama import AsyncClient, ChatResponse, Client
 
-from typing import Optional
+from typing import AsyncIterator, Optional
 from pprint import pformat
 from os import getenv
 
@@ -52,6 +52,9 @@ class OllamaResponser:
             self.ollama_client = Client(
                 host=self.ollama_host_url,
             )
+            self.ollama_async_client = AsyncClient(
+                host=self.ollama_host_url,
+            )
         except Exception as e:
             self.logger.error(f"Failed to initialize OLLAMA client: {e}")
 
@@ -65,6 +68,67 @@ class OllamaResponser:
         top_p: int = 1,
         frequence_penalty: int = 1,
     ) -> tuple[str, int]:
+        response = self.ollama_client.chat(
+            model=self.ollama_model_name,
+            messages=self._format_messages(conversation),
+            options=self._format_options(
+                max_tokens, temperature, top_k, top_p, frequence_penalty
+            ),
+        )
+
+        return self._parse_response(response)
+
+    async def async_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> tuple[str, int]:
+        """Same as `response` but awaits ollama's async client instead of blocking"""
+        response = await self.ollama_async_client.chat(
+            model=self.ollama_model_name,
+            messages=self._format_messages(conversation),
+            options=self._format_options(
+                max_tokens, temperature, top_k, top_p, frequence_penalty
+            ),
+        )
+
+        return self._parse_response(response)
+
+    async def async_stream_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> AsyncIterator[tuple[str, int]]:
+        """
+        Stream the response from ollama chunk by chunk.
+
+        Yields:
+            tuple[str, int]: The generated text delta and the prompt token count,
+                the token count is 0 until ollama reports it on the final chunk.
+        """
+        stream = await self.ollama_async_client.chat(
+            model=self.ollama_model_name,
+            messages=self._format_messages(conversation),
+            options=self._format_options(
+                max_tokens, temperature, top_k, top_p, frequence_penalty
+            ),
+            stream=True,
+        )
+
+        async for chunk in stream:
+            yield chunk.message.content or "", chunk.prompt_eval_count or 0
+
+    def _format_messages(self, conversation: ConversationMessagesModel) -> list[dict]:
         ollama_conversation = conversation.model_dump(mode="python")["message"]
         self.logger.info(pformat(conversation))
 
@@ -73,18 +137,25 @@ class OllamaResponser:
             self.logger.info(x)
             ollama_conversation[i]["content"] = x["content"][0]["text"]
 
-        response = self.ollama_client.chat(
-            model=self.ollama_model_name,
-            messages=ollama_conversation,
-            options={
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "top_k": top_k,
-                "top_p": top_p,
-                "frequency_penalty": frequence_penalty,
-            },
-        )
+        return ollama_conversation
 
+    def _format_options(
+        self,
+        max_tokens: int,
+        temperature: float,
+        top_k: int,
+        top_p: int,
+        frequence_penalty: int,
+    ) -> dict:
+        return {
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_k": top_k,
+            "top_p": top_p,
+            "frequency_penalty": frequence_penalty,
+        }
+
+    def _parse_response(self, response: ChatResponse) -> tuple[str, int]:
         if not response.message.content:
             self.logger.error("Failed to generate OLLAMA response")
             return "", 0
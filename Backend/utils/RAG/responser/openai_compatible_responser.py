@@ -6,7 +6,7 @@ from Backend.utils.helper.model.RAG.response_handler import (
     ConversationMessagesModel,
 )
 
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 
 class OpenaiCompatibleResponser:
@@ -25,3 +25,27 @@ class OpenaiCompatibleResponser:
         frequence_penalty: int = 1,
     ) -> tuple[str, int]:
         return "", 0
+
+    async def async_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> tuple[str, int]:
+        return "", 0
+
+    async def async_stream_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> AsyncIterator[tuple[str, int]]:
+        yield "", 0
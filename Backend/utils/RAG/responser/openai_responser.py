@@ -6,9 +6,10 @@ from Backend.utils.helper.model.RAG.response_handler import (
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
 
-from typing import Optional
+from typing import AsyncIterator, Optional
 from pprint import pformat
 from os import getenv
 
@@ -26,6 +27,7 @@ class OpenAIResponser:
     def __init__(self) -> None:
         self.logger = CustomLoggerHandler().get_logger()
         self.client = OpenAI()
+        self.async_client = AsyncOpenAI()
 
     def initialization(self) -> None:
         _openai_api_key = getenv("OPENAI_API_KEY")
@@ -47,6 +49,7 @@ class OpenAIResponser:
         self.openai_api_key = self.openai_config.openai_api_key
 
         self.client.api_key = self.openai_api_key
+        self.async_client.api_key = self.openai_api_key
 
         # try:
         #     self.openai_client = self.client.completions.create(
@@ -65,6 +68,77 @@ class OpenAIResponser:
         top_p: int = 1,
         frequence_penalty: int = 1,
     ) -> tuple[str, int]:
+        response = self.client.chat.completions.create(
+            model=self.openai_model_name,
+            messages=self._format_messages(conversation, images),
+            frequency_penalty=frequence_penalty,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+        )
+
+        return self._parse_response(response)
+
+    async def async_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> tuple[str, int]:
+        """Same as `response` but awaits the async OpenAI client instead of blocking"""
+        response = await self.async_client.chat.completions.create(
+            model=self.openai_model_name,
+            messages=self._format_messages(conversation, images),
+            frequency_penalty=frequence_penalty,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+        )
+
+        return self._parse_response(response)
+
+    async def async_stream_response(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+        max_tokens: int = 8192,
+        temperature: float = 0.6,
+        top_k: int = 30,
+        top_p: int = 1,
+        frequence_penalty: int = 1,
+    ) -> AsyncIterator[tuple[str, int]]:
+        """
+        Stream the response from OpenAI chunk by chunk.
+
+        Yields:
+            tuple[str, int]: The generated text delta and the total token count,
+                the token count is 0 until the final usage chunk.
+        """
+        stream = await self.async_client.chat.completions.create(
+            model=self.openai_model_name,
+            messages=self._format_messages(conversation, images),
+            frequency_penalty=frequence_penalty,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content or "" if chunk.choices else ""
+            token_count = chunk.usage.total_tokens if chunk.usage else 0
+            yield text, token_count
+
+    def _format_messages(
+        self,
+        conversation: ConversationMessagesModel,
+        images: Optional[list[str] | None] = None,
+    ) -> list[dict]:
         if images:
             for base64_image in images:
                 conversation.message[-1].content.append(
@@ -76,22 +150,17 @@ class OpenAIResponser:
                     )
                 )
 
-        response = self.client.chat.completions.create(
-            model=self.openai_model_name,
-            messages=conversation.model_dump(mode="python")["message"],
-            frequency_penalty=frequence_penalty,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            top_p=top_p,
-        )
-        response_dump = response.model_dump(mode="python")
-
-        self.logger.debug(pformat(response_dump))
+        return conversation.model_dump(mode="python")["message"]
 
+    def _parse_response(self, response: ChatCompletion) -> tuple[str, int]:
         if not response:
             self.logger.error("Failed to generate OpenAI response")
             return "", 0
 
+        response_dump = response.model_dump(mode="python")
+
+        self.logger.debug(pformat(response_dump))
+
         token_count = response_dump["usage"]["total_tokens"] or 0
         message_dump = response.choices[0].message.model_dump(mode="python")
 
@@ -0,0 +1,201 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import (
+    SearchSimilarityModel,
+    SearchFilterModel,
+)
+from Backend.utils.helper.model.RAG.retrieval_cache import RetrievalCacheStatsModel
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from collections import OrderedDict
+from typing import Literal, Optional
+from os import getenv
+
+import numpy as np
+import unicodedata
+import threading
+import time
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class RetrievalCache:
+    """
+    TTL + LRU cache of retrieval results.
+
+    Entries are keyed by the normalized question text, collection, top-k, retrieval mode
+    and search filter, and hold the question embedding with the retrieved documents.
+    Every collection has a version counter, bumped whenever its documents change,
+    an entry stored under an older version is treated as a miss.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _cache_size = getenv("RETRIEVAL_CACHE_SIZE", "1024")
+        _ttl = getenv("RETRIEVAL_CACHE_TTL", "600")
+
+        assert _cache_size.isdigit(), (
+            "RETRIEVAL_CACHE_SIZE environment variable is not valid"
+        )
+        assert _ttl.isdigit() and int(_ttl) > 0, (
+            "RETRIEVAL_CACHE_TTL environment variable is not valid"
+        )
+
+        self.cache_size = int(_cache_size)
+        self.ttl = int(_ttl)
+
+        # key -> (collection version, expire time, question vector, documents)
+        self.entries: OrderedDict[
+            tuple[str, ...],
+            tuple[int, float, np.ndarray, list[SearchSimilarityModel]],
+        ] = OrderedDict()
+        self.collection_versions: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+        self.logger.debug(f"Retrieval cache size: {self.cache_size}, ttl: {self.ttl}s")
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", question).lower().split())
+
+    def _key(
+        self,
+        question: str,
+        collection: str,
+        limit: int,
+        retrieval_mode: Literal["vector", "keyword", "hybrid"],
+        search_filter: Optional[SearchFilterModel],
+    ) -> tuple[str, ...]:
+        filter_key = search_filter.model_dump_json() if search_filter else ""
+        return (
+            self._normalize(question),
+            collection,
+            str(limit),
+            retrieval_mode,
+            filter_key,
+        )
+
+    def get(
+        self,
+        question: str,
+        collection: str,
+        limit: int,
+        retrieval_mode: Literal["vector", "keyword", "hybrid"] = "vector",
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> Optional[tuple[np.ndarray, list[SearchSimilarityModel]]]:
+        """
+        Look up the retrieval result of an identical question.
+
+        Args:
+            question (str): The question text, compared after normalization.
+            collection (str): Collection the documents are retrieved from.
+            limit (int): Number of retrieved documents.
+            retrieval_mode (Literal["vector", "keyword", "hybrid"], optional): Retrieval mode. Defaults to "vector".
+            search_filter (SearchFilterModel, optional): docs_type and tags filter. Defaults to None.
+
+        Returns:
+            Optional[tuple[np.ndarray, list[SearchSimilarityModel]]]: The question vector and
+                the retrieved documents, None on a miss.
+        """
+        key = self._key(question, collection, limit, retrieval_mode, search_filter)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            version, expire_time, question_vector, documents = entry
+            if version != self.collection_versions.get(collection, 0):
+                del self.entries[key]
+                self.invalidated += 1
+                self.misses += 1
+                return None
+            if expire_time < time.monotonic():
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return question_vector, list(documents)
+
+    def set(
+        self,
+        question: str,
+        collection: str,
+        limit: int,
+        retrieval_mode: Literal["vector", "keyword", "hybrid"],
+        search_filter: Optional[SearchFilterModel],
+        question_vector: np.ndarray,
+        documents: list[SearchSimilarityModel],
+        version: int,
+    ) -> None:
+        """Store a retrieval result made at collection `version`, evicting the least recently used entries when full"""
+        if self.cache_size == 0:
+            return
+
+        key = self._key(question, collection, limit, retrieval_mode, search_filter)
+
+        with self.lock:
+            # the collection changed while this result was retrieved
+            if version != self.collection_versions.get(collection, 0):
+                return
+
+            self.entries[key] = (
+                version,
+                time.monotonic() + self.ttl,
+                question_vector,
+                list(documents),
+            )
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.cache_size:
+                self.entries.popitem(last=False)
+
+    def version(self, collection: str) -> int:
+        """Current version of `collection`, read before retrieving a result to be cached"""
+        with self.lock:
+            return self.collection_versions.get(collection, 0)
+
+    def bump(self, collection: str) -> None:
+        """Invalidate every cached result of `collection`, called when its documents are inserted or deleted"""
+        with self.lock:
+            self.collection_versions[collection] = (
+                self.collection_versions.get(collection, 0) + 1
+            )
+
+        self.logger.debug(
+            f"Retrieval cache version of {collection}: {self.collection_versions[collection]}"
+        )
+
+    def stats(self) -> RetrievalCacheStatsModel:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return RetrievalCacheStatsModel(
+                entries=len(self.entries),
+                hits=self.hits,
+                misses=self.misses,
+                expired=self.expired,
+                invalidated=self.invalidated,
+                hit_rate=self.hits / lookups if lookups else 0.0,
+                collection_versions=dict(self.collection_versions),
+            )
+
+
+retrieval_cache = RetrievalCache()
@@ -5,17 +5,25 @@ from Backend.utils.helper.model.RAG.vector_extractor import (
     OLLAMAEmbeddingConfig,
     EmbeddingDeployModel,
     OPENAIEmbeddingConfig,
+    EmbeddingCacheStatsModel,
 )
 from Backend.utils.helper.logger import CustomLoggerHandler
 
-from typing import Union
-from openai import OpenAI
-from ollama import Client
+from collections import OrderedDict
+from typing import Optional, Union
+from openai import AsyncOpenAI, OpenAI
+from ollama import AsyncClient, Client
 from os import getenv
 
 import numpy as np
 import requests  # type: ignore
+import threading
+import asyncio
+import hashlib
+import sqlite3
+import httpx
 import json
+import os
 
 # development
 GLOBAL_DEBUG_MODE = getenv("DEBUG")
@@ -34,19 +42,19 @@ class VectorHandler:
         self.logger = CustomLoggerHandler().get_logger()
 
         _mode = getenv("EMBEDDING_DEPLOY_MODE")
-        _vector_dim = getenv("MILVUS_VECTOR_DIM")
+        _batch_size = getenv("EMBEDDING_BATCH_SIZE", "32")
 
         assert (
             _mode is not None
             and _mode != ""
             and _mode in ["local", "openai", "ollama", "afs"]
         ), "EMBEDDING_DEPLOY_MODE environment variable is not set or not valid"
-        assert (
-            _vector_dim is not None and _vector_dim != "" and int(_vector_dim) >= 8
-        ), "MILVUS_VECTOR_DIM environment variable is not set or not valid"
+        assert _batch_size.isdigit() and int(_batch_size) > 0, (
+            "EMBEDDING_BATCH_SIZE environment variable is not valid"
+        )
 
         self.EMBEDDING_DEPLOY_MODE = EmbeddingDeployModel(mode=_mode).mode
-        self.vector_dim = int(_vector_dim)
+        self.batch_size = int(_batch_size)
 
         self.logger.debug(f"Embedding DEPLOY MODE: {self.EMBEDDING_DEPLOY_MODE}")
         self.vector_encoder: Union[
@@ -76,21 +84,374 @@ class VectorHandler:
 
         self.vector_encoder.initialization()
 
+        # collections are created with the native dimension of the model, no padding
+        self.vector_dim = len(self.vector_encoder.encode("dimension probe"))
+        self.logger.info(
+            f"Embedding model {self.vector_encoder.model_name}: {self.vector_dim} dimensions"
+        )
+
+        _configured_dim = getenv("MILVUS_VECTOR_DIM")
+        if _configured_dim and int(_configured_dim) != self.vector_dim:
+            self.logger.warning(
+                f"MILVUS_VECTOR_DIM={_configured_dim} is ignored, using the model dimension {self.vector_dim}"
+            )
+
+        # vectors cached before they were normalized live in the namespace without suffix
+        self.cache = EmbeddingCache(
+            namespace=f"{self.EMBEDDING_DEPLOY_MODE}:{self.vector_encoder.model_name}:{self.vector_dim}:unit",
+        )
+
     def encoder(self, text: str) -> np.ndarray:
-        vector = self.vector_encoder.encode(text)
+        vector = self.cache.get(text)
+        if vector is not None:
+            return vector
+
+        vector = self._as_vector(self.vector_encoder.encode(text))
+        self.cache.set(text, vector)
+
+        return vector
+
+    def encode_batch(
+        self, texts: list[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Encode a list of texts into a stacked matrix of vector embeddings.
+
+        Cached texts are served from the embedding cache, the remaining unique texts
+        are sent to the provider in chunks of `batch_size` using its multi-input
+        endpoint, so the number of requests grows with the number of batches
+        rather than the number of texts.
+
+        Args:
+            texts (list[str]): The input texts to be encoded.
+            batch_size (int, optional): Number of texts per request. Defaults to
+                EMBEDDING_BATCH_SIZE, capped by the encoder's `max_batch_size`.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), vector_dim),
+                one row per input text in the same order.
+        """
+        batch_size = self._batch_size(batch_size)
+        vectors = np.zeros((len(texts), self.vector_dim), dtype=np.float32)
+        missing_texts = self._lookup_cache(texts, vectors)
+        uncached_texts = list(missing_texts)
+
+        embeddings: list[list[float]] = []
+        for start in range(0, len(uncached_texts), batch_size):
+            batch = uncached_texts[start : start + batch_size]
+            embeddings.extend(self.vector_encoder.encode_batch(batch))
+
+            self.logger.debug(
+                f"Encoded batch {start // batch_size + 1}: {len(batch)} texts"
+            )
+
+        self._fill_encoded(vectors, missing_texts, embeddings)
+
+        return vectors
+
+    async def async_encoder(self, text: str) -> np.ndarray:
+        """Same as `encoder` but awaits the provider's async client, see `async_encode_batch`"""
+        loop = asyncio.get_running_loop()
+        vector = self.cache.get_many([text], disk=False)[0]
+        if vector is None:
+            vector = await loop.run_in_executor(None, self.cache.get, text)
+        if vector is not None:
+            return vector
+
+        vector = self._as_vector(await self.vector_encoder.async_encode(text))
+        self.cache.set_many([text], [vector], disk=False)
+        await loop.run_in_executor(None, self.cache.set, text, vector)
+
+        return vector
+
+    async def async_encode_batch(
+        self, texts: list[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Same as `encode_batch` but awaits the provider's async client.
+
+        Only the in-memory tier of the embedding cache is used on the event loop, the
+        on-disk lookup and store run in the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        batch_size = self._batch_size(batch_size)
+        vectors = np.zeros((len(texts), self.vector_dim), dtype=np.float32)
+        missing_texts = self._lookup_cache(texts, vectors, disk=False)
+        if missing_texts:
+            missing_texts = await loop.run_in_executor(
+                None, self._fill_cached, vectors, missing_texts
+            )
+        uncached_texts = list(missing_texts)
+
+        embeddings: list[list[float]] = []
+        for start in range(0, len(uncached_texts), batch_size):
+            batch = uncached_texts[start : start + batch_size]
+            embeddings.extend(await self.vector_encoder.async_encode_batch(batch))
+
+        encoded = self._fill_encoded(vectors, missing_texts, embeddings, disk=False)
+        if encoded:
+            await loop.run_in_executor(
+                None, self.cache.set_many, uncached_texts, encoded
+            )
+
+        return vectors
+
+    def _batch_size(self, batch_size: Optional[int] = None) -> int:
+        return min(batch_size or self.batch_size, self.vector_encoder.max_batch_size)
+
+    def _as_vector(self, vector: Union[list[float], np.ndarray]) -> np.ndarray:
+        """
+        Unit length float32 vector, so L2 and IP distances map to cosine similarity.
+
+        Providers do not all return normalized embeddings, documents and questions are both
+        encoded here so they are normalized the same way.
+        """
+        assert len(vector) == self.vector_dim, (
+            f"Embedding dimension changed: {len(vector)} != {self.vector_dim}"
+        )
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+
+        return array / norm if norm > 0 else array
+
+    def _lookup_cache(
+        self, texts: list[str], vectors: np.ndarray, disk: bool = True
+    ) -> dict[str, list[int]]:
+        """Fill `vectors` with cached rows, return the uncached texts and their row indexes"""
+        text_indexes: dict[str, list[int]] = {}
+        for i, text in enumerate(texts):
+            text_indexes.setdefault(text, []).append(i)
+
+        return self._fill_cached(vectors, text_indexes, disk)
+
+    def _fill_cached(
+        self,
+        vectors: np.ndarray,
+        text_indexes: dict[str, list[int]],
+        disk: bool = True,
+    ) -> dict[str, list[int]]:
+        """Fill the rows of the cached texts of `text_indexes`, return the uncached ones"""
+        missing_texts: dict[str, list[int]] = {}
+
+        cached = self.cache.get_many(list(text_indexes), disk)
+        for (text, indexes), vector in zip(text_indexes.items(), cached):
+            if vector is None:
+                missing_texts[text] = indexes
+            else:
+                vectors[indexes] = vector
+
+        return missing_texts
+
+    def _fill_encoded(
+        self,
+        vectors: np.ndarray,
+        missing_texts: dict[str, list[int]],
+        embeddings: list[list[float]],
+        disk: bool = True,
+    ) -> list[np.ndarray]:
+        """Fill `vectors` with the newly encoded rows and store them in the cache"""
+        encoded = [self._as_vector(embedding) for embedding in embeddings]
+
+        for indexes, vector in zip(missing_texts.values(), encoded):
+            vectors[indexes] = vector
+
+        self.cache.set_many(list(missing_texts), encoded, disk)
+
+        return encoded
+
+
+class EmbeddingCache:
+    """
+    Two tier embedding cache, an in-process LRU in front of an on-disk SQLite table.
+
+    Entries are keyed by (namespace, sha256(text)), where the namespace combines the
+    deploy mode, the embedding model name and the vector dimension, so switching model
+    never serves stale vectors.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _memory_size = getenv("EMBEDDING_CACHE_SIZE", "10000")
+        _database_path = getenv("EMBEDDING_CACHE_PATH", "./cache/embedding.sqlite3")
+
+        assert _memory_size.isdigit(), (
+            "EMBEDDING_CACHE_SIZE environment variable is not valid"
+        )
+
+        self.namespace = namespace
+        self.memory_size = int(_memory_size)
+        self.database_path = _database_path
+
+        self.memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+        # held while the disk is read or written, the event loop only takes `lock`
+        self.database_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.database: Optional[sqlite3.Connection] = None
+        if self.database_path:
+            os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+            self.database = sqlite3.connect(self.database_path, check_same_thread=False)
+            self.database.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding (
+                    namespace TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (namespace, text_hash)
+                );
+                """
+            )
+            self.database.commit()
 
-        return np.pad(
-            vector,
-            (0, self.vector_dim - len(vector)),
-            mode="constant",
-            constant_values=0,
+        self.logger.debug(
+            f"Embedding cache: {self.namespace}, memory: {self.memory_size}, disk: {self.database_path}"
         )
 
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def set(self, text: str, vector: np.ndarray) -> None:
+        self.set_many([text], [vector])
+
+    def get_many(
+        self, texts: list[str], disk: bool = True
+    ) -> list[Optional[np.ndarray]]:
+        """
+        Look up the cached vectors of `texts`.
+
+        Args:
+            texts (list[str]): The texts to look up.
+            disk (bool, optional): Look up the texts missing from memory on disk, False on
+                the event loop. Misses are only counted by the disk lookup. Defaults to True.
+
+        Returns:
+            list[Optional[np.ndarray]]: The cached vector of each text, None on a miss.
+        """
+        text_hashes = [self._hash(text) for text in texts]
+        vectors: list[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self.lock:
+            disk_lookup: dict[str, list[int]] = {}
+            for i, text_hash in enumerate(text_hashes):
+                if text_hash in self.memory:
+                    self.memory.move_to_end(text_hash)
+                    vectors[i] = self.memory[text_hash]
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(text_hash, []).append(i)
+
+        if not disk:
+            return vectors
+
+        with self.database_lock:
+            disk_vectors = self._disk_get_many(list(disk_lookup))
+
+        with self.lock:
+            for text_hash, vector in disk_vectors.items():
+                for i in disk_lookup.pop(text_hash):
+                    vectors[i] = vector
+                    self.disk_hits += 1
+                self._memory_set(text_hash, vector)
+
+            self.misses += sum(len(indexes) for indexes in disk_lookup.values())
+
+        return vectors
+
+    def set_many(
+        self, texts: list[str], vectors: list[np.ndarray], disk: bool = True
+    ) -> None:
+        """
+        Store the vectors of `texts` in both tiers.
+
+        Args:
+            texts (list[str]): The encoded texts.
+            vectors (list[np.ndarray]): The vector of each text.
+            disk (bool, optional): Also store them on disk, False on the event loop.
+                Defaults to True.
+        """
+        rows = [
+            (self._hash(text), np.asarray(vector, dtype=np.float32))
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self.lock:
+            for text_hash, vector in rows:
+                self._memory_set(text_hash, vector)
+
+        if self.database is None or not disk or not rows:
+            return
+
+        with self.database_lock:
+            self.database.executemany(
+                "INSERT OR REPLACE INTO embedding (namespace, text_hash, vector) VALUES (?, ?, ?);",
+                [
+                    (self.namespace, text_hash, vector.tobytes())
+                    for text_hash, vector in rows
+                ],
+            )
+            self.database.commit()
+
+    def stats(self) -> EmbeddingCacheStatsModel:
+        with self.lock:
+            return EmbeddingCacheStatsModel(
+                namespace=self.namespace,
+                memory_items=len(self.memory),
+                memory_hits=self.memory_hits,
+                disk_hits=self.disk_hits,
+                misses=self.misses,
+            )
+
+    def _memory_set(self, text_hash: str, vector: np.ndarray) -> None:
+        if self.memory_size == 0:
+            return
+
+        self.memory[text_hash] = vector
+        self.memory.move_to_end(text_hash)
+
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _disk_get_many(self, text_hashes: list[str]) -> dict[str, np.ndarray]:
+        if self.database is None or not text_hashes:
+            return {}
+
+        vectors = {}
+        # stay below SQLite's bound parameter limit
+        for start in range(0, len(text_hashes), 500):
+            chunk = text_hashes[start : start + 500]
+            rows = self.database.execute(
+                f"""
+                SELECT text_hash, vector FROM embedding
+                WHERE namespace = ? AND text_hash IN ({", ".join("?" * len(chunk))});
+                """,
+                (self.namespace, *chunk),
+            ).fetchall()
+
+            for text_hash, vector in rows:
+                vectors[text_hash] = np.frombuffer(vector, dtype=np.float32)
+
+        return vectors
+
 
 class OllamaEmbeddingEncoder:
+    max_batch_size = 512
+
     def __init__(self):
         self.logger = CustomLoggerHandler().get_logger()
 
+    @property
+    def model_name(self) -> str:
+        return self.ollama_embedding_model_name
+
     def initialization(self) -> None:
         _ollama_host = getenv("OLLAMA_HOST")
         _ollama_port = getenv("OLLAMA_PORT")
@@ -117,6 +478,7 @@ class OllamaEmbeddingEncoder:
 
         try:
             self.ollama_client = Client(host=self.ollama_host_url)
+            self.ollama_async_client = AsyncClient(host=self.ollama_host_url)
         except Exception as e:
             self.logger.error(f"Failed to initialize OLLAMA client: {e}")
 
@@ -142,8 +504,46 @@ class OllamaEmbeddingEncoder:
         )
         return [i for i in vector.embedding]
 
+    def encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Encode several texts in a single request using ollama's `/api/embed` endpoint.
+
+        Args:
+            texts (list[str]): The input texts to be encoded.
+
+        Returns:
+            list[list[float]]: One vector embedding per input text, in input order.
+        """
+        response = self.ollama_client.embed(
+            model=self.ollama_embedding_model_name,
+            input=texts,
+        )
+        return [list(embedding) for embedding in response.embeddings]
+
+    async def async_encode(self, text: str) -> list[float]:
+        """Same as `encode` but awaits ollama's async client"""
+        vector = await self.ollama_async_client.embeddings(
+            model=self.ollama_embedding_model_name,
+            prompt=text,
+        )
+        return [i for i in vector.embedding]
+
+    async def async_encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """Same as `encode_batch` but awaits ollama's async client"""
+        response = await self.ollama_async_client.embed(
+            model=self.ollama_embedding_model_name,
+            input=texts,
+        )
+        return [list(embedding) for embedding in response.embeddings]
+
 
 class AfsEmbeddingEncoder:
+    max_batch_size = 32
+
+    @property
+    def model_name(self) -> str:
+        return self.embedding_model_name
+
     def initialization(self) -> None:
         _api_key = str(getenv("AFS_API_URL"))
         _url = str(getenv("AFS_API_KEY"))
@@ -169,6 +569,9 @@ class AfsEmbeddingEncoder:
         self.api_key = self.config.api_key
         self.embedding_model_name = self.config.embedding_model_name
 
+        # pooled client shared by every async request
+        self.async_client = httpx.AsyncClient(timeout=None)
+
     def encode(self, text: str) -> np.ndarray:
         """
         Encode the input text into a vector embedding using AFS's API.
@@ -209,6 +612,52 @@ class AfsEmbeddingEncoder:
 
         return unpadded_vector
 
+    def encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Encode several texts in a single request, the AFS embedding API accepts
+        a list of `inputs` and returns one embedding per input.
+
+        Args:
+            texts (list[str]): The input texts to be encoded.
+
+        Returns:
+            list[list[float]]: One vector embedding per input text, in input order.
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "X-API-HOST": "afs-inference",
+            "X-API-KEY": self.api_key,
+        }
+
+        data = {"model": self.embedding_model_name, "inputs": texts}
+
+        response = requests.post(self.url, headers=headers, data=json.dumps(data))
+        response_data = response.json()
+
+        return [item["embedding"] for item in response_data["data"]]
+
+    async def async_encode(self, text: str) -> np.ndarray:
+        """Same as `encode` but sent through the pooled async HTTP client"""
+        embeddings = await self.async_encode_batch([text])
+        return np.asarray(embeddings[0], dtype=float)
+
+    async def async_encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """Same as `encode_batch` but sent through the pooled async HTTP client"""
+        headers = {
+            "Content-Type": "application/json",
+            "X-API-HOST": "afs-inference",
+            "X-API-KEY": self.api_key,
+        }
+
+        data = {"model": self.embedding_model_name, "inputs": texts}
+
+        response = await self.async_client.post(
+            self.url, headers=headers, content=json.dumps(data)
+        )
+        response_data = response.json()
+
+        return [item["embedding"] for item in response_data["data"]]
+
     # def encoder(self, text: str) -> np.ndarray:
     #     """convert text to ndarray (vector)
 
@@ -244,9 +693,15 @@ class AfsEmbeddingEncoder:
 
 
 class OpenaiEmbeddingEncoder:
+    max_batch_size = 2048
+
     def __init__(self):
         self.logger = CustomLoggerHandler().get_logger()
 
+    @property
+    def model_name(self) -> str:
+        return self.openai_embedding_model_name
+
     def initialization(self) -> None:
         _openai_api_key = getenv("OPENAI_API_KEY")
         _openai_embedding_model_name = getenv("OPENAI_EMBEDDING_MODEL_NAME")
@@ -275,6 +730,7 @@ class OpenaiEmbeddingEncoder:
 
         try:
             self.openai_client = OpenAI()
+            self.openai_async_client = AsyncOpenAI()
         except Exception as e:
             self.logger.error(f"Failed to initialize OLLAMA client: {e}")
 
@@ -302,5 +758,37 @@ class OpenaiEmbeddingEncoder:
         )
         return response.data[0].embedding
 
+    def encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Encode several texts in a single request using OpenAI's embedding API.
+
+        Args:
+            texts (list[str]): The input texts to be encoded.
+
+        Returns:
+            list[list[float]]: One vector embedding per input text, in input order.
+        """
+        response = self.openai_client.embeddings.create(
+            model=self.openai_embedding_model_name,
+            input=texts,
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda x: x.index)]
+
+    async def async_encode(self, text: str) -> list[float]:
+        """Same as `encode` but awaits the async OpenAI client"""
+        response = await self.openai_async_client.embeddings.create(
+            model=self.openai_embedding_model_name,
+            input=text,
+        )
+        return response.data[0].embedding
+
+    async def async_encode_batch(self, texts: list[str]) -> list[list[float]]:
+        """Same as `encode_batch` but awaits the async OpenAI client"""
+        response = await self.openai_async_client.embeddings.create(
+            model=self.openai_embedding_model_name,
+            input=texts,
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda x: x.index)]
+
 
 encoder_client = VectorHandler()
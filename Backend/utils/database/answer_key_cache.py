@@ -0,0 +1,152 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.answer_key_cache import (
+    AnswerKeyCacheStatsModel,
+)
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from collections import OrderedDict
+from typing import Callable, Optional
+from os import getenv
+
+import threading
+import time
+
+AnswerKeyEntry = tuple[float, dict[int, frozenset[int]], frozenset[int]]
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class AnswerKeyCache:
+    """
+    TTL + LRU cache of the answer key of each exam.
+
+    An answer key maps every enabled question of an exam to its correct option ids. The
+    option ids of the exam are kept with it, so modifying an exam, one of its questions or
+    one of its options drops the entry. Every invalidation bumps a version counter, a key
+    queried before the invalidation is not stored.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _cache_size = getenv("ANSWER_KEY_CACHE_SIZE", "256")
+        _ttl = getenv("ANSWER_KEY_CACHE_TTL", "600")
+
+        assert _cache_size.isdigit(), (
+            "ANSWER_KEY_CACHE_SIZE environment variable is not valid"
+        )
+        assert _ttl.isdigit() and int(_ttl) > 0, (
+            "ANSWER_KEY_CACHE_TTL environment variable is not valid"
+        )
+
+        self.cache_size = int(_cache_size)
+        # bounds the staleness of edits made by another backend process
+        self.ttl = int(_ttl)
+
+        # exam id -> (expire time, answer key, option ids)
+        self.entries: OrderedDict[int, AnswerKeyEntry] = OrderedDict()
+        self.cache_version = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+        self.logger.debug(f"Answer key cache size: {self.cache_size}, ttl: {self.ttl}s")
+
+    def get(self, exam_id: int) -> Optional[dict[int, frozenset[int]]]:
+        """
+        Look up the answer key of an exam.
+
+        Args:
+            exam_id (int): The exam id.
+
+        Returns:
+            Optional[dict[int, frozenset[int]]]: question id -> correct option ids, None on a miss.
+        """
+        with self.lock:
+            entry = self.entries.get(exam_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(exam_id, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(exam_id)
+            return entry[1]
+
+    def set(
+        self,
+        exam_id: int,
+        answer_key: dict[int, frozenset[int]],
+        option_ids: frozenset[int],
+        version: int,
+    ) -> None:
+        """Store an answer key queried at `version`, evicting the least recently used exams when full"""
+        if self.cache_size == 0:
+            return
+
+        with self.lock:
+            # an exam, question or option changed while the key was queried
+            if version != self.cache_version:
+                return
+
+            self.entries[exam_id] = (
+                time.monotonic() + self.ttl,
+                answer_key,
+                option_ids,
+            )
+            self.entries.move_to_end(exam_id)
+
+            while len(self.entries) > self.cache_size:
+                self.entries.popitem(last=False)
+
+    def version(self) -> int:
+        """Current version, read before querying an answer key to be cached"""
+        with self.lock:
+            return self.cache_version
+
+    def invalidate_exam(self, exam_id: int) -> None:
+        """Drop the answer key of an exam, called after the exam or its question list changed"""
+        self._invalidate(lambda cached_exam_id, _: cached_exam_id == exam_id)
+
+    def invalidate_question(self, question_id: int) -> None:
+        """Drop the answer keys of the exams containing a question, called after it or its options changed"""
+        self._invalidate(lambda _, entry: question_id in entry[1])
+
+    def invalidate_option(self, option_id: int) -> None:
+        """Drop the answer keys of the exams containing an option, called after it changed"""
+        self._invalidate(lambda _, entry: option_id in entry[2])
+
+    def stats(self) -> AnswerKeyCacheStatsModel:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return AnswerKeyCacheStatsModel(
+                entries=len(self.entries),
+                hits=self.hits,
+                misses=self.misses,
+                invalidated=self.invalidated,
+                hit_rate=self.hits / lookups if lookups else 0.0,
+            )
+
+    def _invalidate(self, match: Callable[[int, AnswerKeyEntry], bool]) -> None:
+        with self.lock:
+            self.cache_version += 1
+            for exam_id in [
+                exam_id
+                for exam_id, entry in self.entries.items()
+                if match(exam_id, entry)
+            ]:
+                del self.entries[exam_id]
+                self.invalidated += 1
+
+
+answer_key_cache = AnswerKeyCache()
@@ -0,0 +1,58 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.database.database import mysql_client, MySQLHandler
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generic, TypeVar
+from functools import partial, wraps
+
+import asyncio
+
+ControllerT = TypeVar("ControllerT")
+
+# one worker per pooled connection, a worker never waits on the pool for long
+database_executor = ThreadPoolExecutor(
+    max_workers=mysql_client.pool.pool_size + mysql_client.pool.max_overflow,
+    thread_name_prefix="mysql",
+)
+
+
+class AsyncController(Generic[ControllerT]):
+    """
+    Awaitable view of a synchronous database controller.
+
+    Every method of the controller is exposed as a coroutine function running the
+    method as its own unit of work (see `Backend.utils.database.pool.with_connection`)
+    in `database_executor`, so the event loop keeps serving other requests while
+    the query waits on MySQL.
+
+    Usage:
+        mysql_client = AsyncController(MockerDatabaseController())
+        exam = await mysql_client.query_exam_info(exam_id=exam_id)
+    """
+
+    def __init__(self, controller: ControllerT) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+        self.controller = controller
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.controller, name)
+        if not callable(attribute):
+            return attribute
+
+        method: Callable[..., Any] = attribute
+
+        @wraps(method)
+        async def awaitable_method(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                database_executor, partial(method, *args, **kwargs)
+            )
+
+        # bound once per name, later lookups do not reach __getattr__
+        setattr(self, name, awaitable_method)
+        return awaitable_method
+
+
+async_mysql_client: AsyncController[MySQLHandler] = AsyncController(mysql_client)
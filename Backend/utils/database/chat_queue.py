@@ -0,0 +1,313 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.chat_queue import ChatQueueStatsModel
+from Backend.utils.database.database import mysql_client
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+from collections import deque
+from os import getenv
+
+import numpy as np
+import threading
+import sqlite3
+import json
+import time
+import os
+
+# development
+GLOBAL_DEBUG_MODE = getenv("DEBUG")
+
+
+if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class ChatPersistenceQueue:
+    """
+    Persist answered questions to MySQL after the answer was returned.
+
+    A question is written to a local SQLite file before `submit` returns and removed once
+    `MySQLHandler.insert_chatting` committed it. Failed inserts are retried with an
+    exponential backoff and pending questions are resubmitted on startup, so every answered
+    question reaches MySQL at least once. Inserting a question twice is a no-op. A question
+    rated before it reached MySQL keeps its rating in the queue, the rating is updated right
+    after the insert. Rating a failed question retries it.
+    """
+
+    def __init__(self) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        _mode = getenv("CHAT_PERSIST_MODE", "deferred")
+        _workers = getenv("CHAT_QUEUE_WORKERS", "2")
+        _retry_delay = getenv("CHAT_QUEUE_RETRY_DELAY", "5")
+        _max_attempts = getenv("CHAT_QUEUE_MAX_ATTEMPTS", "10")
+        _database_path = getenv("CHAT_QUEUE_PATH", "./cache/chat_queue.sqlite3")
+
+        assert _mode in ["deferred", "inline"], (
+            "CHAT_PERSIST_MODE environment variable is not valid"
+        )
+        assert _workers.isdigit() and int(_workers) > 0, (
+            "CHAT_QUEUE_WORKERS environment variable is not valid"
+        )
+        assert _retry_delay.isdigit() and int(_retry_delay) > 0, (
+            "CHAT_QUEUE_RETRY_DELAY environment variable is not valid"
+        )
+        assert _max_attempts.isdigit() and int(_max_attempts) > 0, (
+            "CHAT_QUEUE_MAX_ATTEMPTS environment variable is not valid"
+        )
+        assert _database_path != "", "CHAT_QUEUE_PATH environment variable is not set"
+
+        self.mode: Literal["deferred", "inline"] = _mode  # type: ignore[assignment]
+        self.workers = int(_workers)
+        self.retry_delay = int(_retry_delay)
+        self.max_attempts = int(_max_attempts)
+        self.database_path = _database_path
+
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.database_path) or ".", exist_ok=True)
+        self.database = sqlite3.connect(self.database_path, check_same_thread=False)
+        self.database.row_factory = sqlite3.Row
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_record (
+                qa_id TEXT PRIMARY KEY,
+                chat_id TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                token_size INTEGER NOT NULL,
+                file_ids TEXT NOT NULL DEFAULT '[]',
+                rating INTEGER,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_time REAL NOT NULL,
+                updated_time REAL NOT NULL
+            );
+            """
+        )
+        columns = [
+            column[1]
+            for column in self.database.execute("PRAGMA table_info(chat_record);")
+        ]
+        if "rating" not in columns:
+            self.database.execute("ALTER TABLE chat_record ADD COLUMN rating INTEGER;")
+        self.database.commit()
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="chat_queue"
+        )
+
+        self.persisted = 0
+        self.retries = 0
+        # seconds from submit to commit
+        self.persist_delays: deque[float] = deque(maxlen=4096)
+
+        self._resume()
+
+        self.logger.debug(
+            f"Chat persist mode: {self.mode}, workers: {self.workers}, "
+            f"max attempts: {self.max_attempts}"
+        )
+
+    def submit(
+        self,
+        chat_id: str,
+        qa_id: str,
+        question: str,
+        answer: str,
+        token_size: int,
+        user_id: int,
+        file_ids: list[str],
+    ) -> None:
+        """
+        Queue an answered question for `MySQLHandler.insert_chatting`.
+
+        The question is durable once this returns, it is inserted into MySQL by a
+        background worker. This blocks on a local commit, call it from a thread.
+
+        Args:
+            chat_id (str): The unique identifier for the chat session.
+            qa_id (str): The unique identifier for the question-answer pair.
+            question (str): The text of the question asked.
+            answer (str): The text of the answer provided.
+            token_size (int): The number of tokens in the question.
+            user_id (int): The id of the user who sent the question.
+            file_ids (list[str]): A list of file identifiers associated with the answer.
+        """
+        now = time.time()
+
+        with self.lock:
+            self.database.execute(
+                """
+                INSERT OR IGNORE INTO chat_record (
+                    qa_id, chat_id, user_id, question, answer, token_size, file_ids,
+                    created_time, updated_time
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                (
+                    qa_id,
+                    chat_id,
+                    user_id,
+                    question,
+                    answer,
+                    token_size,
+                    json.dumps(file_ids or []),
+                    now,
+                    now,
+                ),
+            )
+            self.database.commit()
+
+        self.executor.submit(self._run, qa_id)
+
+    def rate(self, qa_id: str, rating: bool) -> bool:
+        """
+        Rate a question that has not reached MySQL yet.
+
+        A question that failed every attempt is resubmitted with a new set of attempts,
+        so the rating does not wait for a restart to reach MySQL.
+
+        Args:
+            qa_id (str): The unique identifier for the question-answer pair.
+            rating (bool): True for a good rating, False for a bad rating.
+
+        Returns:
+            bool: True if the question is queued and the rating was stored with it,
+                False if it is not queued and `MySQLHandler.update_rating` should be used.
+        """
+        with self.lock:
+            record = self.database.execute(
+                "SELECT status FROM chat_record WHERE qa_id = ?;", (qa_id,)
+            ).fetchone()
+            if record is None:
+                return False
+
+            self.database.execute(
+                """
+                UPDATE chat_record SET rating = ?, status = 'pending', updated_time = ?,
+                    attempts = CASE WHEN status = 'failed' THEN 0 ELSE attempts END
+                WHERE qa_id = ?;
+                """,
+                (int(rating), time.time(), qa_id),
+            )
+            self.database.commit()
+
+        if record["status"] == "failed":
+            self.logger.info(f"Retrying failed chat record {qa_id} after its rating")
+            self.executor.submit(self._run, qa_id)
+
+        return True
+
+    def stats(self) -> ChatQueueStatsModel:
+        with self.lock:
+            counts = dict(
+                self.database.execute(
+                    "SELECT status, COUNT(*) FROM chat_record GROUP BY status;"
+                ).fetchall()
+            )
+            delays = np.asarray(self.persist_delays or [0.0]) * 1000
+
+        return ChatQueueStatsModel(
+            mode=self.mode,
+            pending=counts.get("pending", 0),
+            failed=counts.get("failed", 0),
+            persisted=self.persisted,
+            retries=self.retries,
+            persist_delay_p50_ms=float(np.percentile(delays, 50)),
+            persist_delay_p99_ms=float(np.percentile(delays, 99)),
+        )
+
+    def _resume(self) -> None:
+        """Resubmit the questions that were not persisted when the server stopped"""
+        with self.lock:
+            rows = self.database.execute(
+                "SELECT qa_id FROM chat_record ORDER BY created_time;"
+            ).fetchall()
+            # failed questions get another max_attempts after a restart
+            self.database.execute(
+                "UPDATE chat_record SET status = 'pending', attempts = 0;"
+            )
+            self.database.commit()
+
+        for row in rows:
+            self.logger.info(f"Resuming chat record {row['qa_id']}")
+            self.executor.submit(self._run, row["qa_id"])
+
+    def _fetch(self, qa_id: str) -> Optional[sqlite3.Row]:
+        with self.lock:
+            return self.database.execute(
+                "SELECT * FROM chat_record WHERE qa_id = ?;", (qa_id,)
+            ).fetchone()
+
+    def _run(self, qa_id: str) -> None:
+        record = self._fetch(qa_id)
+        if record is None:
+            return
+
+        try:
+            success = mysql_client.insert_chatting(
+                chat_id=record["chat_id"],
+                qa_id=record["qa_id"],
+                question=record["question"],
+                answer=record["answer"],
+                token_size=record["token_size"],
+                user_id=record["user_id"],
+                file_ids=json.loads(record["file_ids"]),
+            )
+            if success and record["rating"] is not None:
+                success = mysql_client.update_rating(qa_id, bool(record["rating"]))
+            error = None if success else "commit failed"
+        except Exception as exception:
+            error = str(exception)
+
+        if error is None:
+            with self.lock:
+                # kept when it was rated again during the insert
+                deleted = self.database.execute(
+                    "DELETE FROM chat_record WHERE qa_id = ? AND rating IS ?;",
+                    (qa_id, record["rating"]),
+                ).rowcount
+                self.database.commit()
+                if deleted:
+                    self.persisted += 1
+                    self.persist_delays.append(time.time() - record["created_time"])
+
+            if not deleted:
+                self.executor.submit(self._run, qa_id)
+            return
+
+        attempts = record["attempts"] + 1
+        status = "failed" if attempts >= self.max_attempts else "pending"
+        with self.lock:
+            self.database.execute(
+                """
+                UPDATE chat_record SET status = ?, attempts = ?, error = ?, updated_time = ?
+                WHERE qa_id = ?;
+                """,
+                (status, attempts, error, time.time(), qa_id),
+            )
+            self.database.commit()
+
+        if status == "failed":
+            self.logger.error(
+                f"Chat record {qa_id} not persisted after {attempts} attempts: {error}"
+            )
+            return
+
+        delay = min(self.retry_delay * 2 ** (attempts - 1), 300)
+        self.logger.warning(
+            f"Chat record {qa_id} not persisted, retrying in {delay}s: {error}"
+        )
+        with self.lock:
+            self.retries += 1
+        timer = threading.Timer(delay, self.executor.submit, (self._run, qa_id))
+        timer.daemon = True
+        timer.start()
+
+
+chat_queue = ChatPersistenceQueue()
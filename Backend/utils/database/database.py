@@ -18,12 +18,21 @@ from Backend.utils.helper.model.api.v1.mock import (
     ExamResultModel,
     TagModel,
 )
+from Backend.utils.database.answer_key_cache import answer_key_cache
+from Backend.utils.database.pool import (
+    MySQLConnectionPool,
+    bind_connection,
+    current_checkout,
+    idempotent,
+    with_connections,
+)
 from Backend.utils.helper.logger import CustomLoggerHandler
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.cursor import MySQLCursor
 from typing import Literal
 
 import mysql.connector as connector
 import json
-import time
 
 from pprint import pformat
 from os import getenv
@@ -38,6 +47,7 @@ if GLOBAL_DEBUG_MODE is None or GLOBAL_DEBUG_MODE == "True":
     load_dotenv("./.env")
 
 
+@with_connections
 class SetupMYSQL:
     def __init__(self) -> None:
         self._DEBUG = getenv("MYSQL_DEBUG")
@@ -70,6 +80,36 @@ class SetupMYSQL:
             "Missing MYSQL_ROOT_PASSWORD environment variable"
         )
 
+        _pool_size = getenv("MYSQL_POOL_SIZE", "10")
+        _pool_overflow = getenv("MYSQL_POOL_OVERFLOW", "10")
+        _pool_timeout = getenv("MYSQL_POOL_TIMEOUT", "30")
+        _pool_recycle = getenv("MYSQL_POOL_RECYCLE", "3600")
+        _pool_pre_ping = getenv("MYSQL_POOL_PRE_PING", "30")
+
+        assert _pool_size.isdigit() and int(_pool_size) > 0, (
+            "MYSQL_POOL_SIZE environment variable is not valid"
+        )
+        assert _pool_overflow.isdigit(), (
+            "MYSQL_POOL_OVERFLOW environment variable is not valid"
+        )
+        assert _pool_timeout.isdigit() and int(_pool_timeout) > 0, (
+            "MYSQL_POOL_TIMEOUT environment variable is not valid"
+        )
+        assert _pool_recycle.isdigit(), (
+            "MYSQL_POOL_RECYCLE environment variable is not valid"
+        )
+        assert _pool_pre_ping.isdigit(), (
+            "MYSQL_POOL_PRE_PING environment variable is not valid"
+        )
+
+        self._POOL_SIZE = int(_pool_size)
+        self._POOL_OVERFLOW = int(_pool_overflow)
+        self._POOL_TIMEOUT = int(_pool_timeout)
+        # 0 never recycles
+        self._POOL_RECYCLE = int(_pool_recycle)
+        # 0 pings every checkout
+        self._POOL_PRE_PING = int(_pool_pre_ping)
+
         # logger
         self.logger = CustomLoggerHandler().get_logger()
 
@@ -79,18 +119,28 @@ class SetupMYSQL:
 
         self.logger.debug("| MYSQL Loading Finished |")
 
+    @property
+    def connection(self) -> MySQLConnection:
+        """Connection of the running unit of work, see `Backend.utils.database.pool.with_connection`"""
+        return current_checkout().connection
+
+    @property
+    def cursor(self) -> MySQLCursor:
+        """Cursor of the running unit of work, see `Backend.utils.database.pool.with_connection`"""
+        return current_checkout().cursor
+
     def _setup(self):
         """
-        Set up the MySQL database connection and initialize the database structure.
+        Set up the MySQL database and the connection pool.
 
         This method performs the following tasks:
-        1. Establishes a connection to the MySQL server.
-        2. Creates a cursor for executing SQL queries.
-        3. Attempts to use the specified database.
-        4. If in debug mode, drops and recreates the database.
-        5. If the database does not exist, creates it.
-        6. Creates necessary tables (role, user, login, chat, file, qa, attachment).
-        7. Inserts initial data, including an admin account and an anonymous user.
+        1. Establishes a bootstrap connection to the MySQL server.
+        2. Attempts to use the specified database.
+        3. If in debug mode, drops and recreates the database.
+        4. If the database does not exist, creates it.
+        5. Creates necessary tables (role, user, login, chat, file, qa, attachment).
+        6. Inserts initial data, including an admin account and an anonymous user.
+        7. Creates the connection pool every unit of work checks out its connection from.
 
         Raises:
             connector.Error: If there"s an error connecting to the database or executing SQL queries.
@@ -98,37 +148,61 @@ class SetupMYSQL:
         Note:
             This method is called internally during the initialization of the SetupMYSQL class.
         """
-        self.connection = connector.connect(
+        bootstrap_connection = connector.connect(
             host=self._HOST,
             user=self._USER,
             password=self._PASSWORD,
             port=self._PORT,
         )
 
-        self.cursor = self.connection.cursor(dictionary=True, prepared=True)
-
-        try:
-            self.logger.debug(f"Debug Mode: {self._DEBUG}")
-            if self._DEBUG in ["True", "true"]:
-                self.logger.warning("Dropping database")
-                self.cursor.execute(f"DROP SCHEMA {self._DATABASE}")
-                self.connection.commit()
+        with bind_connection(bootstrap_connection):
+            try:
+                self.logger.debug(f"Debug Mode: {self._DEBUG}")
+                if self._DEBUG in ["True", "true"]:
+                    self.logger.warning("Dropping database")
+                    self.cursor.execute(f"DROP SCHEMA {self._DATABASE}")
+                    self.connection.commit()
+                    self.create_database()
+                else:
+                    self.logger.info(f"Skipped recrate database, Debug: {self._DEBUG}")
+                self.connection.database = self._DATABASE
+            except connector.Error as error:
+                self.logger.error(error)
                 self.create_database()
-            else:
-                self.logger.info(f"Skipped recrate database, Debug: {self._DEBUG}")
-            self.connection.database = self._DATABASE
-        except connector.Error as error:
-            self.logger.error(error)
-            self.create_database()
-        finally:
-            self.logger.debug(f"Using MYSQL database {self._DATABASE}")
-            self.connection.database = self._DATABASE
-            self.cursor = self.connection.cursor(dictionary=True, prepared=True)
+            finally:
+                self.logger.debug(f"Using MYSQL database {self._DATABASE}")
+
+        bootstrap_connection.close()
+
+        self.pool = MySQLConnectionPool(
+            connection_factory=self._connect,
+            pool_size=self._POOL_SIZE,
+            max_overflow=self._POOL_OVERFLOW,
+            timeout=self._POOL_TIMEOUT,
+            recycle=self._POOL_RECYCLE,
+            pre_ping=self._POOL_PRE_PING,
+        )
+        self.logger.debug(
+            f"MYSQL pool size: {self._POOL_SIZE}, overflow: {self._POOL_OVERFLOW}, "
+            f"timeout: {self._POOL_TIMEOUT}s, recycle: {self._POOL_RECYCLE}s, "
+            f"pre ping: {self._POOL_PRE_PING}s"
+        )
+
+    def _connect(self) -> MySQLConnection:
+        return connector.connect(
+            host=self._HOST,
+            user=self._USER,
+            password=self._PASSWORD,
+            port=self._PORT,
+            database=self._DATABASE,
+        )
 
     def create_database(self) -> None:
         self.logger.debug(f"Creating MYSQL database {self._DATABASE}")
         self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self._DATABASE};")
         self.connection.connect(database=self._DATABASE)
+        # the cursor belonged to the connection before it reconnected
+        current_checkout().renew_cursor()
         self.connection.commit()
 
         self.create_user_table()
@@ -1105,10 +1179,12 @@ class SetupMYSQL:
             self.connection.commit()
 
 
+@with_connections
 class MySQLHandler(SetupMYSQL):
     def __init__(self) -> None:
         super().__init__()
 
+    @idempotent
     def query_role_id_by_user_id(self, user_id: int) -> int | None:
         """query the role id using user id
 
@@ -1119,7 +1195,6 @@ class MySQLHandler(SetupMYSQL):
             int: role name
             None: not found
         """
-        self.connection.ping(attempts=3)
 
         self.cursor.execute(
             """SELECT role_id FROM `user` WHERE user_id = %s""", (user_id,)
@@ -1131,6 +1206,7 @@ class MySQLHandler(SetupMYSQL):
 
         return role_id["role_id"] if role_id else None
 
+    @idempotent
     def query_role_id_by_role_name(self, role_name: str) -> int | None:
         """query the role name using role id
 
@@ -1141,7 +1217,6 @@ class MySQLHandler(SetupMYSQL):
             int: role name
             None: not found
         """
-        self.connection.ping(attempts=3)
         self.logger.debug(pformat(f"create_user {role_name}"))
 
         self.cursor.execute(
@@ -1161,6 +1236,7 @@ class MySQLHandler(SetupMYSQL):
         )
         self.commit()
 
+    @idempotent
     def verify_login_token(self, user_id: int, token: str) -> bool:
         self.connection.commit()
         self.cursor.execute(
@@ -1187,7 +1263,6 @@ class MySQLHandler(SetupMYSQL):
             302: Username already exists
             500: Error during database commit
         """
-        self.connection.ping(attempts=3)
         self.logger.debug(
             pformat(f"create_user {username} {hashed_password} {role_name}")
         )
@@ -1263,6 +1338,7 @@ class MySQLHandler(SetupMYSQL):
 
         return True if result else False
 
+    @idempotent
     def get_user_info(
         self, username: str, hashed_password: str
     ) -> tuple[int, UserInfoModel] | tuple[int, str]:
@@ -1284,7 +1360,6 @@ class MySQLHandler(SetupMYSQL):
                 - If status is 200: A UserInfoModel object containing user information
                 - If status is 403: An error message string
         """
-        self.connection.ping(attempts=3)
         self.logger.debug(f"user: {username} trying to login")
 
         self.cursor.execute(
@@ -1346,7 +1421,6 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             bool: True if the file record was successfully inserted, False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.logger.debug(
             pformat(f"insert_file {file_uuid} {filename} {tags} {collection}")
         )
@@ -1376,7 +1450,6 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             bool: True if the rating was successfully updated in the database, False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.logger.info(f"inserting rating {question_uuid}:{rating}")
 
         self.cursor.execute(
@@ -1409,7 +1482,9 @@ class MySQLHandler(SetupMYSQL):
         Insert a new chat record into the database.
 
         This function inserts a new chat record, including the question, answer, and associated files,
-        into the database. It creates entries in the chat, qa, and attachment tables as necessary.
+        into the database. It creates entries in the chat, qa, and attachment tables as necessary,
+        in a single transaction. Inserting the same question again is a no-op, so a failed
+        insert can be retried.
 
         Args:
             chat_id (str): The unique identifier for the chat session.
@@ -1422,8 +1497,10 @@ class MySQLHandler(SetupMYSQL):
 
         Returns:
             bool: True if the chat record was successfully inserted, False otherwise.
+
+        Raises:
+            connector.Error: If an INSERT failed, nothing of the chat record is inserted.
         """
-        self.connection.ping(attempts=3)
 
         self.logger.debug(
             pformat(
@@ -1439,6 +1516,7 @@ class MySQLHandler(SetupMYSQL):
             )
         )
 
+        # one transaction, inserting an already persisted question again is a no-op
         self.cursor.execute(
             f"""
             INSERT IGNORE INTO `{self._DATABASE}`.`chat` (chat_id, user_id, chat_name)
@@ -1448,35 +1526,33 @@ class MySQLHandler(SetupMYSQL):
             (chat_id, user_id, answer[:10]),
         )
 
-        success = self.commit()
-        assert success
-
         self.cursor.execute(
             f"""
             INSERT INTO `{self._DATABASE}`.`qa` (chat_id, qa_id, question, answer, token_size, sent_by)
             VALUES (
                 %s, %s, %s, %s, %s, %s
-            );
+            )
+            ON DUPLICATE KEY UPDATE qa_id = qa_id;
         """,
             (chat_id, qa_id, question, answer, token_size, user_id),
         )
 
-        success = self.commit()
-        assert success
-
-        if file_ids is not None:
-            for file_id in set(file_ids):
-                self.cursor.execute(
-                    f"""
-                    INSERT INTO `{self._DATABASE}`.`attachment` (chat_id, qa_id, file_id)
-                    VALUES (
-                        %s, %s, %s
-                    );
-                """,
-                    (chat_id, qa_id, file_id),
-                )
-            success = self.commit()
+        # every attachment in a single multi-row INSERT
+        attachments = [
+            (chat_id, qa_id, file_id) for file_id in dict.fromkeys(file_ids or [])
+        ]
+        if attachments:
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(attachments))
+            self.cursor.execute(
+                f"""
+                INSERT INTO `{self._DATABASE}`.`attachment` (chat_id, qa_id, file_id)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE file_id = file_id;
+            """,
+                [value for attachment in attachments for value in attachment],
+            )
 
+        success = self.commit()
         return success
 
     # def query_docs_id(self, docs_name: str) -> str:
@@ -1501,6 +1577,7 @@ class MySQLHandler(SetupMYSQL):
     #     self.logger.info(pformat(file_name))
     #     return file_name
 
+    @idempotent
     def query_docs_name(self, docs_id: str) -> str:
         """
         Retrieve the file name of a document based on its ID.
@@ -1512,11 +1589,7 @@ class MySQLHandler(SetupMYSQL):
 
         Returns:
             str: The file name of the document if found, or an empty string if not found.
-
-        Note:
-            This method pings the database connection before executing the query to ensure it"s active.
         """
-        self.connection.ping(attempts=3)
 
         self.logger.info(pformat("query docs name {docs_id}"))
         self.cursor.execute(
@@ -1536,6 +1609,7 @@ class MySQLHandler(SetupMYSQL):
         self.logger.info(pformat(file_name))
         return str(file_name)
 
+    @idempotent
     def query_documentation_type_list(
         self, documentation_type: str
     ) -> list[QueryDocumentationTypeListModel]:
@@ -1551,11 +1625,7 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             list[QueryDocumentationTypeListModel]: A list of QueryDocumentationTypeListModel objects,
             each containing details (file_id, file_name, last_update_time) of a matching document.
-
-        Note:
-            This method pings the database connection before executing the query to ensure it"s active.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""SELECT file_id, file_name, last_update
                 FROM {self._DATABASE}.file
@@ -1578,12 +1648,13 @@ class MySQLHandler(SetupMYSQL):
 
         return query_result
 
+    @idempotent
     def query_mock_exam_list(
         self, mock_type: Literal["basic", "cse", "all"] | None
     ) -> list[ExamsInfoModel]:
         """
         This function queries the database for a list of mock exams, including nested details for exam questions and options.
-        It pings the database connection, executes a SQL query that aggregates exam data into a JSON structure, logs the query,
+        It executes a SQL query that aggregates exam data into a JSON structure, logs the query,
         and then parses the JSON string into a dictionary. If no exam information is found, it returns None.
 
         Args:
@@ -1593,7 +1664,6 @@ class MySQLHandler(SetupMYSQL):
             dict or None: A dictionary containing exam information with nested exam questions and options, or None if no exam records are found.
         """
 
-        self.connection.ping(attempts=3)
         if not mock_type or mock_type == "all":
             self.cursor.execute(
                 """
@@ -1845,9 +1915,8 @@ class MySQLHandler(SetupMYSQL):
 
         return exam_info_data
 
+    @idempotent
     def query_mock_exam(self, mock_type: Literal["basic", "cse"] | None) -> dict | None:
-        self.connection.ping(attempts=3)
-
         self.cursor.execute(
             """
             SELECT exam_id, exam_name, exam_type, exam_duration FROM exams
@@ -1862,7 +1931,7 @@ class MySQLHandler(SetupMYSQL):
     def insert_new_mock_exam(self, exam: CreateNewExamParamsModel) -> ExamsInfoModel:
         """
         This function inserts a new exam record into the exams table in the database.
-        It pings the database connection, executes the INSERT SQL query with exam details,
+        It executes the INSERT SQL query with exam details,
         logs the executed query, commits the transaction, and retrieves the newly inserted exam information.
 
         Args:
@@ -1873,7 +1942,6 @@ class MySQLHandler(SetupMYSQL):
                              and an empty list for exam_questions.
         """
 
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             INSERT INTO {self._DATABASE}.exams(
@@ -1931,7 +1999,7 @@ class MySQLHandler(SetupMYSQL):
     ) -> ExamQuestionModel:
         """
         This function inserts a new mock question into the exam_questions table.
-        It pings the database connection, executes an INSERT SQL query using the provided question data,
+        It executes an INSERT SQL query using the provided question data,
         logs the SQL query, commits the transaction, and then retrieves the inserted question information.
 
         Args:
@@ -1942,7 +2010,6 @@ class MySQLHandler(SetupMYSQL):
                                 and placeholders for question_options and question_images.
         """
 
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             INSERT INTO {self._DATABASE}.exam_questions(
@@ -2000,7 +2067,6 @@ class MySQLHandler(SetupMYSQL):
             list[ExamOptionModel] - A list of exam option models representing the newly inserted options.
         """
 
-        self.connection.ping(attempts=3)
         new_options = [
             (option.question_id, option.option_text, option.is_correct)
             for option in options
@@ -2060,7 +2126,6 @@ class MySQLHandler(SetupMYSQL):
             bool - True if the modification was successful; False otherwise.
         """
 
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             UPDATE {self._DATABASE}.exam_questions
@@ -2125,7 +2190,7 @@ class MySQLHandler(SetupMYSQL):
     def enable_exam(self, exam_id: int) -> bool:
         """
         This function enable an exam record from the exam table in the database.
-        It pings the database connection, executes the deletion SQL query, logs the SQL query, and commits the transaction.
+        It executes the deletion SQL query, logs the SQL query, and commits the transaction.
 
         Args:
             exam_id: int - The unique identifier of the exam to be deleted.
@@ -2133,7 +2198,6 @@ class MySQLHandler(SetupMYSQL):
         Return:
             bool - True if the deletion was successful and the transaction was committed; False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             UPDATE {self._DATABASE}.exam
@@ -2151,7 +2215,7 @@ class MySQLHandler(SetupMYSQL):
     def disable_exam(self, exam_id: int) -> bool:
         """
         This function disable an exam record from the exam table in the database.
-        It pings the database connection, executes the deletion SQL query, logs the SQL query, and commits the transaction.
+        It executes the deletion SQL query, logs the SQL query, and commits the transaction.
 
         Args:
             exam_id: int - The unique identifier of the exam to be deleted.
@@ -2159,7 +2223,6 @@ class MySQLHandler(SetupMYSQL):
         Return:
             bool - True if the deletion was successful and the transaction was committed; False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             UPDATE {self._DATABASE}.exam
@@ -2178,13 +2241,12 @@ class MySQLHandler(SetupMYSQL):
         """
         Deletes an exam record from the database.
 
-        This method pings the database connection to ensure it"s active, executes a DELETE SQL statement to remove the exam with the specified exam_id from the exam table in the configured database, logs the SQL query, and then commits the transaction.
+        This method executes a DELETE SQL statement to remove the exam with the specified exam_id from the exam table in the configured database, logs the SQL query, and then commits the transaction.
 
         Parameters: exam_id(int): The unique identifier of the exam to be deleted.
 
         Returns: bool: True if the deletion was successful and the transaction was committed; False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             DELETE FROM {self._DATABASE}.exam
@@ -2208,7 +2270,6 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             bool: Returns True if the question is successfully disabled, False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             UPDATE {self._DATABASE}.exam_questions
@@ -2233,7 +2294,6 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             bool: Returns True if the question is successfully deleted, False otherwise.
         """
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             f"""
             DELETE FROM {self._DATABASE}.exam_questions
@@ -2244,9 +2304,11 @@ class MySQLHandler(SetupMYSQL):
 
         self.sql_query_logger()
         success = self.commit()
+        answer_key_cache.invalidate_question(question_id)
 
         return success
 
+    @idempotent
     def get_mock_exam_question_list(
         self, mock_id: int
     ) -> tuple[list[MockExamQuestionsListModel], MockExamInformationModel | None]:
@@ -2254,7 +2316,6 @@ class MySQLHandler(SetupMYSQL):
         Retrieves a list of mock exam questions based on the provided mock_id.
         """
 
-        self.connection.ping(attempts=3)
         self.cursor.execute(
             """
             SELECT 
@@ -2379,94 +2440,143 @@ class MySQLHandler(SetupMYSQL):
 
         return mock_exam_question_list_data, mock_exam_information_data
 
+    @idempotent
+    def query_exam_answer_key(self, exam_id: int) -> dict[int, frozenset[int]]:
+        """
+        Query the answer key of an exam, served from `answer_key_cache` when possible.
+
+        Args:
+            exam_id (int): The exam id.
+
+        Returns:
+            dict[int, frozenset[int]]: Every enabled question of the exam mapped to its
+                enabled correct option ids, empty when the exam is disabled.
+        """
+        answer_key = answer_key_cache.get(exam_id)
+        if answer_key is not None:
+            return answer_key
+
+        version = answer_key_cache.version()
+        self.cursor.execute(
+            """
+            SELECT
+                q.question_id,
+                o.option_id,
+                o.is_correct
+            FROM
+                exams AS e
+                JOIN exam_questions AS eq ON e.exam_id = eq.exam_id
+                JOIN question AS q ON eq.question_id = q.question_id
+                LEFT JOIN question_option AS qo ON q.question_id = qo.question_id
+                LEFT JOIN `option` AS o ON qo.option_id = o.option_id AND o.enabled = 1
+            WHERE
+                e.exam_id = %s
+                AND e.enabled = 1
+                AND q.enabled = 1;
+            """,
+            (exam_id,),
+        )
+        self.sql_query_logger()
+
+        correct_options: dict[int, set[int]] = {}
+        option_ids = set()
+        for row in self.cursor.fetchall():
+            correct_options.setdefault(row["question_id"], set())
+            if row["option_id"] is None:
+                continue
+            option_ids.add(row["option_id"])
+            if row["is_correct"]:
+                correct_options[row["question_id"]].add(row["option_id"])
+
+        answer_key = {
+            question_id: frozenset(options)
+            for question_id, options in correct_options.items()
+        }
+        answer_key_cache.set(exam_id, answer_key, frozenset(option_ids), version)
+
+        return answer_key
+
     def insert_mock_exam_submitted_question(
         self, exam: SubmittedExamModel
     ) -> int | None:
         """
-        Inserts a submitted exam question into the database.
+        Grade a submitted exam and insert it with its answers.
+
+        The answers are graded against the answer key of the exam (see `query_exam_answer_key`)
+        and inserted with a single multi-row INSERT, so a submission costs the same number of
+        queries whatever the number of questions.
+
         Args:
             class SubmittedExamModel(BaseModel):
                 exam_id: int
                 user_id: int | None
-                submit_time: str
                 submitted_questions: list[SubmittedQuestionModel]
 
             class SubmittedQuestionModel(BaseModel):
                 question_id: int
-                submitted_answer: str
+                submitted_answer_option_id: int | None
         Returns:
             submission_id: int or None
 
         """
+        answer_key = self.query_exam_answer_key(exam.exam_id)
+
+        # the last answer of a question counts, questions outside the exam are ignored
+        submitted_answers = {
+            question.question_id: question.submitted_answer_option_id
+            for question in exam.submitted_questions
+            if question.question_id in answer_key
+        }
+        graded_answers = [
+            (
+                question_id,
+                option_id,
+                option_id is not None and option_id in answer_key[question_id],
+            )
+            for question_id, option_id in submitted_answers.items()
+        ]
+        score = sum(is_correct for _, _, is_correct in graded_answers)
 
         self.cursor.execute(
             """
-            INSERT INTO exam_submission (exam_id, user_id, submission_time)
-            VALUES (%s, %s, NOW())
+            INSERT INTO exam_submission (exam_id, user_id, score, submission_time)
+            VALUES (%s, %s, %s, NOW())
             """,
-            (exam.exam_id, exam.user_id),
+            (exam.exam_id, exam.user_id, score),
         )
         self.sql_query_logger()
         _submission_id = self.cursor.lastrowid
 
         if _submission_id is None:
+            self.connection.rollback()
             return None
 
-        # Insert submitted answers and track scoring
-        correct_count = 0
-        total_questions = len(exam.submitted_questions)
-
-        for question in exam.submitted_questions:
+        if graded_answers:
+            placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(graded_answers))
             self.cursor.execute(
-                """
-                INSERT INTO exam_submission_answers (submission_id, question_id, selected_option_id)
-                VALUES (%s, %s, %s)
-                """,
-                (
-                    _submission_id,
-                    question.question_id,
-                    question.submitted_answer_option_id,
-                ),
-            )
-
-            # Retrieve the correct option for the question
-            self.cursor.execute(
-                """
-                SELECT option_id FROM exam_options 
-                WHERE question_id = %s AND is_correct = 1
+                f"""
+                INSERT INTO exam_submission_answer (
+                    submission_id, question_id, selected_option_id, is_correct_at_submission
+                )
+                VALUES {placeholders}
                 """,
-                (question.question_id,),
+                [
+                    value
+                    for question_id, option_id, is_correct in graded_answers
+                    for value in (_submission_id, question_id, option_id, is_correct)
+                ],
             )
-            correct_option = self.cursor.fetchone()
+            self.sql_query_logger()
 
-            # Check if the submitted answer is correct
-            if (
-                correct_option
-                and correct_option[0] == question.submitted_answer_option_id
-            ):
-                correct_count += 1
+        if not self.commit():
+            return None
 
-        # Calculate the score and percentage
-        score = correct_count
-        score_percentage = (
-            (correct_count / total_questions) * 100 if total_questions > 0 else 0.0
+        self.logger.info(
+            f"Submission {_submission_id}: {score} / {len(answer_key)} correct"
         )
-
-        # Update the score and score percentage in the exam_submission table
-        self.cursor.execute(
-            """
-            UPDATE exam_submission
-            SET score = %s, score_percentage = %s
-            WHERE submission_id = %s
-            """,
-            (score, round(score_percentage, 2), _submission_id),
-        )
-
-        self.sql_query_logger()
-        self.commit()
-
         return _submission_id
 
+    @idempotent
     def query_mock_exam_results(self, submission_id: int) -> ExamResultModel | None:
         """
         Retrieve the results of a submitted mock exam.
@@ -2572,6 +2682,7 @@ class MySQLHandler(SetupMYSQL):
 
         return success
 
+    @idempotent
     def query_tag(self, tag_id: int) -> TagModel | None:
         self.cursor.execute(
             """
@@ -2589,6 +2700,7 @@ class MySQLHandler(SetupMYSQL):
         self.logger.debug(pformat(fetch_data))
         return fetch_data
 
+    @idempotent
     def query_tag_list(self) -> list[TagModel]:
         self.cursor.execute(
             """
@@ -2657,6 +2769,10 @@ class MySQLHandler(SetupMYSQL):
         Returns:
             bool: True if the commit was successful, False if it failed and was rolled back.
 
+        Note:
+            Pooled connections are not closed, `close_connection` discards the connection
+            from the pool once the unit of work ends.
+
         Raises:
             Exception: Any exception that occurs during the commit process is caught,
                 logged, and results in a rollback.
@@ -2672,14 +2788,8 @@ class MySQLHandler(SetupMYSQL):
             return False
         finally:
             if close_connection:
-                self.connection.close()
-                self.logger.debug(pformat("Mysql connection closed"))
-
-    def keep_alive(self) -> None:
-        """Keep Mysql connection alive"""
-        self.cursor.execute("SELECT(1);")
-        self.connection.commit()
-        self.logger.debug("Mysql running", time.strftime("%Y-%m-%d %H:%M:%S"))
+                current_checkout().discard = True
+                self.logger.debug(pformat("Mysql connection discarded"))
 
 
 mysql_client = MySQLHandler()
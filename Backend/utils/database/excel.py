@@ -8,9 +8,11 @@ from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.helper.model.database.excel import ResultModel
 from Backend.utils.helper.model.excel import ValidatedQuestionModel
 from Backend.utils.database.database import mysql_client
+from Backend.utils.database.pool import idempotent, with_connections
 from collections import Counter
 
 
+@with_connections
 class ExcelDatabaseController:
     def __init__(self) -> None:
         self.database = mysql_client
@@ -34,8 +36,6 @@ class ExcelDatabaseController:
         failed_inserts = 0
         failures: Counter = Counter()
 
-        self.database.connection.ping(attempts=3)
-
         try:
             # 先刪除可能存在的舊題目，確保不會有重複
             try:
@@ -414,6 +414,7 @@ class ExcelDatabaseController:
             self.database.connection.rollback()
             return False
 
+    @idempotent
     def get_file_list(self, doc_type: str | None = None) -> list[dict[str, Any]]:
         """
         獲取檔案列表
@@ -607,6 +608,7 @@ class ExcelDatabaseController:
             self.database.connection.connection.rollback()
             return False
 
+    @idempotent
     def get_question_count(self, file_name: str) -> int:
         """
         獲取指定檔案中的題目數量
@@ -627,6 +629,7 @@ class ExcelDatabaseController:
             self.logger.error(f"獲取題目數量時發生錯誤: {e}")
             return 0
 
+    @idempotent
     def get_file_info(self, file_id: str) -> dict[str, Any]:
         """
         獲取特定檔案的資訊
@@ -666,6 +669,7 @@ class ExcelDatabaseController:
             self.logger.error(f"獲取檔案資訊時發生錯誤: {e}")
             return {}
 
+    @idempotent
     def get_questions_by_file_name(self, file_name: str) -> list[dict[str, Any]]:
         """
         取得特定檔案的題目 (依檔案名稱)
@@ -694,6 +698,7 @@ class ExcelDatabaseController:
             self.logger.error(f"取得檔案題目錯誤: {e}")
             return []
 
+    @idempotent
     def get_questions(self, file_id: str) -> tuple[list[dict[str, Any]], str]:
         """
         獲取指定檔案 ID 的題目和檔案名稱
@@ -2,14 +2,17 @@
 
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.database.database import mysql_client
+from Backend.utils.database.pool import idempotent, with_connections
 from Backend.utils.helper.model.api.v1.management import UserModel, ClassModel
 
 
+@with_connections
 class ManagementDatabaseController:
     def __init__(self) -> None:
         self.database = mysql_client
         self.logger = CustomLoggerHandler().get_logger()
 
+    @idempotent
     def query_teacher_list(self) -> list[UserModel]:
         self.database.cursor.execute("""
             SELECT
@@ -36,6 +39,7 @@ class ManagementDatabaseController:
             for user in data
         ]
 
+    @idempotent
     def query_user_list(self) -> list[UserModel]:
         self.database.cursor.execute("""
             SELECT
@@ -60,6 +64,7 @@ class ManagementDatabaseController:
             for user in data
         ]
 
+    @idempotent
     def query_class_user_list(self, class_id: int) -> list[UserModel]:
         self.database.cursor.execute(
             """
@@ -92,6 +97,7 @@ class ManagementDatabaseController:
             for user in data
         ]
 
+    @idempotent
     def get_class_list(self) -> list[ClassModel]:
         self.database.cursor.execute("""
             SELECT
@@ -114,6 +120,7 @@ class ManagementDatabaseController:
             for class_ in data
         ]
 
+    @idempotent
     def get_class_by_user_id(self, user_id: int) -> list[ClassModel]:
         self.database.cursor.execute(
             """
@@ -0,0 +1,103 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import MilvusIndexConfigModel
+
+from os import getenv
+
+import json
+
+# development
+if getenv("DEBUG") == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+def default_index_params(index_type: str, dimension: int) -> tuple[dict, dict]:
+    """
+    Default build and search params of an index type.
+
+    Args:
+        index_type (str): Milvus index type.
+        dimension (int): Vector dimension, IVF_PQ needs `m` to divide it.
+
+    Returns:
+        tuple[dict, dict]: Build params and search params.
+    """
+    if index_type in ["IVF_FLAT", "IVF_SQ8"]:
+        return {"nlist": 128}, {"nprobe": 16}
+
+    if index_type == "IVF_PQ":
+        # the number of sub quantizers must divide the dimension
+        m = next(m for m in range(min(64, dimension), 0, -1) if dimension % m == 0)
+        return {"nlist": 128, "m": m, "nbits": 8}, {"nprobe": 16}
+
+    if index_type == "HNSW":
+        return {"M": 16, "efConstruction": 200}, {"ef": 64}
+
+    if index_type == "DISKANN":
+        return {}, {"search_list": 100}
+
+    return {}, {}
+
+
+def resolve_index_config(
+    index_config: MilvusIndexConfigModel, dimension: int
+) -> MilvusIndexConfigModel:
+    """Fill the params missing from a config with the defaults of its index type"""
+    index_params, search_params = default_index_params(
+        index_config.index_type, dimension
+    )
+
+    return index_config.model_copy(
+        update={
+            "index_params": {**index_params, **index_config.index_params},
+            "search_params": {**search_params, **index_config.search_params},
+        }
+    )
+
+
+def collection_index_config(
+    collection_name: str, dimension: int
+) -> MilvusIndexConfigModel:
+    """
+    Index config of a collection.
+
+    MILVUS_INDEX_TYPE, MILVUS_METRIC_TYPE, MILVUS_INDEX_PARAMS and MILVUS_SEARCH_PARAMS
+    set the default of every collection, MILVUS_COLLECTION_INDEX overrides them per
+    collection with a JSON object of collection name -> MilvusIndexConfigModel fields.
+
+    Args:
+        collection_name (str): Milvus collection name.
+        dimension (int): Vector dimension of the collection.
+
+    Returns:
+        MilvusIndexConfigModel: The config with the defaults of its index type filled in.
+    """
+    default_config = MilvusIndexConfigModel(
+        index_type=getenv("MILVUS_INDEX_TYPE", "IVF_FLAT"),  # type: ignore[arg-type]
+        metric_type=getenv("MILVUS_METRIC_TYPE", "L2"),  # type: ignore[arg-type]
+        index_params=json.loads(getenv("MILVUS_INDEX_PARAMS") or "{}"),
+        search_params=json.loads(getenv("MILVUS_SEARCH_PARAMS") or "{}"),
+    )
+
+    collection_configs = json.loads(getenv("MILVUS_COLLECTION_INDEX") or "{}")
+    assert isinstance(collection_configs, dict), (
+        "MILVUS_COLLECTION_INDEX environment variable is not valid"
+    )
+
+    if collection_name not in collection_configs:
+        return resolve_index_config(default_config, dimension)
+
+    overrides = collection_configs[collection_name]
+    base_config = default_config.model_dump()
+    # build and search params only make sense for the index type they were written for
+    if (
+        overrides.get("index_type", default_config.index_type)
+        != default_config.index_type
+    ):
+        base_config.update(index_params={}, search_params={})
+
+    return resolve_index_config(
+        MilvusIndexConfigModel(**{**base_config, **overrides}), dimension
+    )
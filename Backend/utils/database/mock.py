@@ -1,6 +1,8 @@
 # Code by AkinoAlice@TyrantRey
 
 from Backend.utils.database.database import mysql_client
+from Backend.utils.database.answer_key_cache import answer_key_cache
+from Backend.utils.database.pool import idempotent, with_connections
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.helper.model.api.v1.mock import (
     MOCK_TYPE,
@@ -10,6 +12,8 @@ from Backend.utils.helper.model.api.v1.mock import (
     OptionModel,
     QuestionImageModel,
     MockAnswerModel,
+    SubmittedExamModel,
+    SubmittedQuestionModel,
 )
 
 from datetime import datetime
@@ -17,6 +21,7 @@ from pathlib import Path
 import base64
 
 
+@with_connections
 class MockerDatabaseController:
     def __init__(
         self,
@@ -24,11 +29,10 @@ class MockerDatabaseController:
         self.database = mysql_client
         self.logger = CustomLoggerHandler().get_logger()
 
+    @idempotent
     def query_mock_exam_list(
         self, mock_type: MOCK_TYPE, user_id: int
     ) -> list[ExamsModel]:
-        self.database.connection.ping(attempts=3)
-
         if mock_type == "all":
             self.database.cursor.execute(
                 """
@@ -103,8 +107,6 @@ class MockerDatabaseController:
         exam_date: datetime,
         exam_duration: int,
     ) -> int:
-        self.database.connection.ping(attempts=3)
-
         self.database.cursor.execute(
             """
             INSERT INTO exams (
@@ -147,7 +149,6 @@ class MockerDatabaseController:
         exam_date: datetime,
         exam_duration: int,
     ) -> int | None:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -178,7 +179,6 @@ class MockerDatabaseController:
             return None
 
     def insert_new_exam_question(self, exam_id: int, question_text: str) -> int | None:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -202,6 +202,7 @@ class MockerDatabaseController:
             )
 
             self.database.commit()
+            answer_key_cache.invalidate_exam(exam_id)
             return question_id
         except Exception as e:
             self.logger.error(e)
@@ -211,7 +212,6 @@ class MockerDatabaseController:
     def insert_new_exam_question_option(
         self, question_id: int, option_text: str, is_correct: bool
     ) -> int | None:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -235,6 +235,7 @@ class MockerDatabaseController:
             )
 
             self.database.commit()
+            answer_key_cache.invalidate_question(question_id)
             return option_id
         except Exception as e:
             self.logger.error(e)
@@ -242,7 +243,6 @@ class MockerDatabaseController:
             return None
 
     def insert_new_exam_question_image(self, question_id: int, image_uuid: str) -> bool:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             INSERT INTO question_image (question_id, image_uuid)
@@ -255,7 +255,6 @@ class MockerDatabaseController:
         return self.database.commit()
 
     def disable_exam(self, exam_id: int) -> bool:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             UPDATE exams 
@@ -264,10 +263,11 @@ class MockerDatabaseController:
             """,
             (exam_id,),
         )
-        return self.database.commit()
+        success = self.database.commit()
+        answer_key_cache.invalidate_exam(exam_id)
+        return success
 
     def disable_exam_question(self, question_id: int) -> bool:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             UPDATE question 
@@ -276,10 +276,11 @@ class MockerDatabaseController:
             """,
             (question_id,),
         )
-        return self.database.commit()
+        success = self.database.commit()
+        answer_key_cache.invalidate_question(question_id)
+        return success
 
     def disable_exam_question_option(self, option_id: int) -> bool:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             UPDATE `option` 
@@ -288,7 +289,9 @@ class MockerDatabaseController:
             """,
             (option_id,),
         )
-        return self.database.commit()
+        success = self.database.commit()
+        answer_key_cache.invalidate_option(option_id)
+        return success
 
     def disable_exam_question_image(
         self, exam_id: int, question_id: int, image_uuid: str
@@ -301,8 +304,6 @@ class MockerDatabaseController:
         )
         file_content_to_restore = None
         try:
-            self.database.connection.ping(attempts=3)
-
             if image_path.exists():
                 with image_path.open("rb") as f:
                     file_content_to_restore = f.read()
@@ -353,7 +354,6 @@ class MockerDatabaseController:
         exam_date: datetime,
         exam_duration: int,
     ) -> bool:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -381,7 +381,6 @@ class MockerDatabaseController:
             return False
 
     def modify_exam_question(self, question_id: int, question_text: str) -> bool:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -401,7 +400,6 @@ class MockerDatabaseController:
     def modify_exam_question_option(
         self, option_id: int, option_text: str, is_correct: bool
     ) -> bool:
-        self.database.connection.ping(attempts=3)
         try:
             self.database.cursor.execute(
                 """
@@ -412,7 +410,9 @@ class MockerDatabaseController:
                 (option_text, is_correct, option_id),
             )
             self.database.sql_query_logger()
-            return self.database.commit()
+            success = self.database.commit()
+            answer_key_cache.invalidate_option(option_id)
+            return success
         except Exception as e:
             self.logger.error(e)
             self.database.connection.rollback()
@@ -443,8 +443,6 @@ class MockerDatabaseController:
 
         file_content_to_restore = None
 
-        self.database.connection.ping(attempts=3)
-
         try:
             if image_path.exists():
                 with image_path.open("rb") as f:
@@ -492,8 +490,8 @@ class MockerDatabaseController:
                     )
             return False
 
+    @idempotent
     def query_exam_info(self, exam_id: int) -> ExamsModel:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT 
@@ -521,8 +519,8 @@ class MockerDatabaseController:
             exam_duration=fetch_data["exam_duration"],
         )
 
+    @idempotent
     def query_exam_question(self, exam_id: int) -> list[QuestionModel]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT 
@@ -550,8 +548,8 @@ class MockerDatabaseController:
             for question in fetch_data
         ]
 
+    @idempotent
     def query_question_info(self, question_id: int) -> QuestionModel:
-        self.database.connection.ping()
         self.database.cursor.execute(
             """
             SELECT 
@@ -572,10 +570,10 @@ class MockerDatabaseController:
             question_text=fetch_data["question_text"],
         )
 
+    @idempotent
     def query_question_option(
         self, exam_id: int, question_id: int
     ) -> list[OptionModel]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT
@@ -606,8 +604,8 @@ class MockerDatabaseController:
             for option in fetch_data
         ]
 
+    @idempotent
     def query_question_option_info(self, option_id: int) -> OptionModel:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT
@@ -629,10 +627,10 @@ class MockerDatabaseController:
             is_correct=fetch_data["is_correct"],
         )
 
+    @idempotent
     def query_question_image(
         self, exam_id: int, question_id: int
     ) -> list[QuestionImageModel]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT
@@ -660,8 +658,8 @@ class MockerDatabaseController:
             for image in fetch_data
         ]
 
+    @idempotent
     def query_question_image_info(self, image_uuid: str) -> QuestionImageModel:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT
@@ -682,8 +680,8 @@ class MockerDatabaseController:
             image_uuid=fetch_data["image_uuid"],
         )
 
+    @idempotent
     def query_exam_correct_answer(self, exam_id: int) -> list[MockAnswerModel]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT 
@@ -716,6 +714,7 @@ class MockerDatabaseController:
             for correct_question in fetch_data
         ]
 
+    @idempotent
     def query_tag_list(self) -> list[TagModel]:
         self.database.cursor.execute(
             """
@@ -764,6 +763,7 @@ class MockerDatabaseController:
 
         return success
 
+    @idempotent
     def query_tag(self, tag_id: int) -> TagModel | None:
         self.database.cursor.execute(
             """
@@ -784,8 +784,8 @@ class MockerDatabaseController:
             description=fetch_data[0]["description"],
         )
 
+    @idempotent
     def query_question_tags(self, question_id: int) -> list[TagModel]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             SELECT 
@@ -841,37 +841,19 @@ class MockerDatabaseController:
 
         return success
 
-    def insert_submitted_exam(self, exam_id: int, user_id: int, score: int) -> int:
-        self.database.connection.ping(attempts=3)
-        self.database.cursor.execute(
-            """
-            INSERT INTO exam_submission (exam_id, user_id, score)
-            VALUES (%s, %s, %s)
-            """,
-            (exam_id, user_id, score),
-        )
-        self.database.sql_query_logger()
-        self.database.commit()
-
-        self.database.cursor.execute("SELECT LAST_INSERT_ID() AS last_id;")
-        last_id = self.database.cursor.fetchone()["last_id"]
-        self.logger.info(last_id)
-        return last_id
-
-    def insert_submitted_answer(
-        self, submission_id: int, question_id: int, selection_option_id: int | None
-    ) -> bool:
-        self.database.connection.ping(attempts=3)
-        try:
-            self.database.cursor.execute(
-                """
-                INSERT INTO exam_submission_answer (submission_id, question_id, selected_option_id)
-                VALUES (%s, %s, %s)
-                """,
-                (submission_id, question_id, selection_option_id),
+    def insert_graded_submission(
+        self, exam_id: int, user_id: int, answers: list[MockAnswerModel]
+    ) -> int | None:
+        return self.database.insert_mock_exam_submitted_question(
+            SubmittedExamModel(
+                exam_id=exam_id,
+                user_id=user_id,
+                submitted_questions=[
+                    SubmittedQuestionModel(
+                        question_id=answer.question_id,
+                        submitted_answer_option_id=answer.selected_option_id,
+                    )
+                    for answer in answers
+                ],
             )
-            self.database.sql_query_logger()
-            return self.database.commit()
-        except Exception as e:
-            self.logger.error(e)
-            return False
+        )
@@ -0,0 +1,461 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import (
+    SearchFilterModel,
+    SearchSimilarityModel,
+)
+from Backend.utils.helper.error import VectorSchemaMismatchError
+from Backend.utils.RAG.near_duplicate import near_duplicate_index
+from Backend.utils.RAG.keyword_index import keyword_index
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from typing import Optional
+from pprint import pformat
+from uuid import uuid4
+from os import getenv
+
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import json
+import os
+
+# development
+if getenv("DEBUG") == "True":
+    from dotenv import load_dotenv
+
+    load_dotenv("./.env")
+
+
+class NumpyCollection:
+    """
+    Vectors of one collection in a memory-mapped, contiguous float32 matrix.
+
+    `{name}.vectors.f32` holds the rows and `{name}.norms.f32` their squared norms,
+    both grow by doubling their capacity, so reopening them is near-instant.
+    """
+
+    def __init__(self, path: str, name: str, dimension: int, size: int) -> None:
+        self.vector_path = os.path.join(path, f"{name}.vectors.f32")
+        self.norm_path = os.path.join(path, f"{name}.norms.f32")
+        self.dimension = dimension
+        self.size = size
+
+        self.vectors: Optional[np.memmap] = None
+        self.norms: Optional[np.memmap] = None
+        if os.path.exists(self.vector_path):
+            capacity = os.path.getsize(self.norm_path) // 4
+            stored_dim = os.path.getsize(self.vector_path) // 4 // capacity
+            if stored_dim != dimension:
+                raise VectorSchemaMismatchError(
+                    name, f"FLOAT_VECTOR({stored_dim})", f"FLOAT_VECTOR({dimension})"
+                )
+            self._open(capacity)
+
+    def write(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Write vectors into their rows, growing the files when needed"""
+        required = int(rows.max()) + 1
+        if self.vectors is None or required > len(self.vectors):
+            capacity = len(self.vectors) if self.vectors is not None else 1024
+            while capacity < required:
+                capacity *= 2
+            self._grow(capacity)
+
+        assert self.vectors is not None and self.norms is not None
+        self.vectors[rows] = vectors
+        self.norms[rows] = np.einsum("ij,ij->i", vectors, vectors)
+        self.vectors.flush()
+        self.norms.flush()
+        self.size = max(self.size, required)
+
+    def search(
+        self,
+        question_vectors: np.ndarray,
+        limit: int,
+        rows: Optional[np.ndarray] = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact L2 search for a batch of queries.
+
+        Candidates are selected with ||x||^2 - 2 x.q + ||q||^2 over the whole matrix in one
+        matrix product, then re-ranked on the exact squared distance, which is what Milvus FLAT returns.
+
+        Args:
+            question_vectors (np.ndarray): The query vectors, one row per query.
+            limit (int): Maximum number of rows to return per query.
+            rows (np.ndarray, optional): Only search these rows. Defaults to every row.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Rows and squared L2 distances of each query, closest first.
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if self.vectors is None or self.norms is None or self.size == 0:
+            return [empty for _ in question_vectors]
+
+        if rows is None:
+            vectors = self.vectors[: self.size]
+            norms = self.norms[: self.size]
+        else:
+            vectors = self.vectors[rows]
+            norms = self.norms[rows]
+        if not len(vectors):
+            return [empty for _ in question_vectors]
+
+        distances = norms - 2 * (question_vectors @ vectors.T)
+
+        candidate_count = min(len(vectors), limit * 2)
+        candidates = np.argpartition(distances, candidate_count - 1, axis=1)[
+            :, :candidate_count
+        ]
+
+        results = []
+        for question_vector, question_candidates in zip(question_vectors, candidates):
+            difference = vectors[question_candidates] - question_vector
+            exact = np.einsum("ij,ij->i", difference, difference)
+            order = np.argsort(exact, kind="stable")[:limit]
+
+            positions = question_candidates[order]
+            if rows is not None:
+                positions = rows[positions]
+            results.append((positions, exact[order]))
+
+        return results
+
+    def _grow(self, capacity: int) -> None:
+        # extending a file keeps the existing rows and zero fills the new ones
+        with open(self.vector_path, "ab") as file:
+            file.truncate(capacity * self.dimension * 4)
+        with open(self.norm_path, "ab") as file:
+            file.truncate(capacity * 4)
+        self._open(capacity)
+
+    def _open(self, capacity: int) -> None:
+        self.vectors = np.memmap(
+            self.vector_path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.dimension),
+        )
+        self.norms = np.memmap(
+            self.norm_path, dtype=np.float32, mode="r+", shape=(capacity,)
+        )
+
+
+class NumpyVectorHandler:
+    """
+    In-process vector store with the same interface as `MilvusHandler`.
+
+    Vectors live in memory-mapped float32 matrices under NUMPY_VECTOR_PATH and
+    the row metadata in a SQLite file next to them. Search is exact brute-force
+    L2, giving the same results as a Milvus FLAT index on the same data.
+    """
+
+    def __init__(self, vector_dim: int) -> None:
+        # native dimension of the embedding model, see `VectorHandler`
+        self.vector_dim = vector_dim
+        self.DEFAULT_COLLECTION_NAME = str(getenv("MILVUS_DEFAULT_COLLECTION_NAME"))
+        self.VECTOR_PATH = getenv("NUMPY_VECTOR_PATH", "./cache/vector")
+
+        assert self.VECTOR_PATH != "", (
+            "NUMPY_VECTOR_PATH environment variable is not set"
+        )
+
+        self.logger = CustomLoggerHandler().get_logger()
+
+        self.logger.debug("| Start loading NumPy vector database |")
+
+        os.makedirs(self.VECTOR_PATH, exist_ok=True)
+        self.database = sqlite3.connect(
+            os.path.join(self.VECTOR_PATH, "metadata.sqlite3"), check_same_thread=False
+        )
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vector_row (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                file_uuid TEXT NOT NULL,
+                content TEXT NOT NULL,
+                docs_type TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '[]',
+                PRIMARY KEY (collection, id)
+            );
+            """
+        )
+        # stores created before search filters
+        columns = [
+            column[1]
+            for column in self.database.execute("PRAGMA table_info(vector_row);")
+        ]
+        if "docs_type" not in columns:
+            self.database.execute(
+                "ALTER TABLE vector_row ADD COLUMN docs_type TEXT NOT NULL DEFAULT '';"
+            )
+            self.database.execute(
+                "ALTER TABLE vector_row ADD COLUMN tags TEXT NOT NULL DEFAULT '[]';"
+            )
+        self.database.execute(
+            "CREATE INDEX IF NOT EXISTS vector_row_index ON vector_row (collection, row);"
+        )
+        # random id of each collection, a deleted store gets new ids, see `check_collection`
+        self.database.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vector_collection (
+                collection TEXT PRIMARY KEY,
+                generation TEXT NOT NULL
+            );
+            """
+        )
+        self.database.commit()
+
+        self.collections: dict[str, NumpyCollection] = {}
+        # collection -> (primary key -> row)
+        self.rows: dict[str, dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+        self.logger.debug("| NumPy vector database Loading Finished |")
+
+    def check_collection(self, collection_name: str) -> None:
+        """Same as `MilvusHandler.check_collection`"""
+        with self.lock:
+            self._collection(collection_name)
+
+    def metric_type(self, collection_name: str) -> str:
+        """Same as `MilvusHandler.metric_type`, always squared L2"""
+        return "L2"
+
+    @staticmethod
+    def hash_id(docs_filename: str, content: str) -> str:
+        """Derive a stable primary key from the document source and sentence content"""
+        return hashlib.sha256(f"{docs_filename}\0{content}".encode()).hexdigest()
+
+    def insert_sentence(
+        self,
+        docs_filename: str,
+        vector: np.ndarray,
+        content: str,
+        file_uuid: str,
+        collection: str = "default",
+        remove_duplicates: bool = True,
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> dict:
+        """Same as `MilvusHandler.insert_sentence`"""
+        return self.insert_sentences(
+            docs_filename=docs_filename,
+            vectors=np.asarray([vector]),
+            contents=[content],
+            file_uuid=file_uuid,
+            collection=collection,
+            remove_duplicates=remove_duplicates,
+            docs_type=docs_type,
+            tags=tags,
+        )
+
+    def insert_sentences(
+        self,
+        docs_filename: str,
+        vectors: np.ndarray,
+        contents: list[str],
+        file_uuid: str,
+        collection: str = "default",
+        remove_duplicates: bool = True,
+        batch_size: int = 512,
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> dict:
+        """
+        Same as `MilvusHandler.insert_sentences`.
+
+        Rows are keyed by the same content hash and always written in place, so
+        `remove_duplicates` and `batch_size` are only accepted for interface
+        compatibility.
+
+        Returns:
+            dict: The number of rows written (`insert_count`) and their primary keys (`ids`).
+        """
+        assert len(vectors) == len(contents), (
+            f"vectors and contents length mismatch: {len(vectors)} != {len(contents)}"
+        )
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        assert vectors.shape[1] == self.vector_dim, (
+            f"vector dimension mismatch: {vectors.shape[1]} != {self.vector_dim}"
+        )
+
+        ids = [self.hash_id(docs_filename, content) for content in contents]
+
+        with self.lock:
+            store = self._collection(collection)
+            rows = self.rows[collection]
+
+            next_row = store.size
+            positions = []
+            for row_id in ids:
+                if row_id not in rows:
+                    rows[row_id] = next_row
+                    next_row += 1
+                positions.append(rows[row_id])
+
+            if not ids:
+                return {"insert_count": 0, "ids": []}
+
+            # vectors are flushed before the metadata commit, so a crash in between
+            # only leaves unreferenced rows that the next insert overwrites
+            store.write(np.asarray(positions), vectors)
+
+            self.database.executemany(
+                "INSERT OR REPLACE INTO vector_row VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                [
+                    (
+                        collection,
+                        row_id,
+                        row,
+                        str(docs_filename),
+                        file_uuid,
+                        content,
+                        docs_type,
+                        json.dumps(tags or [], ensure_ascii=False),
+                    )
+                    for row_id, row, content in zip(ids, positions, contents)
+                ],
+            )
+            self.database.commit()
+
+        unique_ids = list(dict.fromkeys(ids))
+        self.logger.debug(pformat(f"Inserted rows: {len(unique_ids)}"))
+
+        return {"insert_count": len(unique_ids), "ids": unique_ids}
+
+    def search_similarity(
+        self,
+        question_vector: np.ndarray,
+        collection_name: str = "default",
+        limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> list[SearchSimilarityModel]:
+        """Same as `MilvusHandler.search_similarity`, distances are squared L2"""
+        return self.search_similarity_batch(
+            np.asarray([question_vector]), collection_name, limit, search_filter
+        )[0]
+
+    def search_similarity_batch(
+        self,
+        question_vectors: np.ndarray,
+        collection_name: str = "default",
+        limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> list[list[SearchSimilarityModel]]:
+        """Same as `MilvusHandler.search_similarity_batch`, distances are squared L2"""
+        question_vectors = np.asarray(question_vectors, dtype=np.float32)
+
+        with self.lock:
+            store = self._collection(collection_name)
+            results = store.search(
+                question_vectors,
+                limit,
+                self._filtered_rows(collection_name, search_filter),
+            )
+            positions = sorted({row for rows, _ in results for row in rows.tolist()})
+            if not positions:
+                return [[] for _ in results]
+
+            records = self.database.execute(
+                f"""
+                SELECT row, id, source, file_uuid, content FROM vector_row
+                WHERE collection = ? AND row IN ({", ".join("?" * len(positions))});
+                """,
+                (collection_name, *positions),
+            ).fetchall()
+            assert store.vectors is not None
+            # copied, an upsert may overwrite a row once the lock is released
+            vectors_by_row = dict(zip(positions, np.array(store.vectors[positions])))
+
+        records_by_row = {record[0]: record[1:] for record in records}
+
+        query_search_result = [
+            [
+                SearchSimilarityModel(
+                    id=records_by_row[row][0],
+                    source=records_by_row[row][1],
+                    file_uuid=records_by_row[row][2],
+                    content=records_by_row[row][3],
+                    distance=distance,
+                    vector=vectors_by_row[row].tolist(),
+                )
+                for row, distance in zip(rows.tolist(), distances.tolist())
+                # rows written before a crash but never committed have no metadata
+                if row in records_by_row
+            ]
+            for rows, distances in results
+        ]
+
+        self.logger.debug(pformat(query_search_result))
+
+        return query_search_result
+
+    def _filtered_rows(
+        self, collection: str, search_filter: Optional[SearchFilterModel]
+    ) -> Optional[np.ndarray]:
+        """Rows matching a search filter, None when nothing is filtered, caller holds the lock"""
+        if search_filter is None or (
+            search_filter.docs_type is None and not search_filter.tags
+        ):
+            return None
+
+        conditions = ["collection = ?"]
+        parameters: list[str] = [collection]
+        if search_filter.docs_type is not None:
+            conditions.append("docs_type = ?")
+            parameters.append(search_filter.docs_type)
+        if search_filter.tags:
+            conditions.append(
+                f"""EXISTS (
+                    SELECT 1 FROM json_each(vector_row.tags)
+                    WHERE value IN ({", ".join("?" * len(search_filter.tags))})
+                )"""
+            )
+            parameters.extend(search_filter.tags)
+
+        rows = self.database.execute(
+            f"SELECT row FROM vector_row WHERE {' AND '.join(conditions)};",
+            parameters,
+        ).fetchall()
+
+        return np.asarray([row for (row,) in rows], dtype=np.int64)
+
+    def _collection(self, collection: str) -> NumpyCollection:
+        """Open a collection, caller holds the lock"""
+        if collection not in self.collections:
+            generation = self.database.execute(
+                "SELECT generation FROM vector_collection WHERE collection = ?;",
+                (collection,),
+            ).fetchone()
+            if generation is None:
+                generation = (uuid4().hex,)
+                self.database.execute(
+                    "INSERT INTO vector_collection VALUES (?, ?);",
+                    (collection, generation[0]),
+                )
+                self.database.commit()
+            keyword_index.sync_collection(collection, generation[0])
+            near_duplicate_index.sync_collection(collection, generation[0])
+
+            rows = dict(
+                self.database.execute(
+                    "SELECT id, row FROM vector_row WHERE collection = ?;",
+                    (collection,),
+                ).fetchall()
+            )
+            self.rows[collection] = rows
+            self.collections[collection] = NumpyCollection(
+                self.VECTOR_PATH,
+                collection,
+                self.vector_dim,
+                max(rows.values(), default=-1) + 1,
+            )
+            self.logger.debug(f"Loaded collection `{collection}`: {len(rows)} rows")
+
+        return self.collections[collection]
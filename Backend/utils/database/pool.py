@@ -0,0 +1,345 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.database import MySQLPoolStatsModel
+from Backend.utils.helper.error import MySQLError, MySQLPoolTimeoutError
+from Backend.utils.helper.logger import CustomLoggerHandler
+
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.cursor import MySQLCursor
+from mysql.connector import errorcode, errors
+
+from typing import Any, Callable, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import deque
+from functools import wraps
+
+import numpy as np
+import threading
+import time
+
+MethodT = TypeVar("MethodT", bound=Callable[..., Any])
+
+# client errors raised when the server closed the connection
+DISCONNECT_ERRNOS = {
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+}
+
+
+def is_disconnect(error: BaseException) -> bool:
+    """Whether the error means the connection was dropped, not that the query failed"""
+    return (
+        isinstance(error, (errors.InterfaceError, errors.OperationalError))
+        and error.errno in DISCONNECT_ERRNOS
+    )
+
+
+class Checkout:
+    """A connection checked out for one unit of work and its cursor"""
+
+    def __init__(self, connection: MySQLConnection) -> None:
+        self.connection = connection
+        self.cursor: MySQLCursor = connection.cursor(dictionary=True, prepared=True)
+        # set when the connection must not go back to the pool
+        self.discard = False
+
+    def renew_cursor(self) -> None:
+        """Open a new cursor, needed after the connection reconnected"""
+        self.cursor = self.connection.cursor(dictionary=True, prepared=True)
+
+    def close_cursor(self) -> None:
+        try:
+            self.cursor.close()
+        except Exception:
+            self.discard = True
+
+
+# the checkout of the running unit of work, per thread and per asyncio task
+_checkout: ContextVar[Optional[Checkout]] = ContextVar("mysql_checkout", default=None)
+
+
+def current_checkout() -> Checkout:
+    """
+    Checkout of the running unit of work.
+
+    Raises:
+        MySQLError: If no unit of work is running in this thread or task.
+    """
+    checkout = _checkout.get()
+    if checkout is None:
+        raise MySQLError(
+            "MySQL connection used outside of a unit of work, see `with_connection`"
+        )
+    return checkout
+
+
+@contextmanager
+def bind_connection(connection: MySQLConnection) -> Iterator[Checkout]:
+    """Run a unit of work on a connection that is not pooled, used to bootstrap the database"""
+    checkout = Checkout(connection)
+    token = _checkout.set(checkout)
+    try:
+        yield checkout
+    finally:
+        _checkout.reset(token)
+        checkout.close_cursor()
+
+
+def idempotent(method: MethodT) -> MethodT:
+    """
+    Mark a read only method as safe to run again, see `with_connection`.
+
+    Apply it below `with_connections`, the class decorator reads the mark.
+    """
+    method.__idempotent__ = True  # type: ignore[attr-defined]
+    return method
+
+
+def with_connection(method: MethodT) -> MethodT:
+    """
+    Run a method as a unit of work on a pooled connection.
+
+    The connection is checked out from `self.pool` (or `self.database.pool` for the
+    controllers) on entry, nested calls reuse it, and it is returned on exit. Work left
+    uncommitted by a successful call is committed, it is rolled back on error.
+
+    A method marked `idempotent` that is the outermost unit of work runs once more on a
+    new connection when the server dropped its connection.
+    """
+    retry = getattr(method, "__idempotent__", False)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _checkout.get() is not None:
+            return method(self, *args, **kwargs)
+
+        pool: MySQLConnectionPool = getattr(self, "database", self).pool
+        try:
+            with pool.unit_of_work():
+                return method(self, *args, **kwargs)
+        except Exception as error:
+            if not (retry and is_disconnect(error)):
+                raise
+            pool.logger.warning(f"Retrying {method.__name__} after: {error}")
+            with pool.condition:
+                pool.retries += 1
+
+        with pool.unit_of_work():
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def with_connections(cls: type) -> type:
+    """Class decorator applying `with_connection` to every public method defined on the class"""
+    for name, attribute in list(vars(cls).items()):
+        if not name.startswith("_") and callable(attribute):
+            setattr(cls, name, with_connection(attribute))
+    return cls
+
+
+class MySQLConnectionPool:
+    """
+    Thread safe pool of MySQL connections.
+
+    Up to `pool_size` idle connections are kept, `max_overflow` more are opened under load
+    and closed when returned. A checkout waits up to `timeout` seconds for a connection,
+    connections older than `recycle` seconds are reopened on checkout, and connections idle
+    for more than `pre_ping` seconds are pinged first and reopened if the server dropped them.
+    A connection dropped during a query discards every idle connection, they were most
+    likely dropped together.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], MySQLConnection],
+        pool_size: int,
+        max_overflow: int,
+        timeout: float,
+        recycle: float,
+        pre_ping: float,
+    ) -> None:
+        self.logger = CustomLoggerHandler().get_logger()
+
+        self.connection_factory = connection_factory
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        # the most recently returned connection is reused first
+        self.idle: deque[MySQLConnection] = deque()
+        # id(connection) -> time it was opened
+        self.opened_time: dict[int, float] = {}
+        # id(connection) -> time it was returned
+        self.returned_time: dict[int, float] = {}
+        self.condition = threading.Condition()
+        self.opened = 0
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.pings = 0
+        self.invalidated = 0
+        self.retries = 0
+        self.wait_times: deque[float] = deque(maxlen=4096)
+
+    def acquire(self) -> MySQLConnection:
+        """
+        Check out a connection.
+
+        Raises:
+            MySQLPoolTimeoutError: If no connection was returned within `timeout` seconds.
+        """
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        connection = None
+
+        with self.condition:
+            while True:
+                if self.idle:
+                    connection = self.idle.pop()
+                    break
+                if self.opened < self.pool_size + self.max_overflow:
+                    # reserve the slot, the connection is opened outside the lock
+                    self.opened += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise MySQLPoolTimeoutError(
+                        self.pool_size + self.max_overflow, self.timeout
+                    )
+                self.condition.wait(remaining)
+
+            self.checkouts += 1
+            self.wait_times.append(time.perf_counter() - start_time)
+
+        if (
+            connection is not None
+            and self.recycle
+            and time.monotonic() - self.opened_time[id(connection)] > self.recycle
+        ):
+            self._close(connection)
+            connection = None
+            with self.condition:
+                self.recycled += 1
+
+        if (
+            connection is not None
+            and time.monotonic() - self.returned_time[id(connection)] > self.pre_ping
+            and not self._ping(connection)
+        ):
+            self._close(connection)
+            connection = None
+            with self.condition:
+                self.invalidated += 1
+
+        if connection is None:
+            try:
+                connection = self.connection_factory()
+            except Exception:
+                with self.condition:
+                    self.opened -= 1
+                    self.condition.notify()
+                raise
+            self.opened_time[id(connection)] = time.monotonic()
+
+        return connection
+
+    def release(self, connection: MySQLConnection, discard: bool = False) -> None:
+        """Return a checked out connection, overflow and discarded connections are closed"""
+        with self.condition:
+            keep = not discard and len(self.idle) < self.pool_size
+            if keep:
+                self.returned_time[id(connection)] = time.monotonic()
+                self.idle.append(connection)
+            else:
+                self.opened -= 1
+            self.condition.notify()
+
+        if not keep:
+            self._close(connection)
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[Checkout]:
+        """Check out a connection bound to the running thread or task, see `with_connection`"""
+        connection = self.acquire()
+        try:
+            checkout = Checkout(connection)
+        except Exception:
+            self.release(connection, discard=True)
+            raise
+
+        token = _checkout.set(checkout)
+        try:
+            yield checkout
+            if checkout.connection.in_transaction:
+                checkout.connection.commit()
+        except BaseException as error:
+            if is_disconnect(error):
+                checkout.discard = True
+                self.invalidate()
+            try:
+                checkout.connection.rollback()
+            except Exception:
+                checkout.discard = True
+            raise
+        finally:
+            _checkout.reset(token)
+            checkout.close_cursor()
+            self.release(checkout.connection, checkout.discard)
+
+    def invalidate(self) -> None:
+        """Close every idle connection, they are reopened on checkout"""
+        with self.condition:
+            connections = list(self.idle)
+            self.idle.clear()
+            self.opened -= len(connections)
+            self.invalidated += len(connections)
+            self.condition.notify_all()
+
+        for connection in connections:
+            self._close(connection)
+
+    def stats(self) -> MySQLPoolStatsModel:
+        with self.condition:
+            waits = np.asarray(self.wait_times or [0.0]) * 1000
+            return MySQLPoolStatsModel(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                opened=self.opened,
+                idle=len(self.idle),
+                in_use=self.opened - len(self.idle),
+                checkouts=self.checkouts,
+                timeouts=self.timeouts,
+                recycled=self.recycled,
+                pings=self.pings,
+                invalidated=self.invalidated,
+                retries=self.retries,
+                wait_p50_ms=float(np.percentile(waits, 50)),
+                wait_p99_ms=float(np.percentile(waits, 99)),
+                wait_max_ms=float(waits.max()),
+            )
+
+    def _ping(self, connection: MySQLConnection) -> bool:
+        with self.condition:
+            self.pings += 1
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception as error:
+            self.logger.warning(f"Dropped idle MySQL connection: {error}")
+            return False
+
+    def _close(self, connection: MySQLConnection) -> None:
+        self.opened_time.pop(id(connection), None)
+        self.returned_time.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception as error:
+            self.logger.warning(f"Failed to close MySQL connection: {error}")
@@ -1,10 +1,12 @@
 # Code by AkinoAlice@TyrantRey
 
 from Backend.utils.database.database import mysql_client
+from Backend.utils.database.pool import idempotent, with_connections
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.helper.model.api.v1.result import MockResult
 
 
+@with_connections
 class ResultDatabaseController:
     def __init__(
         self,
@@ -12,8 +14,8 @@ class ResultDatabaseController:
         self.database = mysql_client
         self.logger = CustomLoggerHandler().get_logger()
 
+    @idempotent
     def query_mock_exam_result(self, submission_id: int) -> MockResult:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             WITH ExamQuestionCounts AS (
@@ -82,8 +84,8 @@ class ResultDatabaseController:
             total_question=fetch_data["total_questions_in_exam"],
         )
 
+    @idempotent
     def query_mock_exam_result_by_exam(self, exam_id: int) -> list[MockResult]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             WITH ExamQuestionCounts AS (
@@ -155,8 +157,8 @@ class ResultDatabaseController:
             for data in fetch_data
         ]
 
+    @idempotent
     def query_mock_exam_result_by_class(self, class_id: int) -> list[MockResult]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             WITH ExamQuestionCounts AS (
@@ -228,8 +230,8 @@ class ResultDatabaseController:
             for data in fetch_data
         ]
 
+    @idempotent
     def query_mock_exam_result_by_user(self, user_id: int) -> list[MockResult]:
-        self.database.connection.ping(attempts=3)
         self.database.cursor.execute(
             """
             WITH ExamQuestionCounts AS (
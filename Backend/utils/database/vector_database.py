@@ -1,16 +1,30 @@
 # Code by AkinoAlice@TyrantRey
 
-from Backend.utils.helper.model.database.vector_database import SearchSimilarityModel
+from Backend.utils.helper.model.database.vector_database import (
+    MilvusIndexConfigModel,
+    SearchFilterModel,
+    SearchSimilarityModel,
+)
+from Backend.utils.database.milvus_index import (
+    collection_index_config,
+    resolve_index_config,
+)
+from Backend.utils.helper.error import VectorSchemaMismatchError
+from Backend.utils.RAG.vector_extractor import encoder_client
+from Backend.utils.RAG.near_duplicate import near_duplicate_index
+from Backend.utils.RAG.keyword_index import keyword_index
 from Backend.utils.helper.logger import CustomLoggerHandler
 
 from pymilvus import MilvusClient  # type: ignore[import-untyped]
 from pymilvus import DataType
 
-from typing import Literal, Dict
+from typing import Any, Dict, Optional
 from pprint import pformat
 from os import getenv
 
 import numpy as np
+import hashlib
+import json
 
 # development
 if getenv("DEBUG") == "True":
@@ -20,23 +34,34 @@ if getenv("DEBUG") == "True":
 
 
 class SetupMilvus:
-    def __init__(self) -> None:
+    def __init__(self, vector_dim: int) -> None:
         self.DEBUG = getenv("MILVUS_DEBUG")
         self.HOST = getenv("MILVUS_HOST")
         self.PORT = getenv("MILVUS_PORT")
-        self.MILVUS_VECTOR_DIM = int(str(getenv("MILVUS_VECTOR_DIM")))
+        self.VECTOR_TYPE = getenv("MILVUS_VECTOR_TYPE", "float32")
         self.DEFAULT_COLLECTION_NAME = str(getenv("MILVUS_DEFAULT_COLLECTION_NAME"))
 
         assert self.DEBUG is not None, "Missing MILVUS_DEBUG environment variable"
         assert self.HOST is not None, "Missing MILVUS_HOST environment variable"
         assert self.PORT is not None, "Missing MILVUS_PORT environment variable"
-        assert self.MILVUS_VECTOR_DIM > 0 and self.MILVUS_VECTOR_DIM is not None, (
-            "MILVUS_VECTOR_DIM must be a positive integer"
+        assert self.VECTOR_TYPE in ["float32", "float16"], (
+            "MILVUS_VECTOR_TYPE environment variable is not valid"
         )
         assert self.DEFAULT_COLLECTION_NAME is not None, (
             "Missing MILVUS_DEFAULT_COLLECTION_NAME environment variable"
         )
 
+        # native dimension of the embedding model, see `VectorHandler`
+        self.vector_dim = vector_dim
+        self.vector_datatype = (
+            DataType.FLOAT16_VECTOR
+            if self.VECTOR_TYPE == "float16"
+            else DataType.FLOAT_VECTOR
+        )
+        self.checked_collections: set[str] = set()
+        # collections created before docs_type and tags were stored, they cannot be filtered
+        self.unfilterable_collections: set[str] = set()
+
         self.logger = CustomLoggerHandler().get_logger()
 
         self.logger.debug("| Start loading Milvus |")
@@ -54,6 +79,7 @@ class SetupMilvus:
                 self.milvus_client.drop_collection(
                     collection_name=self.DEFAULT_COLLECTION_NAME
                 )
+                self._reset_local_indexes(self.DEFAULT_COLLECTION_NAME)
         finally:
             loading_status = self.milvus_client.get_load_state(
                 collection_name=self.DEFAULT_COLLECTION_NAME
@@ -75,24 +101,79 @@ class SetupMilvus:
             self.logger.debug(pformat("Creating Milvus database"))
             self._create_collection(collection_name=self.DEFAULT_COLLECTION_NAME)
 
+        self.check_collection(self.DEFAULT_COLLECTION_NAME)
+
+    def check_collection(self, collection_name: str) -> None:
+        """
+        Make sure the vector field of a collection matches the embedding model, and that
+        the local keyword and near duplicate indexes were built for this collection.
+
+        Raises:
+            VectorSchemaMismatchError: If the stored vector type or dimension differs.
+        """
+        if collection_name in self.checked_collections:
+            return
+
+        description = self.milvus_client.describe_collection(
+            collection_name=collection_name
+        )
+        fields = description["fields"]
+
+        if "docs_type" not in [field["name"] for field in fields]:
+            self.logger.warning(
+                f"Collection `{collection_name}` has no docs_type and tags fields, search filters are ignored"
+            )
+            self.unfilterable_collections.add(collection_name)
+
+        for field in fields:
+            if field["name"] != "vector":
+                continue
+
+            stored_dim = int(field["params"]["dim"])
+            if field["type"] != self.vector_datatype or stored_dim != self.vector_dim:
+                raise VectorSchemaMismatchError(
+                    collection_name,
+                    f"{field['type'].name}({stored_dim})",
+                    f"{self.vector_datatype.name}({self.vector_dim})",
+                )
+
+        # the collection id changes when the collection is dropped and created again
+        generation = str(description.get("collection_id", ""))
+        if generation:
+            keyword_index.sync_collection(collection_name, generation)
+            near_duplicate_index.sync_collection(collection_name, generation)
+
+        self.checked_collections.add(collection_name)
+
+    def _reset_local_indexes(self, collection_name: str) -> None:
+        """Forget the keyword index and chunk signatures of a dropped or created collection"""
+        self.checked_collections.discard(collection_name)
+        keyword_index.reset_collection(collection_name)
+        near_duplicate_index.reset_collection(collection_name)
+
     def _create_collection(
         self,
         collection_name: str,
-        index_type: Literal[
-            "FLAT",
-            "IVF_FLAT",
-            "IVF_SQ8",
-            "IVF_PQ",
-            "HNSW",
-            "ANNOY",
-            "RHNSW_FLAT",
-            "RHNSW_PQ",
-            "RHNSW_SQ",
-        ] = "IVF_FLAT",
-        metric_type: Literal["L2", "IP"] = "L2",
+        index_config: Optional[MilvusIndexConfigModel] = None,
     ) -> Dict:
+        """
+        Create a collection and its vector index.
+
+        Args:
+            collection_name (str): Milvus collection name.
+            index_config (MilvusIndexConfigModel, optional): Index type, build and search params.
+                Defaults to the config of the collection, see `collection_index_config`.
+
+        Returns:
+            Dict: The load state of the created collection.
+        """
+        if index_config is None:
+            index_config = collection_index_config(collection_name, self.vector_dim)
+
+        # primary key is derived from the content hash (see `MilvusHandler.hash_id`)
+        # so duplicated sentences can be replaced with a single upsert
         schema = MilvusClient.create_schema(
-            auto_id=True,
+            auto_id=False,
             enable_dynamic_field=False,
         )
 
@@ -109,32 +190,42 @@ class SetupMilvus:
         schema.add_field(
             field_name="content", datatype=DataType.VARCHAR, max_length=4096
         )
+        # partition key, a search filtered on one docs_type only scans its partitions
+        schema.add_field(
+            field_name="docs_type",
+            datatype=DataType.VARCHAR,
+            max_length=256,
+            is_partition_key=True,
+        )
+        schema.add_field(
+            field_name="tags",
+            datatype=DataType.ARRAY,
+            element_type=DataType.VARCHAR,
+            max_capacity=64,
+            max_length=256,
+        )
         schema.add_field(
             field_name="vector",
-            datatype=DataType.FLOAT_VECTOR,
-            dim=self.MILVUS_VECTOR_DIM,
+            datatype=self.vector_datatype,
+            dim=self.vector_dim,
         )
 
         self.logger.debug(pformat(f"Creating schema: {schema}"))
 
-        index_params = self.milvus_client.prepare_index_params()
-
-        index_params.add_index(
-            field_name="vector",
-            index_type=index_type,
-            metric_type=metric_type,
-            params={"nlist": 128},
-        )
+        index_params = self._index_params(index_config)
+        index_params.add_index(field_name="tags", index_type="INVERTED")
 
         self.logger.debug(pformat(f"Creating index: {index_params}"))
 
         self.milvus_client.create_collection(
             collection_name=collection_name,
             index_params=index_params,
-            metric_type=metric_type,
+            metric_type=index_config.metric_type,
             schema=schema,
         )
 
+        self._reset_local_indexes(collection_name)
+
         collection_status = self.milvus_client.get_load_state(
             collection_name=collection_name
         )
@@ -142,10 +233,145 @@ class SetupMilvus:
         self.logger.debug(pformat(f"Creating collection: {collection_name}"))
         return collection_status
 
+    def _index_params(self, index_config: MilvusIndexConfigModel):
+        index_params = self.milvus_client.prepare_index_params()
+
+        index_params.add_index(
+            field_name="vector",
+            index_type=index_config.index_type,
+            metric_type=index_config.metric_type,
+            params=index_config.index_params,
+        )
+
+        return index_params
+
 
 class MilvusHandler(SetupMilvus):
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, vector_dim: int) -> None:
+        super().__init__(vector_dim)
+
+        # collection -> index config matching the index actually built
+        self.index_configs: dict[str, MilvusIndexConfigModel] = {}
+
+    def rebuild_index(
+        self,
+        collection_name: str,
+        index_config: Optional[MilvusIndexConfigModel] = None,
+    ) -> MilvusIndexConfigModel:
+        """
+        Replace the vector index of an existing collection, e.g. after tuning its config.
+
+        The collection is released while the index is rebuilt, searches fail until it
+        is loaded again.
+
+        Args:
+            collection_name (str): Milvus collection name.
+            index_config (MilvusIndexConfigModel, optional): The new index config.
+                Defaults to the config of the collection, see `collection_index_config`.
+
+        Returns:
+            MilvusIndexConfigModel: The index config in use.
+        """
+        index_config = resolve_index_config(
+            index_config or collection_index_config(collection_name, self.vector_dim),
+            self.vector_dim,
+        )
+
+        self.milvus_client.release_collection(collection_name=collection_name)
+        for index_name in self.milvus_client.list_indexes(
+            collection_name=collection_name, field_name="vector"
+        ):
+            self.milvus_client.drop_index(
+                collection_name=collection_name, index_name=index_name
+            )
+
+        self.milvus_client.create_index(
+            collection_name=collection_name,
+            index_params=self._index_params(index_config),
+        )
+        self.milvus_client.load_collection(collection_name=collection_name)
+
+        self.index_configs[collection_name] = index_config
+        self.logger.info(f"Rebuilt index of `{collection_name}`: {index_config}")
+
+        return index_config
+
+    def _index_config(self, collection_name: str) -> MilvusIndexConfigModel:
+        """Index config of a collection, following the index it was actually built with"""
+        if collection_name in self.index_configs:
+            return self.index_configs[collection_name]
+
+        index_config = collection_index_config(collection_name, self.vector_dim)
+
+        for index_name in self.milvus_client.list_indexes(
+            collection_name=collection_name, field_name="vector"
+        ):
+            built_index = self.milvus_client.describe_index(
+                collection_name=collection_name, index_name=index_name
+            )
+            if built_index.get("index_type") != index_config.index_type:
+                # the collection predates the current config, search it as it was built
+                self.logger.warning(
+                    f"Collection `{collection_name}` has a {built_index.get('index_type')} index, "
+                    f"configured {index_config.index_type}, see `rebuild_index`"
+                )
+                index_config = resolve_index_config(
+                    MilvusIndexConfigModel(
+                        index_type=built_index["index_type"],
+                        metric_type=built_index.get("metric_type", "L2"),
+                    ),
+                    self.vector_dim,
+                )
+
+        self.index_configs[collection_name] = index_config
+        return index_config
+
+    def metric_type(self, collection_name: str) -> str:
+        """Metric of the distances returned by `search_similarity`, L2 is lower is closer, IP and COSINE higher"""
+        return self._index_config(collection_name).metric_type
+
+    @staticmethod
+    def hash_id(docs_filename: str, content: str) -> str:
+        """Derive a stable primary key from the document source and sentence content"""
+        return hashlib.sha256(f"{docs_filename}\0{content}".encode()).hexdigest()
+
+    def _filter_expression(
+        self, collection_name: str, search_filter: Optional[SearchFilterModel]
+    ) -> str:
+        """Milvus boolean expression of a search filter, empty when nothing is filtered"""
+        if search_filter is None:
+            return ""
+
+        if collection_name in self.unfilterable_collections:
+            self.logger.warning(f"Ignoring search filter on `{collection_name}`")
+            return ""
+
+        expressions = []
+        if search_filter.docs_type is not None:
+            expressions.append(f"docs_type == {json.dumps(search_filter.docs_type)}")
+        if search_filter.tags:
+            expressions.append(
+                f"array_contains_any(tags, {json.dumps(search_filter.tags)})"
+            )
+
+        return " and ".join(expressions)
+
+    def _vector_data(self, vectors: np.ndarray) -> np.ndarray:
+        """Cast vectors to the element type of the vector field"""
+        return np.asarray(
+            vectors, dtype=np.float16 if self.VECTOR_TYPE == "float16" else np.float32
+        )
+
+    @staticmethod
+    def _entity_vector(vector: Any) -> Optional[list[float]]:
+        """Vector field of a search hit as floats, float16 vectors are returned as bytes"""
+        if isinstance(vector, list) and vector and isinstance(vector[0], bytes):
+            vector = vector[0]
+        if vector is None:
+            return None
+        if isinstance(vector, bytes):
+            vector = np.frombuffer(vector, dtype=np.float16)
+        return np.asarray(vector, dtype=np.float32).tolist()
 
     def insert_sentence(
         self,
@@ -155,12 +381,13 @@ class MilvusHandler(SetupMilvus):
         file_uuid: str,
         collection: str = "default",
         remove_duplicates: bool = True,
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
     ) -> dict:
         """
         Insert a sentence (regulation) from a document into the vector database.
 
-        This function inserts a sentence along with its associated metadata into the specified
-        collection in the vector database. It can optionally remove duplicates before insertion.
+        This is a single row wrapper around `insert_sentences`.
 
         Args:
             docs_filename (str): The filename of the document containing the sentence.
@@ -168,83 +395,200 @@ class MilvusHandler(SetupMilvus):
             content (str): The actual content of the sentence.
             file_uuid (str): A unique identifier for the file.
             collection (str, optional): The name of the collection to insert into. Defaults to "default".
-            remove_duplicates (bool, optional): Whether to remove duplicate entries before insertion. Defaults to True.
+            remove_duplicates (bool, optional): Whether to replace duplicate entries on insertion. Defaults to True.
+            docs_type (str, optional): The type of the document, used by search filters. Defaults to "".
+            tags (list[str], optional): The tags of the document, used by search filters. Defaults to None.
 
         Returns:
             dict: A dictionary containing information about the insertion operation, including
                   the number of rows inserted and the list of inserted primary keys.
         """
-        # fix duplicates
-        if remove_duplicates:
-            is_duplicates = self.milvus_client.query(
-                collection_name=collection,
-                filter=f"""(source == "{docs_filename}") and (content == "{content}")""",  # fmt: off
-            )  # nopep8
-            if is_duplicates:
-                info = self.milvus_client.delete(
-                    collection_name="default", ids=[i["id"] for i in is_duplicates]
-                )
-                self.logger.debug(pformat(f"Deleted: {info}"))
+        return self.insert_sentences(
+            docs_filename=docs_filename,
+            vectors=np.asarray([vector]),
+            contents=[content],
+            file_uuid=file_uuid,
+            collection=collection,
+            remove_duplicates=remove_duplicates,
+            docs_type=docs_type,
+            tags=tags,
+        )
+
+    def insert_sentences(
+        self,
+        docs_filename: str,
+        vectors: np.ndarray,
+        contents: list[str],
+        file_uuid: str,
+        collection: str = "default",
+        remove_duplicates: bool = True,
+        batch_size: int = 512,
+        docs_type: str = "",
+        tags: Optional[list[str]] = None,
+    ) -> dict:
+        """
+        Insert all sentences of a document into the vector database in bulk.
+
+        Every row gets a primary key derived from sha256(docs_filename, content). With
+        `remove_duplicates` the rows are written with `upsert`, which replaces sentences
+        already stored for the same document without a query or delete round trip.
+
+        Args:
+            docs_filename (str): The filename of the document containing the sentences.
+            vectors (np.ndarray): Matrix of sentence vectors, one row per content.
+            contents (list[str]): The sentences, aligned with `vectors`.
+            file_uuid (str): A unique identifier for the file.
+            collection (str, optional): The name of the collection to insert into. Defaults to "default".
+            remove_duplicates (bool, optional): Whether to replace duplicate entries on insertion. Defaults to True.
+            batch_size (int, optional): Number of rows per Milvus call. Defaults to 512.
+            docs_type (str, optional): The type of the document, used by search filters. Defaults to "".
+            tags (list[str], optional): The tags of the document, used by search filters. Defaults to None.
+
+        Returns:
+            dict: A dictionary containing the number of rows written (`insert_count`) and
+                  the list of written primary keys (`ids`).
+        """
+        assert len(vectors) == len(contents), (
+            f"vectors and contents length mismatch: {len(vectors)} != {len(contents)}"
+        )
+
+        self.check_collection(collection)
+        # the tags field holds at most 64 tags
+        filter_fields = (
+            {}
+            if collection in self.unfilterable_collections
+            else {"docs_type": docs_type, "tags": (tags or [])[:64]}
+        )
 
-        success = self.milvus_client.insert(
-            collection_name=collection,
-            data={
+        rows: dict[str, dict] = {}
+        for vector, content in zip(self._vector_data(vectors), contents):
+            row_id = self.hash_id(docs_filename, content)
+            # keep the last occurrence, same as the previous delete-then-insert behaviour
+            rows[row_id] = {
+                "id": row_id,
                 "source": str(docs_filename),
                 "vector": vector,
                 "content": content,
                 "file_uuid": file_uuid,
-            },
+                **filter_fields,
+            }
+
+        data = list(rows.values())
+        write = (
+            self.milvus_client.upsert
+            if remove_duplicates
+            else self.milvus_client.insert
         )
 
-        return success
+        insert_count = 0
+        for start in range(0, len(data), batch_size):
+            info = write(
+                collection_name=collection, data=data[start : start + batch_size]
+            )
+            insert_count += info.get("upsert_count", info.get("insert_count", 0))
+            self.logger.debug(pformat(f"Inserted batch: {start // batch_size + 1}"))
+
+        return {"insert_count": insert_count, "ids": list(rows.keys())}
 
     def search_similarity(
         self,
         question_vector: np.ndarray,
         collection_name: str = "default",
         limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
     ) -> list[SearchSimilarityModel]:
         """
         Perform a similarity search on a vector database.
 
+        The search params (nprobe, ef, ...) come from the index config of the collection.
+
         Args:
             question_vector (np.ndarray): Vector representation of the query.
             collection_name (str, optional): Milvus collection name. Defaults to "default".
             limit (int, optional): Maximum number of similar documents to retrieve. Defaults to 3.
+            search_filter (SearchFilterModel, optional): Only search the chunks of this
+                docs_type and carrying any of these tags. Defaults to None.
 
         Returns:
-            list[SearchSimilarityModel]: List of similar documents with their metadata.
+            list[SearchSimilarityModel]: List of similar documents with their metadata and
+                search distance, ordered from the most to the least similar.
 
         Raises:
             ValueError: If the question vector is invalid or empty.
             MilvusException: If there are issues with Milvus database connection or search.
         """
 
-        docs_results = self.milvus_client.search(
-            collection_name=collection_name, data=[question_vector], limit=limit
+        return self.search_similarity_batch(
+            np.asarray([question_vector]), collection_name, limit, search_filter
         )[0]
-        self.logger.info(f"question_vector: {question_vector}")
-        self.logger.info(f"docs_results: {docs_results}")
 
-        query_search_result = []
+    def search_similarity_batch(
+        self,
+        question_vectors: np.ndarray,
+        collection_name: str = "default",
+        limit: int = 3,
+        search_filter: Optional[SearchFilterModel] = None,
+    ) -> list[list[SearchSimilarityModel]]:
+        """
+        Same as `search_similarity` for several questions in a single Milvus search.
+
+        Args:
+            question_vectors (np.ndarray): Matrix of query vectors, one row per question.
+            collection_name (str, optional): Milvus collection name. Defaults to "default".
+            limit (int, optional): Maximum number of similar documents per question. Defaults to 3.
+            search_filter (SearchFilterModel, optional): Applied to every question. Defaults to None.
+
+        Returns:
+            list[list[SearchSimilarityModel]]: The similar documents of each question, in input order.
+        """
+        self.check_collection(collection_name)
+        index_config = self._index_config(collection_name)
 
-        for _ in docs_results:
-            file_ = self.milvus_client.get(
-                collection_name="default",
-                ids=_["id"],
-            )[0]
+        docs_results = self.milvus_client.search(
+            collection_name=collection_name,
+            data=self._vector_data(question_vectors),
+            limit=limit,
+            filter=self._filter_expression(collection_name, search_filter),
+            # the stored vectors spare re-embedding the chunks for the diversity pass
+            output_fields=["source", "file_uuid", "content", "vector"],
+            search_params={
+                "metric_type": index_config.metric_type,
+                "params": index_config.search_params,
+            },
+        )
+        self.logger.info(f"question_vectors: {question_vectors.shape}")
+        self.logger.info(f"docs_results: {[len(hits) for hits in docs_results]} hits")
 
-            query_search_result.append(
+        query_search_result = [
+            [
                 SearchSimilarityModel(
-                    file_uuid=file_["file_uuid"],
-                    content=file_["content"],
-                    source=file_["source"],
+                    id=str(hit["id"]),
+                    file_uuid=hit["entity"]["file_uuid"],
+                    content=hit["entity"]["content"],
+                    source=hit["entity"]["source"],
+                    distance=hit["distance"],
+                    vector=self._entity_vector(hit["entity"].get("vector")),
                 )
-            )
+                for hit in hits
+            ]
+            for hits in docs_results
+        ]
 
         self.logger.debug(pformat(query_search_result))
 
         return query_search_result
 
 
-milvus_client = MilvusHandler()
+VECTOR_DATABASE = getenv("VECTOR_DATABASE", "milvus")
+assert VECTOR_DATABASE in ["milvus", "numpy"], (
+    "VECTOR_DATABASE environment variable is not valid"
+)
+
+if VECTOR_DATABASE == "numpy":
+    from Backend.utils.database.numpy_vector_database import NumpyVectorHandler
+
+    milvus_client: MilvusHandler | NumpyVectorHandler = NumpyVectorHandler(
+        encoder_client.vector_dim
+    )
+else:
+    milvus_client = MilvusHandler(encoder_client.vector_dim)
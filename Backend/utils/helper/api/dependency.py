@@ -6,15 +6,14 @@ import jwt
 import os
 import datetime
 
-from Backend.utils.database.database import MySQLHandler
+from Backend.utils.database.async_database import async_mysql_client
 from Backend.utils.helper.logger import CustomLoggerHandler
 from Backend.utils.helper.model.api.dependency import JWTPayload
 
 from typing import Annotated
 
-# Initialize logger and database connection
+# Initialize logger
 logger = CustomLoggerHandler().get_logger()
-mysql_client = MySQLHandler()
 
 # development
 GLOBAL_DEBUG_MODE = os.getenv("DEBUG")
@@ -87,7 +86,9 @@ async def verify_jwt_token(token: str = Cookie(None)) -> JWTPayload:
         payload = jwt.decode(token, jwt_secret, algorithms=jwt_algorithm)
 
         # Verify token is in database
-        is_token_valid = mysql_client.verify_login_token(payload["user_id"], token)
+        is_token_valid = await async_mysql_client.verify_login_token(
+            payload["user_id"], token
+        )
         logger.info(is_token_valid)
         if not is_token_valid:
             raise HTTPException(status_code=401, detail="Token not found in database")
@@ -96,7 +97,7 @@ async def verify_jwt_token(token: str = Cookie(None)) -> JWTPayload:
         expire_time = datetime.datetime.fromisoformat(payload["expire_time"])
         if datetime.datetime.now() > expire_time:
             # Optionally remove expired token from database
-            mysql_client.remove_expired_token(payload["user_id"])
+            await async_mysql_client.remove_expired_token(payload["user_id"])
             raise HTTPException(status_code=401, detail="Token expired")
 
         return JWTPayload(**payload)
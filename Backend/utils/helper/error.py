@@ -12,6 +12,20 @@ class MilvusError(Exception): ...
 class MilvusConnectionError(MilvusError): ...
 
 
+class VectorSchemaMismatchError(MilvusError):
+    def __init__(self, collection_name: str, stored_vector: str, model_vector: str):
+        self.collection_name = collection_name
+        self.stored_vector = stored_vector
+        self.model_vector = model_vector
+
+    def __str__(self):
+        return (
+            f"Collection `{self.collection_name}` stores {self.stored_vector} vectors "
+            f"but the embedding model produces {self.model_vector}, drop the collection "
+            "and upload its documents again, or switch back to the previous embedding model"
+        )
+
+
 # MySQL
 class MySQLError(Exception): ...
 
@@ -19,6 +33,18 @@ class MySQLError(Exception): ...
 class MySQLConnectionError(MySQLError): ...
 
 
+class MySQLPoolTimeoutError(MySQLConnectionError):
+    def __init__(self, pool_size: int, timeout: float):
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+    def __str__(self):
+        return (
+            f"No MySQL connection available after {self.timeout} seconds, "
+            f"all {self.pool_size} pooled connections are checked out"
+        )
+
+
 # File
 class FileError(Exception):
     def __init__(self, message):
@@ -47,6 +73,17 @@ class UnsupportedFileFormat(FileError):
         return f"Unsupported file format {self.unsupported_file_format}"
 
 
+class PartitionTimeoutError(FileError):
+    def __init__(self, document_path: str, timeout: float):
+        self.document_path = document_path
+        self.timeout = timeout
+
+    def __str__(self):
+        return (
+            f"Partition of {self.document_path} timed out after {self.timeout} seconds"
+        )
+
+
 class NotFoundError(FileError): ...
 
 
@@ -0,0 +1,16 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+
+
+class CachedAnswerModel(BaseModel):
+    answer: str
+    token_size: int
+    similarity: float
+
+
+class AnswerCacheStatsModel(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
@@ -0,0 +1,13 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+
+
+class MicroBatchStatsModel(BaseModel):
+    name: str
+    batches: int
+    items: int
+    mean_batch_size: float
+    max_batch_size: int
+    queue_delay_p50_ms: float
+    queue_delay_p99_ms: float
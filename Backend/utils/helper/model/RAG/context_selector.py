@@ -0,0 +1,12 @@
+# Code by AkinoAlice@TyrantRey
+
+from Backend.utils.helper.model.database.vector_database import SearchSimilarityModel
+
+from pydantic import BaseModel
+
+
+class ContextSelectionModel(BaseModel):
+    documents: list[SearchSimilarityModel]
+    retrieved_chunks: int
+    context_chunks: int
+    context_tokens: int
@@ -0,0 +1,10 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+from typing import Optional
+
+
+class DocumentElementModel(BaseModel):
+    text: str
+    # page of pdf or slide of pptx, None when the format has no pages
+    page_number: Optional[int] = None
@@ -0,0 +1,29 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class IngestionJobModel(BaseModel):
+    job_id: str
+    file_id: str
+    filename: str
+    collection: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stage: Literal[
+        "queued",
+        "partition",
+        "chunk",
+        "deduplicate",
+        "embed",
+        "insert",
+        "completed",
+    ]
+    chunks_total: int
+    chunks_done: int
+    # near duplicates of stored chunks that were not inserted
+    chunks_duplicated: int = 0
+    chunks_per_second: float
+    error: Optional[str] = None
+    created_time: float
+    updated_time: float
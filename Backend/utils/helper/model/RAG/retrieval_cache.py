@@ -0,0 +1,13 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+
+
+class RetrievalCacheStatsModel(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    expired: int
+    invalidated: int
+    hit_rate: float
+    collection_versions: dict[str, int]
@@ -25,3 +25,11 @@ class OLLAMAEmbeddingConfig(BaseModel):
 class OPENAIEmbeddingConfig(BaseModel):
     openai_api_key: str = Field(..., min_length=1)
     openai_embedding_model_name: str = Field(..., min_length=1)
+
+
+class EmbeddingCacheStatsModel(BaseModel):
+    namespace: str
+    memory_items: int
+    memory_hits: int
+    disk_hits: int
+    misses: int
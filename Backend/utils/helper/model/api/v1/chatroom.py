@@ -1,5 +1,7 @@
 # Code by AkinoAlice@TyrantRey
 
+from Backend.utils.helper.model.database.vector_database import SearchFilterModel
+
 from pydantic import BaseModel
 from typing import Literal, Optional
 
@@ -21,6 +23,10 @@ class QuestioningModel(BaseModel):
     question_type: Literal["CHATTING", "TESTING", "THEOREM"]
     collection: str = "default"
     images: Optional[list[str] | None] = None
+    # vector: milvus only, keyword: bm25 only, hybrid: both fused with rrf
+    retrieval_mode: Literal["vector", "keyword", "hybrid"] = "vector"
+    # only search the documents of a docs_type (course) and/or tags (chapters)
+    filter: Optional[SearchFilterModel] = None
 
 
 class QuestionResponseModel(BaseModel):
@@ -28,3 +34,6 @@ class QuestionResponseModel(BaseModel):
     question_uuid: str
     answer: str
     files: list[dict[str, str]]
+    # retrieved chunks and their estimated tokens actually sent to the llm
+    context_chunks: int = 0
+    context_tokens: int = 0
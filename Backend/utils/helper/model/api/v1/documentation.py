@@ -1,6 +1,7 @@
 # Code by AkinoAlice@TyrantRey
 
 from Backend.utils.helper.model.database.database import QueryDocumentationTypeListModel
+from Backend.utils.helper.model.RAG.ingestion import IngestionJobModel
 
 from pydantic import BaseModel
 from typing import Literal
@@ -39,3 +40,9 @@ class QueryDocumentListModel(BaseModel):
 class FileUploadSuccessModel(BaseModel):
     status_code: int
     file_id: str
+    job_id: str
+
+
+class QueryIngestionJobModel(BaseModel):
+    status_code: int
+    job: IngestionJobModel
@@ -94,7 +94,8 @@ class MockExamInformationModel(BaseModel):
 
 class SubmittedQuestionModel(BaseModel):
     question_id: int
-    submitted_answer_option_id: int
+    # None for an unanswered question
+    submitted_answer_option_id: int | None
 
 
 class SubmittedExamModel(BaseModel):
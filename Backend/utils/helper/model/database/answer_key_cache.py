@@ -0,0 +1,11 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+
+
+class AnswerKeyCacheStatsModel(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    invalidated: int
+    hit_rate: float
@@ -0,0 +1,15 @@
+# Code by AkinoAlice@TyrantRey
+
+from pydantic import BaseModel
+from typing import Literal
+
+
+class ChatQueueStatsModel(BaseModel):
+    mode: Literal["deferred", "inline"]
+    pending: int
+    # gave up after CHAT_QUEUE_MAX_ATTEMPTS, retried on the next startup
+    failed: int
+    persisted: int
+    retries: int
+    persist_delay_p50_ms: float
+    persist_delay_p99_ms: float
@@ -16,3 +16,20 @@ class QueryDocumentationTypeListModel(BaseModel):
     file_id: str
     file_name: str
     last_update_time: str
+
+
+class MySQLPoolStatsModel(BaseModel):
+    pool_size: int
+    max_overflow: int
+    opened: int
+    idle: int
+    in_use: int
+    checkouts: int
+    timeouts: int
+    recycled: int
+    pings: int
+    invalidated: int
+    retries: int
+    wait_p50_ms: float
+    wait_p99_ms: float
+    wait_max_ms: float
@@ -1,9 +1,37 @@
 # Code by AkinoAlice@TyrantRey
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 
 class SearchSimilarityModel(BaseModel):
+    # primary key shared by the milvus row and the keyword index
+    id: str = ""
     source: str
     content: str
     file_uuid: str
+    # raw metric distance returned by the vector search, smaller is closer for L2,
+    # None when the chunk was only found by the keyword index
+    distance: Optional[float] = None
+    # bm25 score for keyword search, fused score for hybrid search, larger is better
+    score: float = 0.0
+    # stored embedding returned by the vector search, None for keyword only chunks
+    vector: Optional[list[float]] = Field(default=None, exclude=True, repr=False)
+
+
+class SearchFilterModel(BaseModel):
+    # exact document type, e.g. the course a document was uploaded for
+    docs_type: Optional[str] = None
+    # chunks carrying any of these tags, e.g. chapters
+    tags: list[str] = []
+
+
+class MilvusIndexConfigModel(BaseModel):
+    index_type: Literal["FLAT", "IVF_FLAT", "IVF_SQ8", "IVF_PQ", "HNSW", "DISKANN"] = (
+        "IVF_FLAT"
+    )
+    metric_type: Literal["L2", "IP", "COSINE"] = "L2"
+    # build params, e.g. {"nlist": 128} or {"M": 16, "efConstruction": 200}
+    index_params: dict = {}
+    # search params, e.g. {"nprobe": 16} or {"ef": 64}
+    search_params: dict = {}